@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""prediction_job_ordering.py
+
+Benchmark that compares the orders of the prediction job loop on synthetic runtimes.
+
+The runtimes of the prediction jobs are heavy tailed, a few prediction jobs take much
+longer than the others. The runtime history is filled with the runtimes of a previous
+run, the runtimes of the simulated run deviate randomly from those. Every order is
+simulated on a number of parallel workers, which start the next prediction job as soon
+as they are done.
+
+For the random and longest first order the makespan (total runtime of the loop) is
+reported. For the random and deadline order the fraction of high priority prediction
+jobs that is finished before a short deadline is reported.
+
+Example:
+    Run the benchmark from the root of the repository::
+
+        $ python -m benchmarks.prediction_job_ordering
+
+"""
+import argparse
+import heapq
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from openstf.tasks.utils.jobscheduling import (
+    RuntimeHistory,
+    order_deadline,
+    order_longest_first,
+)
+
+HIGH_PRIORITY = 1
+# Fraction of the total work that can be done before the deadline
+DEADLINE_FRACTION = 0.3
+
+
+def simulate(prediction_jobs, runtimes, n_workers):
+    """Simulate a parallel loop, returns the finish time per prediction job."""
+    workers = [0.0] * n_workers
+    finish_times = {}
+    for pj in prediction_jobs:
+        start = heapq.heappop(workers)
+        finish_times[pj["id"]] = start + runtimes[pj["id"]]
+        heapq.heappush(workers, finish_times[pj["id"]])
+    return finish_times
+
+
+def benchmark(n_jobs, n_workers, repeat, seed):
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+
+    makespans = {"random": [], "longest_first": []}
+    high_priority_done = {"random": [], "deadline": []}
+
+    for _ in range(repeat):
+        prediction_jobs = [
+            {"id": pid, "priority": int(rng.random() < 0.2)} for pid in range(n_jobs)
+        ]
+        previous = rng.lognormal(mean=3.0, sigma=1.2, size=n_jobs)
+        current = previous * rng.uniform(0.8, 1.2, size=n_jobs)
+        runtimes = dict(enumerate(current))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            history = RuntimeHistory(Path(temp_dir) / "runtimes.json")
+            for pid, runtime in enumerate(previous):
+                history.update(pid, runtime)
+
+        random_order = random.sample(prediction_jobs, len(prediction_jobs))
+        deadline = DEADLINE_FRACTION * current.sum() / n_workers
+        orders = {
+            "random": random_order,
+            "longest_first": order_longest_first(random_order, history),
+            "deadline": order_deadline(
+                random_order,
+                history,
+                deadline,
+                priority_function=lambda pj: pj["priority"],
+                n_workers=n_workers,
+            ),
+        }
+
+        high_priority = [pj["id"] for pj in prediction_jobs if pj["priority"]]
+        for name, order in orders.items():
+            finish_times = simulate(order, runtimes, n_workers)
+            if name in makespans:
+                makespans[name].append(max(finish_times.values()))
+            if name in high_priority_done:
+                high_priority_done[name].append(
+                    np.mean([finish_times[pid] <= deadline for pid in high_priority])
+                )
+
+    return (
+        {name: np.mean(values) for name, values in makespans.items()},
+        {name: np.mean(values) for name, values in high_priority_done.items()},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="Prediction job ordering benchmark")
+    parser.add_argument("--jobs", type=int, default=300, help="Number of jobs.")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of repeats.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    print(f"Prediction jobs: {args.jobs}, repeats: {args.repeat}")
+    print(
+        f"{'workers':>8}{'random [s]':>14}{'longest first [s]':>20}"
+        f"{'high prio random':>18}{'high prio deadline':>20}"
+    )
+    for n_workers in (1, 4, 8, 16):
+        makespans, high_priority_done = benchmark(
+            args.jobs, n_workers, args.repeat, args.seed
+        )
+        print(
+            f"{n_workers:>8}{makespans['random']:>14.0f}"
+            f"{makespans['longest_first']:>20.0f}"
+            f"{high_priority_done['random']:>18.0%}"
+            f"{high_priority_done['deadline']:>20.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""quantile_models.py
+
+Benchmark that compares the training and inference time of the quantile models.
+
+Every quantile model type is trained on the same reference data set (with features)
+and predicts all quantiles of a prediction job on the validation part of that data.
+
+On the 307 reference set with 7 quantiles, on a single core, xgb_quantile took 59.4 s
+to fit and 26 ms to predict, and lgb_quantile took 7.6 s to fit and 15 ms to predict.
+
+Example:
+    Run the benchmark from the root of the repository::
+
+        $ python -m benchmarks.quantile_models
+
+"""
+import argparse
+import warnings
+from time import perf_counter
+
+import pandas as pd
+
+from openstf import PROJECT_ROOT
+from openstf.enums import MLModelType
+from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
+from openstf.model.model_creator import ModelCreator
+from openstf.model_selection.model_selection import split_data_train_validation_test
+
+REFERENCE_DATA = (
+    PROJECT_ROOT / "test" / "unit" / "data" / "reference_sets" / "307-train-data.csv"
+)
+QUANTILE_MODEL_TYPES = [MLModelType.XGB_QUANTILE, MLModelType.LGB_QUANTILE]
+QUANTILES = (0.05, 0.1, 0.3, 0.5, 0.7, 0.9, 0.95)
+EARLY_STOPPING_ROUNDS: int = 10
+
+
+def benchmark_model_type(model_type, train_data, validation_data, repeat):
+    """Train and predict with a model type and return the best timings in seconds."""
+    train_x, train_y = train_data.iloc[:, 1:-1], train_data.iloc[:, 0]
+    validation_x, validation_y = (
+        validation_data.iloc[:, 1:-1],
+        validation_data.iloc[:, 0],
+    )
+
+    fit_times, predict_times = [], []
+    for _ in range(repeat):
+        model = ModelCreator.create_model(model_type, quantiles=QUANTILES)
+
+        start = perf_counter()
+        model.fit(
+            train_x,
+            train_y,
+            eval_set=[(train_x, train_y), (validation_x, validation_y)],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            verbose=False,
+        )
+        fit_times.append(perf_counter() - start)
+
+        start = perf_counter()
+        model.predict_quantiles(validation_x, QUANTILES)
+        predict_times.append(perf_counter() - start)
+
+    return min(fit_times), min(predict_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="Quantile model benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repeats.")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+
+    input_data = pd.read_csv(REFERENCE_DATA, index_col=0, parse_dates=True)
+    data_with_features = TrainFeatureApplicator(horizons=[0.25, 47.0]).add_features(
+        input_data
+    )
+    _, _, train_data, validation_data, _ = split_data_train_validation_test(
+        data_with_features
+    )
+
+    print(
+        f"Training rows: {len(train_data)}, validation rows: {len(validation_data)}, "
+        f"quantiles: {len(QUANTILES)}"
+    )
+    print(f"{'model_type':<15}{'fit [s]':>10}{'predict [s]':>14}")
+    for model_type in QUANTILE_MODEL_TYPES:
+        fit_time, predict_time = benchmark_model_type(
+            model_type, train_data, validation_data, args.repeat
+        )
+        print(f"{model_type.value:<15}{fit_time:>10.3f}{predict_time:>14.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""task_import_time.py
+
+Benchmark of the time it takes to import every task, which is part of the runtime of
+every (cron) run of a task.
+
+Every import is measured in a fresh interpreter, the median of a number of repeats is
+reported. For every task the heavy dependencies that are loaded by the import are
+listed, these should only be loaded on the code paths that use them.
+
+Example:
+    Run the benchmark from the root of the repository::
+
+        $ python -m benchmarks.task_import_time
+
+"""
+import argparse
+import json
+import pkgutil
+import statistics
+import subprocess
+import sys
+
+from openstf import PROJECT_ROOT
+
+HEAVY_MODULES = ("mlflow", "optuna", "cufflinks", "plotly", "matplotlib", "shap")
+
+MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import openstf.tasks.{task}
+runtime = time.perf_counter() - start
+heavy = [m for m in {heavy_modules!r} if m in sys.modules]
+print(json.dumps(dict(runtime=runtime, heavy=heavy)))
+"""
+
+
+def get_task_names():
+    task_pkg_dir = PROJECT_ROOT / "openstf" / "tasks"
+    return sorted(
+        m for _, m, is_pkg in pkgutil.iter_modules([str(task_pkg_dir)]) if not is_pkg
+    )
+
+
+def measure_import(task):
+    """Import a task in a fresh interpreter, returns the runtime and heavy modules."""
+    script = MEASURE_SCRIPT.format(task=task, heavy_modules=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    # Tasks may log while importing, the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="Task import time benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of repeats.")
+    parser.add_argument("tasks", nargs="*", help="Tasks, defaults to all tasks.")
+    args = parser.parse_args()
+
+    tasks = args.tasks or get_task_names()
+
+    # The first import fills the file system cache and compiles the bytecode
+    measure_import(tasks[0])
+
+    print(f"{'task':<30}{'import [s]':>12}  heavy modules")
+    for task in tasks:
+        results = [measure_import(task) for _ in range(args.repeat)]
+        runtime = statistics.median(result["runtime"] for result in results)
+        heavy = ", ".join(results[-1]["heavy"]) or "-"
+        print(f"{task:<30}{runtime:>12.2f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""training_matrix_memory.py
+
+Benchmark of the memory used to train a model, with the compact feature layout
+(float32 features and uint8 flags) and with the previous layout (float64 features,
+bool flags and int64 calendar features).
+
+Every layout is measured in a fresh interpreter, which adds the features to the
+reference data set and trains a model on it. Reported are the size of the data with
+features, the size and dtype of the feature matrix the regressor converts it to, the
+peak memory allocated by Python and NumPy (tracemalloc) and the increase of the peak
+resident memory of the process, which includes the memory of XGBoost and LightGBM.
+
+Example:
+    Run the benchmark from the root of the repository::
+
+        $ python -m benchmarks.training_matrix_memory
+
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tracemalloc
+import warnings
+from contextlib import nullcontext
+from time import perf_counter
+from unittest.mock import patch
+
+import pandas as pd
+
+from openstf import PROJECT_ROOT
+from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
+from openstf.model.model_creator import ModelCreator
+from openstf.model_selection.model_selection import split_data_train_validation_test
+
+REFERENCE_DATA = (
+    PROJECT_ROOT / "test" / "unit" / "data" / "reference_sets" / "307-train-data.csv"
+)
+LAYOUTS = ["previous", "compact"]
+EARLY_STOPPING_ROUNDS: int = 10
+MEGABYTE: int = 1024**2
+
+
+def measure(layout, model_type, horizons):
+    """Add features and train a model with a layout, returns the measurements."""
+    warnings.filterwarnings("ignore")
+    input_data = pd.read_csv(REFERENCE_DATA, index_col=0, parse_dates=True)
+    # Peak resident memory in kilobytes before the features are added
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = perf_counter()
+
+    # The previous layout is the output of the feature functions as is
+    keep_dtypes = patch(
+        "openstf.feature_engineering.feature_applicator.enforce_compact_dtypes",
+        side_effect=lambda data: data,
+    )
+    with keep_dtypes if layout == "previous" else nullcontext():
+        data_with_features = TrainFeatureApplicator(horizons=horizons).add_features(
+            input_data
+        )
+    _, _, train_data, validation_data, _ = split_data_train_validation_test(
+        data_with_features, random_state=0
+    )
+    train_x, train_y = train_data.iloc[:, 1:-1], train_data.iloc[:, 0]
+    validation_x, validation_y = (
+        validation_data.iloc[:, 1:-1],
+        validation_data.iloc[:, 0],
+    )
+
+    model = ModelCreator.create_model(model_type)
+    model.fit(
+        train_x,
+        train_y,
+        eval_set=[(train_x, train_y), (validation_x, validation_y)],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        verbose=False,
+    )
+
+    runtime = perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_increase = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss
+
+    feature_matrix = train_x.to_numpy()
+    return dict(
+        frame=data_with_features.memory_usage(deep=True).sum() / MEGABYTE,
+        matrix=feature_matrix.nbytes / MEGABYTE,
+        matrix_dtype=str(feature_matrix.dtype),
+        traced_peak=traced_peak / MEGABYTE,
+        rss_increase=rss_increase / 1024,
+        runtime=runtime,
+    )
+
+
+def measure_in_subprocess(layout, model_type, horizons):
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.training_matrix_memory",
+            "--measure",
+            layout,
+            "--model",
+            model_type,
+            "--horizons",
+            *map(str, horizons),
+        ],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    # The pipeline may log, the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="Training matrix memory benchmark")
+    parser.add_argument("--model", default="xgb", help="Model type.")
+    parser.add_argument(
+        "--horizons", type=float, nargs="+", default=[0.25, 47.0], help="Horizons."
+    )
+    parser.add_argument("--measure", choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        print(json.dumps(measure(args.measure, args.model, args.horizons)))
+        return
+
+    print(f"model: {args.model}, horizons: {args.horizons}")
+    print(
+        f"{'layout':<10}{'frame [MB]':>12}{'matrix [MB]':>13}{'matrix dtype':>14}"
+        f"{'traced peak [MB]':>18}{'rss increase [MB]':>19}{'runtime [s]':>13}"
+    )
+    for layout in LAYOUTS:
+        result = measure_in_subprocess(layout, args.model, args.horizons)
+        print(
+            f"{layout:<10}{result['frame']:>12.1f}{result['matrix']:>13.1f}"
+            f"{result['matrix_dtype']:>14}{result['traced_peak']:>18.1f}"
+            f"{result['rss_increase']:>19.1f}{result['runtime']:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,14 @@
 # SPDX-License-Identifier: MPL-2.0
 import argparse
 import importlib
+import inspect
 import pkgutil
 
 from openstf import PROJECT_ROOT
 
+# Number of loaded models the daemon keeps in memory
+DAEMON_MODEL_CACHE_SIZE = 100
+
 
 def parse_cli_arguments():
     # create the top-level parser
@@ -16,11 +20,39 @@ def parse_cli_arguments():
 
     # create the parser for the "task" command
     parser_task = subparsers.add_parser("task")
+    parser_task.set_defaults(command="task")
     parser_task.add_argument(
         "name", action="store", type=str, help="Name of the task you want to run."
     )
+    parser_task.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the prediction jobs completed by a previous run of the task, "
+        "only supported by tasks that keep a checkpoint journal.",
+    )
+
+    # create the parser for the "daemon" command
+    parser_daemon = subparsers.add_parser(
+        "daemon", help="Run tasks on a schedule in a single long running process"
+    )
+    parser_daemon.set_defaults(command="daemon")
+    parser_daemon.add_argument(
+        "schedule",
+        nargs="+",
+        type=str,
+        help="Tasks to run with their interval in minutes, e.g. create_forecast=15.",
+    )
+    parser_daemon.add_argument(
+        "--model-cache-size",
+        type=int,
+        default=DAEMON_MODEL_CACHE_SIZE,
+        help="Number of loaded models kept in memory between runs, 0 disables "
+        "the cache.",
+    )
 
     args = parser.parse_args()
+    if getattr(args, "command", None) is None:
+        parser.error("Choose a command")
     return args
 
 
@@ -34,9 +66,84 @@ def validate_task_name(task_name):
         )
 
 
+def validate_task_resume(task_name, task_main):
+    """Check that the main function of a task can resume a previous run.
+
+    Args:
+        task_name (str): Name of the task
+        task_main (callable): Main function of the task
+
+    Raises:
+        RuntimeError: If the main function has no resume parameter
+    """
+    if "resume" not in inspect.signature(task_main).parameters:
+        raise RuntimeError(f"Task '{task_name}' does not support --resume.")
+
+
+def parse_schedule(schedule):
+    """Parse the schedule of the daemon.
+
+    Args:
+        schedule (list of str): Entries "<task name>=<interval in minutes>"
+
+    Returns:
+        dict: Interval in seconds per task name
+    """
+    intervals = {}
+    for entry in schedule:
+        task_name, _, minutes = entry.partition("=")
+        try:
+            interval = float(minutes) * 60
+        except ValueError:
+            raise RuntimeError(
+                f"Invalid schedule entry: '{entry}', use <task name>=<minutes>."
+            )
+        if interval <= 0:
+            raise RuntimeError(f"Interval of task '{task_name}' should be positive.")
+        validate_task_name(task_name)
+        intervals[task_name] = interval
+
+    return intervals
+
+
+def run_daemon(schedule, model_cache_size=DAEMON_MODEL_CACHE_SIZE):
+    """Run the main function of tasks on a schedule, until interrupted.
+
+    All tasks are imported once. Every task runs in its own long running process,
+    forked from this one, so its database connections, loaded models and holiday
+    calendars are reused between runs, while tasks do not share global state like
+    the active MLflow run. A task is never started while its previous run is still
+    running.
+
+    Args:
+        schedule (list of str): Entries "<task name>=<interval in minutes>"
+        model_cache_size (int, optional): Number of loaded models kept in memory
+    """
+    # Imported here, so running a single task does not depend on these modules
+    from openstf.model.serializer import MODEL_CACHE
+    from openstf.tasks.utils.scheduler import ScheduledTask, TaskScheduler
+
+    MODEL_CACHE.resize(model_cache_size)
+
+    tasks = [
+        ScheduledTask(
+            task_name,
+            interval,
+            importlib.import_module(f"openstf.tasks.{task_name}").main,
+        )
+        for task_name, interval in parse_schedule(schedule).items()
+    ]
+
+    TaskScheduler(tasks).run_forever()
+
+
 def main():
     args = parse_cli_arguments()
 
+    if args.command == "daemon":
+        run_daemon(args.schedule, args.model_cache_size)
+        return
+
     task_name = args.name
 
     validate_task_name(task_name)
@@ -44,7 +151,11 @@ def main():
     # get task
     task = importlib.import_module(f"openstf.tasks.{task_name}")
     # run task
-    task.main()
+    if args.resume:
+        validate_task_resume(task_name, task.main)
+        task.main(resume=True)
+    else:
+        task.main()
 
 
 if __name__ == "__main__":
@@ -9,6 +9,7 @@ class MLModelType(Enum):
     XGB = "xgb"
     XGB_QUANTILE = "xgb_quantile"
     LGB = "lgb"
+    LGB_QUANTILE = "lgb_quantile"
 
 
 class ForecastType(Enum):
@@ -22,3 +23,8 @@ class TracyJobResult(Enum):
     SUCCESS = "success"
     FAILED = "failed"
     UNKNOWN = "unknown"
+
+
+class CrossValidationWindow(Enum):
+    EXPANDING = "expanding"
+    SLIDING = "sliding"
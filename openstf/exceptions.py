@@ -23,6 +23,13 @@ class NoPredictedLoadError(Exception):
         self.message = message
         super().__init__(self.message)
 
+    def __reduce__(self):
+        # Required to pass the exception between processes
+        return (
+            self.__class__,
+            (self.pid, self.start_time, self.end_time, self.message),
+        )
+
 
 class NoRealisedLoadError(Exception):
     """No realised load for given datetime range"""
@@ -40,6 +47,13 @@ class NoRealisedLoadError(Exception):
         self.message = message
         super().__init__(self.message)
 
+    def __reduce__(self):
+        # Required to pass the exception between processes
+        return (
+            self.__class__,
+            (self.pid, self.start_time, self.end_time, self.message),
+        )
+
 
 class InputDataInvalidError(Exception):
     """Invalid input data"""
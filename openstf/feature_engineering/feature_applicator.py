@@ -11,6 +11,7 @@ from openstf.feature_engineering.apply_features import apply_features
 from openstf.feature_engineering.general import (
     add_missing_feature_columns,
     remove_non_requested_feature_columns,
+    enforce_compact_dtypes,
     enforce_feature_order,
 )
 
@@ -63,7 +64,8 @@ class TrainFeatureApplicator(AbstractFeatureApplicator):
 
         Returns:
             pd.DataFrame: Input DataFrame with an extra column for every added feature
-                and sorted on the datetime index.
+                and sorted on the datetime index. The features have compact dtypes,
+                see enforce_compact_dtypes.
         """
 
         if latency_config is None:
@@ -73,17 +75,19 @@ class TrainFeatureApplicator(AbstractFeatureApplicator):
         if self.horizons is None:
             self.horizons = [0.25, 24]
 
-        # Pre define output variables
-        result = pd.DataFrame()
-
         # Loop over horizons and add corresponding features
+        results = []
         for horizon in self.horizons:
             # Deep copy of df is important, because we want a fresh start every iteration!
             res = apply_features(
                 df.copy(deep=True), horizon=horizon, feature_names=self.feature_names
             )
             res["horizon"] = horizon
-            result = result.append(res)
+            # Compact every horizon before it is kept to keep the peak memory low
+            results.append(enforce_compact_dtypes(res))
+
+        # Concatenate once, appending in the loop copies the growing result every time
+        result = pd.concat(results)
 
         # IMPORTANT: sort index to prevent errors when slicing on the (datetime) index
         # if we don't sort, the duplicated indexes (one per horizon) have large gaps
@@ -101,8 +105,9 @@ class TrainFeatureApplicator(AbstractFeatureApplicator):
             features = self.feature_names + ["horizon"]
             result = remove_non_requested_feature_columns(result, features)
 
-        # Sort all features except for the (first) load and (last) horizon columns
-        return enforce_feature_order(result)
+        # Sort all features except for the (first) load and (last) horizon columns,
+        # features invalidated for latency may have become float64
+        return enforce_compact_dtypes(enforce_feature_order(result))
 
 
 class OperationalPredictFeatureApplicator(AbstractFeatureApplicator):
@@ -117,6 +122,7 @@ class OperationalPredictFeatureApplicator(AbstractFeatureApplicator):
 
         Returns:
             pd.DataFrame: Input DataFrame with an extra column for every added feature.
+                The features have the same compact dtypes as the training features.
 
         """
         num_horizons = len(self.horizons)
@@ -131,4 +137,4 @@ class OperationalPredictFeatureApplicator(AbstractFeatureApplicator):
         if self.feature_names is not None:
             df = remove_non_requested_feature_columns(df, self.feature_names)
 
-        return enforce_feature_order(df)
+        return enforce_compact_dtypes(enforce_feature_order(df))
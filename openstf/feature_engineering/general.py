@@ -9,6 +9,12 @@ import numpy as np
 import pandas as pd
 import structlog
 
+# Compact feature layout, flags (bools and small non-negative integers) are stored as
+# uint8 and all other numeric features as float32, the dtype XGBoost and LightGBM
+# convert their input to
+FLAG_DTYPE = np.uint8
+FEATURE_DTYPE = np.float32
+
 
 def add_missing_feature_columns(
     input_data: pd.DataFrame, features: List[str]
@@ -122,3 +128,36 @@ def enforce_feature_order(input_data: pd.DataFrame):
 
     # Return dataframe with columns in the correct order
     return input_data.loc[:, column_order]
+
+
+def enforce_compact_dtypes(input_data: pd.DataFrame) -> pd.DataFrame:
+    """Converts the features to a compact layout.
+
+    Flags (bool columns and integer columns with values from 0 to 255) become uint8
+    and all other numeric features float32. Like enforce_feature_order, the first
+    column is the to be predicted variable; it keeps its dtype, as does the
+    "horizon" column. Non numeric columns are not changed.
+
+    The float32 and uint8 columns together convert to a float32 matrix, so the
+    regressors get their input without a conversion to float64.
+
+    Args:
+        input_data (pd.DataFrame): Input data with features.
+
+    Returns:
+        pd.DataFrame: Input data with compact feature dtypes
+    """
+    dtypes = {}
+    for column, dtype in input_data.dtypes.iloc[1:].items():
+        if column == "horizon" or not pd.api.types.is_numeric_dtype(dtype):
+            continue
+
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            values = input_data[column]
+            if not values.isna().any() and values.min() >= 0 and values.max() <= 255:
+                dtypes[column] = FLAG_DTYPE
+                continue
+
+        dtypes[column] = FEATURE_DTYPE
+
+    return input_data.astype(dtypes, copy=False)
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from datetime import timedelta, datetime
+from functools import lru_cache
 from typing import Tuple
 
 import holidays
@@ -14,6 +15,8 @@ from openstf import PROJECT_ROOT
 HOLIDAY_CSV_PATH: str = (
     PROJECT_ROOT / "openstf" / "data" / "dutch_holidays_2020-2022.csv"
 )
+# Number of holiday calendars (country, years, csv) kept in memory
+HOLIDAY_CACHE_SIZE: int = 8
 
 
 def generate_holiday_feature_functions(
@@ -58,6 +61,19 @@ def generate_holiday_feature_functions(
         now = datetime.now()
         years = [now.year - 1, now.year]
 
+    # The calendar only changes with its arguments, it is built once per process
+    return dict(
+        _generate_holiday_feature_functions(
+            country, tuple(years), path_to_school_holidays_csv
+        )
+    )
+
+
+@lru_cache(maxsize=HOLIDAY_CACHE_SIZE)
+def _generate_holiday_feature_functions(
+    country: str, years: tuple, path_to_school_holidays_csv: str
+) -> dict:
+    years = list(years)
     country_holidays = holidays.CountryHoliday(country, years=years)
 
     # Make holiday function dict
@@ -5,8 +5,8 @@
 import base64
 
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+# Plotly is slow to import, it is imported in the functions that make the figures
 
 
 def plot_feature_importance(feature_importance):
@@ -20,6 +20,8 @@ def plot_feature_importance(feature_importance):
         plotly.graph_objects.Figure: A treemap of the features.
 
     """
+    import plotly.graph_objects as go
+
     feature_importance["parent"] = "Feature importance"
 
     return go.Figure(
@@ -131,6 +133,9 @@ def _plot_data(names, series):
         plotly.graph_objects.Figure: A line plot of each passed series.
 
     """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     # Build a combined DataFrame with all data.
     # This step is important to create forced NaNs to create gaps in the plot.
     combined = []
@@ -176,6 +181,9 @@ def _plot_data_and_predictions(names, actuals, predictions):
         plotly.graph_objects.Figure: A line plot of each passed series.
 
     """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     # Build a combined DataFrame with all data.
     # This step is important to create forced NaNs to create gaps in the plot.
     combined = []
@@ -316,14 +316,11 @@ def xgb_quantile_eval(preds, dmatrix, quantile=0.2):
     https://gist.github.com/Nikolay-Lysenko/06769d701c1d9c9acb9a66f2f9d7a6c7
 
     """
-    labels = dmatrix.get_label()
-    return (
-        "q{}_loss".format(quantile),
-        np.nanmean(
-            (preds >= labels) * (1 - quantile) * (preds - labels)
-            + (preds < labels) * quantile * (labels - preds)
-        ),
-    )
+    errors = dmatrix.get_label() - preds
+    # Pinball loss: quantile * error for underestimations and
+    # (quantile - 1) * error for overestimations, computed in place
+    loss = np.maximum(quantile * errors, (quantile - 1) * errors, out=errors)
+    return "q{}_loss".format(quantile), np.nanmean(loss)
 
 
 def xgb_quantile_obj(preds, dmatrix, quantile=0.2):
@@ -356,13 +353,13 @@ def xgb_quantile_obj(preds, dmatrix, quantile=0.2):
     except AssertionError:
         raise ValueError("Quantile value must be float between 0 and 1.")
 
-    labels = dmatrix.get_label()
-    errors = preds - labels
-
-    left_mask = errors < 0
-    right_mask = errors > 0
+    errors = preds - dmatrix.get_label()
 
-    grad = -quantile * left_mask + (1 - quantile) * right_mask
-    hess = np.ones_like(preds)
+    # Gradients are created as float32 directly, this is the dtype XGBoost uses
+    # internally and prevents an element-wise conversion when passing them on
+    grad = np.zeros(errors.shape, dtype=np.float32)
+    grad[errors < 0] = -quantile
+    grad[errors > 0] = 1 - quantile
+    hess = np.ones(errors.shape, dtype=np.float32)
 
     return grad, hess
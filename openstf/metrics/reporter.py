@@ -3,13 +3,16 @@
 # SPDX-License-Identifier: MPL-2.0
 import warnings
 from dataclasses import dataclass
-from typing import Dict
+from typing import TYPE_CHECKING, Dict
 
 import numpy as np
 import pandas as pd
 import sklearn
-from mlflow.models import infer_signature, ModelSignature
-from plotly.graph_objects import Figure
+
+if TYPE_CHECKING:
+    # MLflow and plotly are slow to import, only needed here for type annotations
+    from mlflow.models import ModelSignature
+    from plotly.graph_objects import Figure
 
 from openstf.metrics import figure
 from openstf.metrics.metrics import bias, nsme, mae, r_mae, rmse
@@ -20,15 +23,20 @@ from openstf.model.regressors.regressor import OpenstfRegressor
 class Report:
     def __init__(
         self,
-        feature_importance_figure: Figure,
-        data_series_figures: Dict[str, Figure],
+        feature_importance_figure: "Figure",
+        data_series_figures: Dict[str, "Figure"],
         metrics: dict,
-        signature: ModelSignature,
+        signature: "ModelSignature",
+        validation_forecast: np.array = None,
     ):
         self.feature_importance_figure = feature_importance_figure
         self.data_series_figures = data_series_figures
         self.metrics = metrics
         self.signature = signature
+        # Forecast of the model for the validation data, reused by comparisons
+        self.validation_forecast = validation_forecast
+        # Per horizon comparison with the old model, if the model was compared
+        self.model_comparison = None
 
 
 class Reporter:
@@ -52,15 +60,20 @@ class Reporter:
     def generate_report(
         self,
         model: OpenstfRegressor,
+        validation_forecast: np.array = None,
     ) -> Report:
         """Generate a report on a given model
 
         Args:
             model (OpenstfRegressor): the model to create a report on
+            validation_forecast (np.array, optional): Forecast of the model for the
+                validation data, when already predicted.
 
         Returns:
             Report: reporter object containing info about the model
         """
+        from mlflow.models import infer_signature
+
         # Get training (input_data_list[0]) and validation (input_data_list[1]) set
         train_x, train_y = (
             self.input_data_list[0].iloc[:, 1:-1],
@@ -71,7 +84,8 @@ class Reporter:
             self.input_data_list[1].iloc[:, 0],
         )
 
-        data_series_figures = self._make_data_series_figures(model)
+        data_series_figures = self._make_data_series_figures(model, validation_forecast)
+        validation_forecast = self.predicted_data_list[1]["forecast"].to_numpy()
 
         # feature_importance_dataframe should be a dataframe, to create a figure
         # can be None if we have no feature importance
@@ -88,8 +102,9 @@ class Reporter:
             report = Report(
                 data_series_figures=data_series_figures,
                 feature_importance_figure=feature_importance_figure,
-                metrics=self.get_metrics(model.predict(valid_x), valid_y),
+                metrics=self.get_metrics(validation_forecast, valid_y),
                 signature=infer_signature(train_x, train_y),
+                validation_forecast=validation_forecast,
             )
 
         return report
@@ -123,12 +138,17 @@ class Reporter:
                 continue
         return results
 
-    def _make_data_series_figures(self, model: OpenstfRegressor) -> dict:
-        # Make model predictions
-        for data_set in self.input_data_list:
-            # First ("load") and last ("horizon") are removed here
-            # as they are not expected by the model as prediction input
-            model_forecast = model.predict(data_set.iloc[:, 1:-1])
+    def _make_data_series_figures(
+        self, model: OpenstfRegressor, validation_forecast: np.array = None
+    ) -> dict:
+        # Make model predictions, the validation data may be predicted already
+        for i, data_set in enumerate(self.input_data_list):
+            if i == 1 and validation_forecast is not None:
+                model_forecast = validation_forecast
+            else:
+                # First ("load") and last ("horizon") are removed here
+                # as they are not expected by the model as prediction input
+                model_forecast = model.predict(data_set.iloc[:, 1:-1])
             forecast = pd.DataFrame(
                 index=data_set.index, data={"forecast": model_forecast}
             )
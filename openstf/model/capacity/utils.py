@@ -4,11 +4,11 @@
 
 from datetime import datetime
 
-import cufflinks as cf
 import numpy as np
 import pandas as pd
 
-cf.go_offline()
+# Cufflinks is imported (and set to offline mode) on first use, see _enable_cufflinks
+_cufflinks_enabled = False
 
 
 def balance_classes(x, y):
@@ -112,7 +112,8 @@ def visualize_predictions(df, classes):
         i += 1
     df.columns = columns
 
-    # make plot
+    # make plot, cufflinks adds the iplot method to pandas objects
+    _enable_cufflinks()
     fig = df.iplot(
         kind="heatmap",
         colorscale="blues",
@@ -124,3 +125,15 @@ def visualize_predictions(df, classes):
     )
 
     return fig
+
+
+def _enable_cufflinks():
+    """Imports cufflinks and sets it to offline mode, only once per process."""
+    global _cufflinks_enabled
+    if _cufflinks_enabled:
+        return
+
+    import cufflinks as cf
+
+    cf.go_offline()
+    _cufflinks_enabled = True
@@ -97,13 +97,14 @@ class ConfidenceIntervalApplicator:
         if standard_deviation.stdev.isnull().values.all():
             raise ModelWithoutStDev("All stdev values are NA")
 
-        # Fill stdev nans with the mean of all stdev values
+        # Fill stdev nans with the mean of all stdev values, on a copy because the
+        # model (and the loaded model cache) keeps the standard deviation
         if standard_deviation.stdev.isnull().values.any():
             self.logger.warning(
                 "Stdev for some hours is not known, filling in with mean."
             )
-            standard_deviation["stdev"] = standard_deviation.stdev.fillna(
-                standard_deviation.stdev.mean()
+            standard_deviation = standard_deviation.assign(
+                stdev=standard_deviation.stdev.fillna(standard_deviation.stdev.mean())
             )
 
         # -------- Moved from feature_engineering.add_stdev ------------------------- #
@@ -208,10 +209,13 @@ class ConfidenceIntervalApplicator:
                 columns added.
         """
 
-        for quantile in quantiles:
+        # Predict all quantiles at once, this converts the input data only once
+        quantile_forecasts = self.model.predict_quantiles(
+            self.forecast_input_data, quantiles=quantiles
+        )
+
+        for i, quantile in enumerate(quantiles):
             quantile_key = f"quantile_P{quantile * 100:02.0f}"
-            forecast[quantile_key] = self.model.predict(
-                self.forecast_input_data, quantile=quantile
-            )
+            forecast[quantile_key] = quantile_forecasts[:, i]
 
         return forecast
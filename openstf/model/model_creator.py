@@ -7,6 +7,7 @@ from sklearn.base import RegressorMixin
 
 from openstf.enums import MLModelType
 from openstf.model.regressors.lgbm import LGBMOpenstfRegressor
+from openstf.model.regressors.lgbm_quantile import LGBMQuantileOpenstfRegressor
 from openstf.model.regressors.regressor import OpenstfRegressor
 from openstf.model.regressors.xgb import XGBOpenstfRegressor
 from openstf.model.regressors.xgb_quantile import XGBQuantileOpenstfRegressor
@@ -70,6 +71,24 @@ valid_model_kwargs = {
         "subsample",
         "min_child_weight",
         "max_depth",
+        "n_jobs",
+        "n_parallel_quantiles",
+    ],
+    MLModelType.LGB_QUANTILE: [
+        "quantiles",
+        "learning_rate",
+        "n_estimators",
+        "num_leaves",
+        "max_depth",
+        "min_child_samples",
+        "min_child_weight",
+        "min_split_gain",
+        "subsample",
+        "subsample_freq",
+        "colsample_bytree",
+        "reg_alpha",
+        "reg_lambda",
+        "n_jobs",
     ],
 }
 
@@ -82,6 +101,7 @@ class ModelCreator:
         MLModelType.XGB: XGBOpenstfRegressor,
         MLModelType.LGB: LGBMOpenstfRegressor,
         MLModelType.XGB_QUANTILE: XGBQuantileOpenstfRegressor,
+        MLModelType.LGB_QUANTILE: LGBMQuantileOpenstfRegressor,
     }
 
     @staticmethod
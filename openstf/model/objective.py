@@ -1,9 +1,10 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
+import math
 from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-import optuna
 import pandas as pd
 
 from openstf.enums import MLModelType
@@ -13,11 +14,18 @@ from openstf.model.regressors.regressor import OpenstfRegressor
 from openstf.model.standard_deviation_generator import StandardDeviationGenerator
 from openstf.model_selection.model_selection import split_data_train_validation_test
 
+if TYPE_CHECKING:
+    # Optuna is slow to import, it is imported where the pruning callbacks are made
+    import optuna
+
 EARLY_STOPPING_ROUNDS: int = 10
 TEST_FRACTION: float = 0.1
 VALIDATION_FRACTION: float = 0.1
 # See https://xgboost.readthedocs.io/en/latest/parameter.html for all possibilities
 EVAL_METRIC: str = "mae"
+# Fractions of the training days used by the low fidelity rungs of a multi-fidelity
+# search, with successive halving a third of the trials continues to the next rung
+FIDELITY_FRACTIONS: Tuple[float, ...] = (1 / 9, 1 / 3)
 
 # https://optuna.readthedocs.io/en/stable/faq.html#objective-func-additional-args
 
@@ -45,7 +53,33 @@ class RegressorObjective:
         validation_fraction=VALIDATION_FRACTION,
         eval_metric=EVAL_METRIC,
         verbose=False,
+        warm_start_params: Optional[List[dict]] = None,
+        search_space_fraction: Optional[float] = None,
+        fidelity_fractions: Optional[Tuple[float, ...]] = None,
     ):
+        """Initialize the objective.
+
+        Args:
+            model (OpenstfRegressor): Model that is trained in every trial
+            input_data (pd.DataFrame): Input data with features
+            test_fraction (float, optional): Fraction of the data used for testing
+            validation_fraction (float, optional): Fraction of the data used for
+                validation
+            eval_metric (str, optional): Metric that is minimized
+            verbose (bool, optional): Verbose training
+            warm_start_params (list of dict, optional): Good hyperparameters, for
+                example of the previous optimization, around which the search space
+                is narrowed.
+            search_space_fraction (float, optional): Narrow the range of every
+                numerical hyperparameter to the range of the warm start params
+                extended by this fraction of the full range (at both sides).
+                Defaults to searching the full ranges.
+            fidelity_fractions (tuple of float, optional): Multi-fidelity search,
+                every trial is first trained on these (increasing) fractions of the
+                training days. The validation score of every rung is reported to
+                the pruner, only trials that are not pruned are trained on all data.
+                Defaults to training every trial on all data.
+        """
         self.input_data = input_data
         self.train_data = None
         self.validation_data = None
@@ -57,55 +91,38 @@ class RegressorObjective:
         self.eval_metric = eval_metric
         self.eval_metric_function = metrics.get_eval_metric_function(eval_metric)
         self.verbose = verbose
+        self.warm_start_params = warm_start_params or []
+        self.search_space_fraction = search_space_fraction
+        self.fidelity_fractions = fidelity_fractions or ()
+        self._fidelity_data = {}
         # Should be set on a derived classes
         self.model_type = None
         self.track_trials = {}
 
     def __call__(
         self,
-        trial: optuna.trial.FrozenTrial,
+        trial: "optuna.trial.FrozenTrial",
     ) -> float:
         """Optuna objective function.
 
+        The data is split only once, at the first trial, all trials of the study are
+        trained and evaluated on the same train, validation and test data. This
+        makes the scores of the trials comparable and saves splitting the data for
+        every trial.
+
         Args: trial
 
         Returns:
             float: Mean absolute error for this trial.
         """
-        # Perform data preprocessing
-        (
-            peaks,
-            peaks_val_train,
-            self.train_data,
-            self.validation_data,
-            self.test_data,
-        ) = split_data_train_validation_test(
-            self.input_data,
-            test_fraction=self.test_fraction,
-            validation_fraction=self.validation_fraction,
-            back_test=True,
-        )
+        if self.train_data is None:
+            self.split_data()
 
-        # Test if first column is "load" and last column is "horizon"
-        if (
-            self.train_data.columns[0] != "load"
-            or self.train_data.columns[-1] != "horizon"
-        ):
-            raise RuntimeError(
-                "Column order in train input data not as expected, "
-                "could not train a model!"
-            )
-
-        # Split in x, y data (x are the features, y is the load)
-        train_x, train_y = self.train_data.iloc[:, 1:-1], self.train_data.iloc[:, 0]
-        valid_x, valid_y = (
-            self.validation_data.iloc[:, 1:-1],
-            self.validation_data.iloc[:, 0],
-        )
-        test_x, test_y = self.test_data.iloc[:, 1:-1], self.test_data.iloc[:, 0]
+        train_x, train_y = self.train_x, self.train_y
+        test_x, test_y = self.test_x, self.test_y
 
         # Configure evals for early stopping
-        eval_set = [(train_x, train_y), (valid_x, valid_y)]
+        eval_set = [(train_x, train_y), (self.valid_x, self.valid_y)]
 
         # get the parameters used in this trial
         hyper_params = self.get_params(trial)
@@ -113,8 +130,16 @@ class RegressorObjective:
         # insert parameters into model
         self.model.set_params(**hyper_params)
 
-        # create the specific pruning callback
-        pruning_callback = self.get_pruning_callback(trial)
+        # Cheap rungs first, a bad configuration is pruned before it is trained on
+        # all data
+        for step, fraction in enumerate(self.fidelity_fractions, start=1):
+            self.run_fidelity_rung(trial, step, fraction)
+
+        # create the specific pruning callback, with a multi-fidelity search the
+        # pruner acts on the rungs instead of the boosting rounds
+        pruning_callback = None
+        if len(self.fidelity_fractions) == 0:
+            pruning_callback = self.get_pruning_callback(trial)
         if pruning_callback is None:
             callbacks = None
         else:
@@ -147,7 +172,145 @@ class RegressorObjective:
         }
         return score
 
-    def get_params(self, trial: optuna.trial.FrozenTrial) -> dict:
+    def run_fidelity_rung(
+        self, trial: "optuna.trial.FrozenTrial", step: int, fraction: float
+    ) -> None:
+        """Train on a fraction of the training days and report the validation score.
+
+        Args:
+            trial: Trial
+            step (int): Rung of the trial, used as step of the reported score
+            fraction (float): Fraction of the training days
+
+        Raises:
+            optuna.TrialPruned: When the pruner prunes the trial after this rung.
+        """
+        import optuna
+
+        train_x, train_y = self.get_fidelity_data(fraction)
+        self.model.fit(
+            train_x,
+            train_y,
+            eval_set=[(train_x, train_y), (self.valid_x, self.valid_y)],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            verbose=self.verbose,
+            eval_metric=self.eval_metric,
+        )
+        score = self.eval_metric_function(
+            self.valid_y, self.model.predict(self.valid_x)
+        )
+
+        trial.report(score, step)
+        if trial.should_prune():
+            raise optuna.TrialPruned(f"Pruned at rung {step} with score {score}")
+
+    def get_fidelity_data(self, fraction: float) -> Tuple[pd.DataFrame, pd.Series]:
+        """Get the training data of a fraction of the training days.
+
+        The days are evenly spread over the training period, so every season in the
+        training data is still represented.
+
+        Args:
+            fraction (float): Fraction of the training days
+
+        Returns:
+            Tuple[pd.DataFrame, pd.Series]: Features and load
+        """
+        if fraction not in self._fidelity_data:
+            days = self.train_x.index.normalize()
+            unique_days = days.unique()
+            step = max(1, round(1 / fraction))
+            selected = days.isin(unique_days[::step])
+            self._fidelity_data[fraction] = (
+                self.train_x[selected],
+                self.train_y[selected],
+            )
+        return self._fidelity_data[fraction]
+
+    def split_data(self) -> None:
+        """Split the input data in train, validation and test data for the study.
+
+        Raises:
+            RuntimeError: When the first column is not "load" or the last column is
+                not "horizon".
+        """
+        (
+            peaks,
+            peaks_val_train,
+            train_data,
+            validation_data,
+            test_data,
+        ) = split_data_train_validation_test(
+            self.input_data,
+            test_fraction=self.test_fraction,
+            validation_fraction=self.validation_fraction,
+            back_test=True,
+        )
+
+        # Test if first column is "load" and last column is "horizon"
+        if train_data.columns[0] != "load" or train_data.columns[-1] != "horizon":
+            raise RuntimeError(
+                "Column order in train input data not as expected, "
+                "could not train a model!"
+            )
+
+        self.train_data = train_data
+        self.validation_data = validation_data
+        self.test_data = test_data
+        self._fidelity_data = {}
+
+        # Split in x, y data (x are the features, y is the load), these are reused
+        # by every trial
+        self.train_x, self.train_y = train_data.iloc[:, 1:-1], train_data.iloc[:, 0]
+        self.valid_x, self.valid_y = (
+            validation_data.iloc[:, 1:-1],
+            validation_data.iloc[:, 0],
+        )
+        self.test_x, self.test_y = test_data.iloc[:, 1:-1], test_data.iloc[:, 0]
+
+    def suggest_float(
+        self, trial: "optuna.trial.FrozenTrial", name: str, low: float, high: float
+    ) -> float:
+        """Suggest a float hyperparameter in the (narrowed) search space."""
+        low, high = self.narrow_range(name, low, high)
+        return trial.suggest_float(name, low, high)
+
+    def suggest_int(
+        self, trial: "optuna.trial.FrozenTrial", name: str, low: int, high: int
+    ) -> int:
+        """Suggest an integer hyperparameter in the (narrowed) search space."""
+        low, high = self.narrow_range(name, low, high)
+        return trial.suggest_int(name, math.floor(low), math.ceil(high))
+
+    def narrow_range(self, name: str, low: float, high: float) -> Tuple[float, float]:
+        """Narrow the range of a hyperparameter around the warm start params.
+
+        Args:
+            name (str): Name of the hyperparameter
+            low (float): Lower bound of the full range
+            high (float): Upper bound of the full range
+
+        Returns:
+            Tuple[float, float]: Lower and upper bound of the narrowed range, the
+                full range when narrowing is disabled or no warm start params have
+                a value in the full range.
+        """
+        if self.search_space_fraction is None:
+            return low, high
+
+        values = [
+            params[name]
+            for params in self.warm_start_params
+            if isinstance(params.get(name), (int, float))
+            and low <= params[name] <= high
+        ]
+        if len(values) == 0:
+            return low, high
+
+        margin = self.search_space_fraction * (high - low)
+        return max(low, min(values) - margin), min(high, max(values) + margin)
+
+    def get_params(self, trial: "optuna.trial.FrozenTrial") -> dict:
         """get parameters for objective without model specific get_params function.
 
         Args: trial
@@ -156,14 +319,14 @@ class RegressorObjective:
             dict: {parameter: hyperparameter_value}
         """
         default_params = {
-            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.2),
-            "alpha": trial.suggest_float("alpha", 1e-8, 1.0),
-            "lambda": trial.suggest_float("lambda", 1e-8, 1.0),
-            "subsample": trial.suggest_float("subsample", 0.5, 0.99),
-            "min_child_weight": trial.suggest_int("min_child_weight", 1, 6),
-            "max_depth": trial.suggest_int("max_depth", 3, 10),
-            "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0),
-            "max_delta_step": trial.suggest_int("max_delta_step", 1, 10),
+            "learning_rate": self.suggest_float(trial, "learning_rate", 0.01, 0.2),
+            "alpha": self.suggest_float(trial, "alpha", 1e-8, 1.0),
+            "lambda": self.suggest_float(trial, "lambda", 1e-8, 1.0),
+            "subsample": self.suggest_float(trial, "subsample", 0.5, 0.99),
+            "min_child_weight": self.suggest_int(trial, "min_child_weight", 1, 6),
+            "max_depth": self.suggest_int(trial, "max_depth", 3, 10),
+            "colsample_bytree": self.suggest_float(trial, "colsample_bytree", 0.5, 1.0),
+            "max_delta_step": self.suggest_int(trial, "max_delta_step", 1, 10),
         }
 
         # Compare the list to the default parameter space
@@ -174,7 +337,7 @@ class RegressorObjective:
 
         return params
 
-    def get_pruning_callback(self, trial: optuna.trial.FrozenTrial):
+    def get_pruning_callback(self, trial: "optuna.trial.FrozenTrial"):
         return None
 
     def get_trial_track(self) -> dict:
@@ -208,7 +371,7 @@ class XGBRegressorObjective(RegressorObjective):
         self.model_type = MLModelType.XGB
 
     # extend the parameters with the model specific ones per implementation
-    def get_params(self, trial: optuna.trial.FrozenTrial) -> dict:
+    def get_params(self, trial: "optuna.trial.FrozenTrial") -> dict:
         """get parameters for XGB Regressor Objective
         with objective specific parameters.
 
@@ -222,12 +385,14 @@ class XGBRegressorObjective(RegressorObjective):
 
         # XGB specific parameters
         params = {
-            "gamma": trial.suggest_float("gamma", 1e-8, 1.0),
+            "gamma": self.suggest_float(trial, "gamma", 1e-8, 1.0),
             "booster": trial.suggest_categorical("booster", ["gbtree", "dart"]),
         }
         return {**model_params, **params}
 
-    def get_pruning_callback(self, trial: optuna.trial.FrozenTrial):
+    def get_pruning_callback(self, trial: "optuna.trial.FrozenTrial"):
+        import optuna
+
         return optuna.integration.XGBoostPruningCallback(
             trial, observation_key=f"validation_1-{self.eval_metric}"
         )
@@ -238,7 +403,7 @@ class LGBRegressorObjective(RegressorObjective):
         super().__init__(*args, **kwargs)
         self.model_type = MLModelType.LGB
 
-    def get_params(self, trial: optuna.trial.FrozenTrial) -> dict:
+    def get_params(self, trial: "optuna.trial.FrozenTrial") -> dict:
         """get parameters for LGB Regressor Objective
         with objective specific parameters.
 
@@ -252,20 +417,22 @@ class LGBRegressorObjective(RegressorObjective):
 
         # LGB specific parameters
         params = {
-            "num_leaves": trial.suggest_int("num_leaves", 16, 62),
+            "num_leaves": self.suggest_int(trial, "num_leaves", 16, 62),
             "boosting_type": trial.suggest_categorical(
                 "boosting_type", ["gbdt", "dart", "rf"]
             ),
             "tree_learner": trial.suggest_categorical(
                 "tree_learner", ["serial", "feature", "data", "voting"]
             ),
-            "n_estimators": trial.suggest_int("n_estimators", 50, 150),
-            "min_split_gain": trial.suggest_float("min_split_gain", 1e-8, 1),
-            "subsample_freq": trial.suggest_int("subsample_freq", 1, 10),
+            "n_estimators": self.suggest_int(trial, "n_estimators", 50, 150),
+            "min_split_gain": self.suggest_float(trial, "min_split_gain", 1e-8, 1),
+            "subsample_freq": self.suggest_int(trial, "subsample_freq", 1, 10),
         }
         return {**model_params, **params}
 
-    def get_pruning_callback(self, trial: optuna.trial.FrozenTrial):
+    def get_pruning_callback(self, trial: "optuna.trial.FrozenTrial"):
+        import optuna
+
         metric = self.eval_metric
         if metric == "mae":
             metric = "l1"
@@ -279,7 +446,7 @@ class XGBQuantileRegressorObjective(RegressorObjective):
         super().__init__(*args, **kwargs)
         self.model_type = MLModelType.XGB_QUANTILE
 
-    def get_params(self, trial: optuna.trial.FrozenTrial) -> dict:
+    def get_params(self, trial: "optuna.trial.FrozenTrial") -> dict:
         """get parameters for XGBQuantile Regressor Objective
         with objective specific parameters.
 
@@ -293,11 +460,50 @@ class XGBQuantileRegressorObjective(RegressorObjective):
 
         # XGB specific parameters
         params = {
-            "gamma": trial.suggest_float("gamma", 1e-8, 1.0),
+            "gamma": self.suggest_float(trial, "gamma", 1e-8, 1.0),
         }
         return {**model_params, **params}
 
-    def get_pruning_callback(self, trial: optuna.trial.FrozenTrial):
+    def get_pruning_callback(self, trial: "optuna.trial.FrozenTrial"):
+        import optuna
+
         return optuna.integration.XGBoostPruningCallback(
             trial, observation_key=f"validation_1-{self.eval_metric}"
         )
+
+
+class LGBQuantileRegressorObjective(RegressorObjective):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model_type = MLModelType.LGB_QUANTILE
+
+    def get_params(self, trial: "optuna.trial.FrozenTrial") -> dict:
+        """get parameters for LGBQuantile Regressor Objective
+        with objective specific parameters.
+
+            Args: trial
+
+            Returns:
+                dict: {parameter: hyperparameter_value}
+        """
+        # Filtered default parameters
+        model_params = super().get_params(trial)
+
+        # LGB specific parameters
+        params = {
+            "num_leaves": self.suggest_int(trial, "num_leaves", 16, 62),
+            "n_estimators": self.suggest_int(trial, "n_estimators", 50, 150),
+            "min_split_gain": self.suggest_float(trial, "min_split_gain", 1e-8, 1),
+            "subsample_freq": self.suggest_int(trial, "subsample_freq", 1, 10),
+        }
+        return {**model_params, **params}
+
+    def get_pruning_callback(self, trial: "optuna.trial.FrozenTrial"):
+        import optuna
+
+        metric = self.eval_metric
+        if metric == "mae":
+            metric = "l1"
+        return optuna.integration.LightGBMPruningCallback(
+            trial, metric=metric, valid_name="valid_1"
+        )
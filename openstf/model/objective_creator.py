@@ -10,6 +10,7 @@ from openstf.model.objective import (
     XGBRegressorObjective,
     LGBRegressorObjective,
     XGBQuantileRegressorObjective,
+    LGBQuantileRegressorObjective,
 )
 
 
@@ -18,6 +19,7 @@ class ObjectiveCreator:
         MLModelType.XGB: XGBRegressorObjective,
         MLModelType.LGB: LGBRegressorObjective,
         MLModelType.XGB_QUANTILE: XGBQuantileRegressorObjective,
+        MLModelType.LGB_QUANTILE: LGBQuantileRegressorObjective,
     }
 
     @staticmethod
@@ -0,0 +1,223 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+from typing import List, Tuple
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.utils.validation import check_X_y, check_array, check_is_fitted
+
+from openstf.model.regressors.regressor import OpenstfRegressor
+
+DEFAULT_QUANTILES: Tuple[float, ...] = (0.9, 0.5, 0.1)
+
+
+class LGBMQuantileOpenstfRegressor(OpenstfRegressor):
+    @staticmethod
+    def _get_importance_names():
+        return {
+            "gain_importance_name": "gain",
+            "weight_importance_name": "split",
+        }
+
+    def __init__(
+        self,
+        quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+        learning_rate: float = 0.1,
+        n_estimators: int = 100,
+        num_leaves: int = 31,
+        max_depth: int = -1,
+        min_child_samples: int = 20,
+        min_child_weight: float = 1e-3,
+        min_split_gain: float = 0.0,
+        subsample: float = 1.0,
+        subsample_freq: int = 0,
+        colsample_bytree: float = 1.0,
+        reg_alpha: float = 0.0,
+        reg_lambda: float = 0.0,
+        n_jobs: int = -1,
+    ):
+        """Initialize LGBMQuantileRegressor
+
+            Model that provides quantile regression with LightGBM.
+            For each desired quantile a LightGBM model is trained with the native
+            quantile objective, these can later be used to predict quantiles.
+
+        Args:
+            quantiles (tuple): Tuple with desired quantiles, quantile 0.5 is required.
+                For example: (0.1, 0.5, 0.9)
+        """
+        super().__init__()
+        # Check if quantile 0.5 is pressent this is required
+        if 0.5 not in quantiles:
+            raise ValueError(
+                "Cannot train quantile model as 0.5 is not in requested quantiles!"
+            )
+
+        self.quantiles = quantiles
+
+        # Set attributes for hyper parameters
+        self.learning_rate = learning_rate
+        self.n_estimators = n_estimators
+        self.num_leaves = num_leaves
+        self.max_depth = max_depth
+        self.min_child_samples = min_child_samples
+        self.min_child_weight = min_child_weight
+        self.min_split_gain = min_split_gain
+        self.subsample = subsample
+        self.subsample_freq = subsample_freq
+        self.colsample_bytree = colsample_bytree
+        self.reg_alpha = reg_alpha
+        self.reg_lambda = reg_lambda
+        self.n_jobs = n_jobs
+
+    def fit(self, x: np.array, y: np.array, **kwargs) -> OpenstfRegressor:
+        """Fits lgb quantile model
+
+            The training data is converted to a LightGBM Dataset once, which is
+            shared by the models of all quantiles.
+
+        Args:
+            x (np.array): Feature matrix
+            y (np.array): Labels
+
+        Returns:
+            Fitted LGBMQuantile model
+
+        """
+
+        early_stopping_rounds = kwargs.get("early_stopping_rounds", None)
+        eval_set = kwargs.get("eval_set", None)
+        eval_metric = kwargs.get("eval_metric", None)
+        callbacks = kwargs.get("callbacks", None)
+
+        # Check/validate input
+        check_X_y(x, y, force_all_finite="allow-nan")
+
+        # Convert x and y to a dataset, the binned dataset is reused for all quantiles
+        dtrain = lgb.Dataset(x, label=y)
+
+        # Define validation sets if eval_set is defined, the last (validation) set
+        # will be used for early stopping. The names are equal to the names used by
+        # the LightGBM sklearn API
+        if eval_set:
+            dval = lgb.Dataset(eval_set[-1][0], label=eval_set[-1][1], reference=dtrain)
+            valid_sets, valid_names = [dtrain, dval], ["valid_0", "valid_1"]
+        else:
+            valid_sets, valid_names = None, None
+
+        # Get fitting parameters, the sklearn names are aliases of the lgb parameters
+        lgb_params = {
+            key: value
+            for key, value in self.get_params().items()
+            if key not in ["quantiles", "n_estimators"]
+        }
+        lgb_params.update(objective="quantile", verbose=-1)
+        if eval_metric is not None:
+            lgb_params["metric"] = eval_metric
+
+        quantile_models = {}
+
+        for quantile in self.quantiles:
+            # Train quantile model, pruning callbacks are only applied to the median
+            quantile_models[quantile] = lgb.train(
+                params={**lgb_params, "alpha": quantile},
+                train_set=dtrain,
+                num_boost_round=self.n_estimators,
+                valid_sets=valid_sets,
+                valid_names=valid_names,
+                early_stopping_rounds=early_stopping_rounds if eval_set else None,
+                verbose_eval=False,
+                callbacks=callbacks if quantile == 0.5 else None,
+            )
+
+        # Set weigths and features from the 0.5 (median) model
+        self.feature_importances_ = self.get_feature_importances_from_booster(
+            quantile_models[0.5]
+        )
+        self._Booster = quantile_models[0.5]  # Used for feature names later on
+        # Update state of the estimator
+        self.estimators_ = quantile_models
+        self.is_fitted_ = True
+
+        return self
+
+    def predict(self, x: np.array, quantile: float = 0.5) -> np.array:
+        """Makes a prediction for a desired quantile
+
+        Args:
+            x (np.array): Feature matrix
+            quantile (float): Quantile for which a prediciton is desired,
+            note that only quantile are available for which a model is trained,
+            and that this is a quantile-model specific keyword
+
+        Returns:
+            (np.array): prediction
+
+        Raises:
+            ValueError in case no model is trained for the requested quantile
+
+        """
+        return self.predict_quantiles(x, [quantile])[:, 0]
+
+    def predict_quantiles(self, x: np.array, quantiles: List[float]) -> np.array:
+        """Makes a prediction for multiple quantiles at once
+
+            The input is validated and converted to an array only once, after which
+            the model of every requested quantile predicts on that same array.
+
+        Args:
+            x (np.array): Feature matrix
+            quantiles (List[float]): Quantiles for which a prediction is desired,
+                note that only quantiles are available for which a model is trained
+
+        Returns:
+            (np.array): 2D array with shape (n_samples, n_quantiles), the columns
+                are in the same order as the requested quantiles
+
+        Raises:
+            ValueError in case no model is trained for one of the requested quantiles
+
+        """
+        # Check if model is trained for these quantiles
+        for quantile in quantiles:
+            if quantile not in self.quantiles:
+                raise ValueError("No model trained for requested quantile!")
+
+        # Check/validate input, this also converts the input to an array
+        x_array = check_array(x, force_all_finite="allow-nan")
+        check_is_fitted(self)
+
+        predictions = np.empty((x_array.shape[0], len(quantiles)))
+        for i, quantile in enumerate(quantiles):
+            booster = self.estimators_[quantile]
+            predictions[:, i] = booster.predict(
+                x_array, num_iteration=booster.best_iteration
+            )
+
+        return predictions
+
+    @classmethod
+    def get_feature_importances_from_booster(cls, booster: lgb.Booster) -> np.ndarray:
+        """Gets feauture importances from a LGB booster.
+
+        Args:
+            booster(Booster): Booster object,
+            most of the times the median model (quantile=0.5) is preferred
+
+        Returns:
+            (np.ndarray) with normalized feature importances
+
+        """
+        features_importance_array = booster.feature_importance(
+            importance_type="gain"
+        ).astype(np.float32)
+
+        total = features_importance_array.sum()  # For normalizing
+        if total == 0:
+            return features_importance_array
+        return features_importance_array / total  # Normalize
+
+    @property
+    def feature_names(self):
+        return self._Booster.feature_name()
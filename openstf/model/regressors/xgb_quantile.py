@@ -1,8 +1,10 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
+import os
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import xgboost as xgb
@@ -31,6 +33,8 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
         subsample: float = 0.9,
         min_child_weight: int = 4,
         max_depth: int = 4,
+        n_jobs: Optional[int] = None,
+        n_parallel_quantiles: int = 1,
     ):
         """Initialize XGBQuantileRegressor
 
@@ -41,6 +45,11 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
         Args:
             quantiles (tuple): Tuple with desired quantiles, quantile 0.5 is required.
                 For example: (0.1, 0.5, 0.9)
+            n_jobs (int, optional): Total number of threads used for training,
+                defaults to all available cores.
+            n_parallel_quantiles (int): Number of quantile models that are trained
+                concurrently, the threads of n_jobs are divided over these.
+                Defaults to 1, which trains the quantile models one after another.
         """
         super().__init__()
         # Check if quantile 0.5 is pressent this is required
@@ -58,9 +67,17 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
         self.gamma = gamma
         self.colsample_bytree = colsample_bytree
 
+        # Set attributes for the training thread budget
+        self.n_jobs = n_jobs
+        self.n_parallel_quantiles = n_parallel_quantiles
+
     def fit(self, x: np.array, y: np.array, **kwargs) -> OpenstfRegressor:
         """Fits xgb quantile model
 
+            The quantile models are divided over n_parallel_quantiles workers. Each
+            worker converts the input to a DMatrix once and trains its quantile models
+            on it, the workers run concurrently in a thread pool.
+
         Args:
             x (np.array): Feature matrix
             y (np.array): Labels
@@ -77,15 +94,81 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
         # Check/validate input
         check_X_y(x, y, force_all_finite="allow-nan")
 
-        # Convert x and y to dmatrix input
-        dtrain = xgb.DMatrix(x.copy(deep=True), label=y.copy(deep=True))
+        # Get fitting parameters - only those required for xgbooster's
+        xgb_regressor_params = {
+            key: value
+            for key, value in self.get_params().items()
+            if key in xgb.XGBRegressor().get_params().keys() and key != "n_jobs"
+        }
+
+        # Divide the quantiles over the workers, every worker gets its own DMatrix
+        # as XGBoost does not support training concurrently on the same DMatrix
+        n_workers = max(1, min(self.n_parallel_quantiles, len(self.quantiles)))
+        quantile_chunks = [self.quantiles[i::n_workers] for i in range(n_workers)]
+
+        # Divide the thread budget over the workers
+        if self.n_jobs is not None or n_workers > 1:
+            n_jobs = self.n_jobs if self.n_jobs is not None else os.cpu_count()
+            xgb_regressor_params["nthread"] = max(1, n_jobs // n_workers)
+
+        fit_quantiles = partial(
+            self._fit_quantiles,
+            x=x,
+            y=y,
+            eval_set=eval_set,
+            params=xgb_regressor_params,
+            early_stopping_rounds=early_stopping_rounds,
+        )
+
+        quantile_models = {}
+        if n_workers == 1:
+            quantile_models.update(fit_quantiles(quantile_chunks[0]))
+        else:
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                for models in executor.map(fit_quantiles, quantile_chunks):
+                    quantile_models.update(models)
+
+        # Set weigths and features from the 0.5 (median) model
+        self.feature_importances_ = self.get_feature_importances_from_booster(
+            quantile_models[0.5]
+        )
+        self._Booster = quantile_models[0.5]  # Used for feature names later on
+        # Update state of the estimator
+        self.estimators_ = quantile_models
+        self.is_fitted_ = True
+
+        return self
+
+    @staticmethod
+    def _fit_quantiles(
+        quantiles: Tuple[float, ...],
+        x: np.array,
+        y: np.array,
+        eval_set: Optional[list],
+        params: dict,
+        early_stopping_rounds: Optional[int],
+    ) -> Dict[float, Booster]:
+        """Train a quantile model for each of the given quantiles on one DMatrix
+
+        Args:
+            quantiles (tuple): Quantiles to train a model for
+            x (np.array): Feature matrix
+            y (np.array): Labels
+            eval_set (list, optional): Evaluation set, the last item is used for
+                early stopping
+            params (dict): XGBoost booster parameters
+            early_stopping_rounds (int, optional): Number of early stopping rounds
+
+        Returns:
+            dict: Trained booster per quantile
+
+        """
+        # Convert x and y to dmatrix input, the DMatrix holds its own copy of the data
+        dtrain = xgb.DMatrix(x, label=y)
 
         # Define watchlist if eval_set is defined
         if eval_set:
-            dval = xgb.DMatrix(
-                eval_set[1][0].copy(deep=True),
-                label=eval_set[1][1].copy(deep=True),
-            )
+            dval = xgb.DMatrix(eval_set[1][0], label=eval_set[1][1])
 
             # Define data set to be monitored during training, the last(validation)
             #  will be used for early stopping
@@ -93,16 +176,9 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
         else:
             watchlist = ()
 
-        # Get fitting parameters - only those required for xgbooster's
-        xgb_regressor_params = {
-            key: value
-            for key, value in self.get_params().items()
-            if key in xgb.XGBRegressor().get_params().keys()
-        }
-
         quantile_models = {}
 
-        for quantile in self.quantiles:
+        for quantile in quantiles:
             # Define objective callback functions specifically for desired quantile
             xgb_quantile_eval_this_quantile = partial(
                 metrics.xgb_quantile_eval, quantile=quantile
@@ -113,7 +189,7 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
 
             # Train quantile model
             quantile_models[quantile] = xgb.train(
-                params=xgb_regressor_params,
+                params=params,
                 dtrain=dtrain,
                 evals=watchlist,
                 # Can be large because we are early stopping anyway
@@ -124,16 +200,7 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
                 early_stopping_rounds=early_stopping_rounds,
             )
 
-        # Set weigths and features from the 0.5 (median) model
-        self.feature_importances_ = self.get_feature_importances_from_booster(
-            quantile_models[0.5]
-        )
-        self._Booster = quantile_models[0.5]  # Used for feature names later on
-        # Update state of the estimator
-        self.estimators_ = quantile_models
-        self.is_fitted_ = True
-
-        return self
+        return quantile_models
 
     def predict(self, x: np.array, quantile: float = 0.5) -> np.array:
         """Makes a prediction for a desired quantile
@@ -151,20 +218,46 @@ class XGBQuantileOpenstfRegressor(OpenstfRegressor):
             ValueError in case no model is trained for the requested quantile
 
         """
-        # Check if model is trained for this quantile
-        if quantile not in self.quantiles:
-            raise ValueError("No model trained for requested quantile!")
+        return self.predict_quantiles(x, [quantile])[:, 0]
+
+    def predict_quantiles(self, x: np.array, quantiles: List[float]) -> np.array:
+        """Makes a prediction for multiple quantiles at once
+
+            The input is validated and converted to a DMatrix only once, after which
+            the model of every requested quantile predicts on that same DMatrix.
+
+        Args:
+            x (np.array): Feature matrix
+            quantiles (List[float]): Quantiles for which a prediction is desired,
+                note that only quantiles are available for which a model is trained
+
+        Returns:
+            (np.array): 2D array with shape (n_samples, n_quantiles), the columns
+                are in the same order as the requested quantiles
+
+        Raises:
+            ValueError in case no model is trained for one of the requested quantiles
+
+        """
+        # Check if model is trained for these quantiles
+        for quantile in quantiles:
+            if quantile not in self.quantiles:
+                raise ValueError("No model trained for requested quantile!")
 
         # Check/validate input
         check_array(x, force_all_finite="allow-nan")
         check_is_fitted(self)
 
-        # Convert array to dmatrix
-        dmatrix_input = xgb.DMatrix(x.copy(deep=True))
+        # Convert array to dmatrix, the DMatrix holds its own copy of the data
+        dmatrix_input = xgb.DMatrix(x)
 
-        return self.estimators_[quantile].predict(
-            dmatrix_input, ntree_limit=self.estimators_[quantile].best_ntree_limit
-        )
+        predictions = np.empty((dmatrix_input.num_row(), len(quantiles)))
+        for i, quantile in enumerate(quantiles):
+            predictions[:, i] = self.estimators_[quantile].predict(
+                dmatrix_input, ntree_limit=self.estimators_[quantile].best_ntree_limit
+            )
+
+        return predictions
 
     @classmethod
     def get_feature_importances_from_booster(cls, booster: Booster) -> np.ndarray:
@@ -1,9 +1,12 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
+import copy
 import json
 import os
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import datetime
 from json import JSONDecodeError
 from pathlib import Path
@@ -11,27 +14,81 @@ from typing import List, Optional, Union, Tuple
 from urllib.parse import unquote, urlparse
 
 import joblib
-import mlflow
 import pandas as pd
 import pytz
 import structlog
-from matplotlib import figure
-from mlflow.exceptions import MlflowException
-from mlflow.tracking import MlflowClient
 from openstf.dataclasses.model_specifications import ModelSpecificationDataClass
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
-from plotly import graph_objects
 
 from openstf.metrics.reporter import Report
 from openstf.model.regressors.regressor import OpenstfRegressor
+from openstf.model.standard_deviation_updater import StandardDeviationUpdater
 
+# MLflow, matplotlib and plotly are slow to import, they are imported in the methods
+# that use them
 MODEL_FILENAME = "model.joblib"
+# Running standard deviation, saved next to the model it belongs to
+STANDARD_DEVIATION_FILENAME = "standard_deviation.json"
 FOLDER_DATETIME_FORMAT = "%Y%m%d%H%M%S"
 MODEL_ID_SEP = "-"
 MAX_N_MODELS = 10  # Number of models per experiment allowed in model registry
 E_MSG = "feature_names couldn't be loaded, using None"
 
 
+class LoadedModelCache:
+    def __init__(self, max_size: int = 0) -> None:
+        """Least recently used cache of loaded models, shared by all serializers.
+
+            The cache is disabled by default, so every load reads the model from
+            disk. A long running process (like the scheduler daemon) can enable it to
+            keep the most recently used models in memory. Keys should identify an
+            immutable model file, e.g. include its modification time.
+
+        Args:
+            max_size (int): Maximum number of cached models, 0 disables the cache
+        """
+        self.max_size = max_size
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resize(self, max_size: int) -> None:
+        with self._lock:
+            self.max_size = max_size
+            while len(self._models) > max(max_size, 0):
+                self._models.popitem(last=False)
+
+    def get(self, key, load):
+        """Get a model from the cache, or load it with load() on a miss.
+
+        A shallow copy is returned, so attributes set on the returned model (like
+        age and path) do not change the cached model. The standard deviation frame
+        is copied as well, so it can be changed in place.
+        """
+        if self.max_size <= 0:
+            return load()
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+
+        if model is None:
+            model = load()
+            with self._lock:
+                self._models[key] = model
+                while len(self._models) > self.max_size:
+                    self._models.popitem(last=False)
+
+        model = copy.copy(model)
+        standard_deviation = getattr(model, "standard_deviation", None)
+        if isinstance(standard_deviation, pd.DataFrame):
+            model.standard_deviation = standard_deviation.copy()
+        return model
+
+
+MODEL_CACHE = LoadedModelCache()
+
+
 class AbstractSerializer(ABC):
     def __init__(self, trained_models_folder: Union[Path, str]) -> None:
         """
@@ -91,6 +148,8 @@ class PersistentStorageSerializer(AbstractSerializer):
             **kwargs: Extra information to be logged with mlflow, this can add the extra modelspecs
 
         """
+        import mlflow
+
         experiment_id = self.setup_mlflow(pj["id"])
         try:
             # return the latest run of the model can be phase tag = training or hyperparameter tuning
@@ -137,6 +196,9 @@ class PersistentStorageSerializer(AbstractSerializer):
             OpenstfRegressor: Loaded model
             ModelSpecificationDataClass: model specifications
         """
+        import mlflow
+        from mlflow.exceptions import MlflowException
+
         # create basic modelspecs
         modelspecs = ModelSpecificationDataClass(id=pid)
 
@@ -149,8 +211,10 @@ class PersistentStorageSerializer(AbstractSerializer):
                 max_results=1,
             ).iloc[0]
 
-            loaded_model = mlflow.sklearn.load_model(
-                os.path.join(latest_run.artifact_uri, "model/")
+            # The artifacts of a finished run do not change
+            model_uri = os.path.join(latest_run.artifact_uri, "model/")
+            loaded_model = MODEL_CACHE.get(
+                model_uri, lambda: mlflow.sklearn.load_model(model_uri)
             )
 
             # get the parameters from the old model, we insert these later into the new model
@@ -186,6 +250,7 @@ class PersistentStorageSerializer(AbstractSerializer):
             uri = os.path.join(latest_run.artifact_uri, "model/")
             # Path without file:///
             loaded_model.path = unquote(urlparse(uri).path)
+            self._apply_standard_deviation_update(loaded_model)
             self.logger.info("Model successfully loaded with MLflow")
             return loaded_model, modelspecs
         # Catch possible errors
@@ -242,7 +307,10 @@ class PersistentStorageSerializer(AbstractSerializer):
         # Load most recent model from disk
         try:
             self.logger.debug(f"Trying to load model from: {model_path}")
-            loaded_model = joblib.load(model_path)
+            loaded_model = MODEL_CACHE.get(
+                (str(model_path), os.path.getmtime(model_path)),
+                lambda: joblib.load(model_path),
+            )
         except Exception as e:
             self.logger.error("Could not load most recent model!", exception=str(e))
             raise FileNotFoundError("Could not load model from the model file!")
@@ -256,9 +324,65 @@ class PersistentStorageSerializer(AbstractSerializer):
         # Add model age to model object
         loaded_model.age = model_age_in_days
         loaded_model.path = model_path
+        self._apply_standard_deviation_update(loaded_model)
         self.logger.info("Model loaded")
         return loaded_model
 
+    def save_standard_deviation_updater(
+        self, model: OpenstfRegressor, updater: StandardDeviationUpdater
+    ) -> None:
+        """Save the running standard deviation next to a loaded model.
+
+        Args:
+            model (OpenstfRegressor): Model loaded by this serializer
+            updater (StandardDeviationUpdater): Running standard deviation of the model
+        """
+        path = self._get_standard_deviation_path(model)
+        with open(path, "w") as file:
+            json.dump(updater.to_dict(), file)
+        self.logger.info("Standard deviation saved", path=str(path))
+
+    def load_standard_deviation_updater(
+        self, model: OpenstfRegressor
+    ) -> Optional[StandardDeviationUpdater]:
+        """Load the running standard deviation saved next to a loaded model.
+
+        Args:
+            model (OpenstfRegressor): Model loaded by this serializer
+
+        Returns:
+            Optional[StandardDeviationUpdater]: Running standard deviation or None if
+                it was never saved for this model or could not be read
+        """
+        path = self._get_standard_deviation_path(model)
+        if not path.is_file():
+            return None
+
+        try:
+            with open(path, "r") as file:
+                return StandardDeviationUpdater.from_dict(json.load(file))
+        except (JSONDecodeError, KeyError, ValueError) as e:
+            self.logger.warning(
+                "Could not load standard deviation, using the standard deviation "
+                "determined during training",
+                path=str(path),
+                error=e,
+            )
+            return None
+
+    def _apply_standard_deviation_update(self, model: OpenstfRegressor) -> None:
+        """Replace the standard deviation determined during training with the
+        running standard deviation, if available."""
+        updater = self.load_standard_deviation_updater(model)
+        if updater is not None:
+            model.standard_deviation = updater.standard_deviation
+
+    @staticmethod
+    def _get_standard_deviation_path(model: OpenstfRegressor) -> Path:
+        # Both the MLflow model folder and the joblib model file are stored inside a
+        # folder that is unique for the model
+        return Path(model.path).parent / STANDARD_DEVIATION_FILENAME
+
     def determine_model_age_from_pid(self, pid: int) -> float:
         """Determine model age in days of most recent model for a given pid.
         If no previous model is found, float(Inf) is returned
@@ -431,6 +555,9 @@ class PersistentStorageSerializer(AbstractSerializer):
             int: The experiment id of the prediction job
 
         """
+        import mlflow
+        from mlflow.tracking import MlflowClient
+
         # Set a folder where MLflow will write to
         mlflow.set_tracking_uri(self.mlflow_folder)
         # Setup a client to get the experiment id
@@ -460,6 +587,9 @@ class PersistentStorageSerializer(AbstractSerializer):
             **kwargs: Extra information to be logged with mlflow
 
         """
+        import mlflow
+        from matplotlib import figure
+        from plotly import graph_objects
 
         # Set tags to the run, can be used to filter on the UI
         mlflow.set_tag("run_id", mlflow.active_run().info.run_id)
@@ -510,6 +640,8 @@ class PersistentStorageSerializer(AbstractSerializer):
             report (Report): report where the info is stored
 
         """
+        import mlflow
+
         # log reports/figures in the artifact folder
 
         if report.feature_importance_figure is not None:
@@ -522,6 +654,8 @@ class PersistentStorageSerializer(AbstractSerializer):
         self.logger.info(f"logged figures to MLflow")
 
     def _find_all_models(self, pj: PredictionJobDataClass):
+        import mlflow
+
         experiment_id = self.setup_mlflow(pj["id"])
         prev_runs = mlflow.search_runs(
             experiment_id,
@@ -541,6 +675,8 @@ class PersistentStorageSerializer(AbstractSerializer):
                 f"MAX_N_MODELS should be greater than 1! Received: {max_n_models}"
             )
 
+        import mlflow
+
         prev_runs = self._find_all_models(pj)
 
         if len(prev_runs) > max_n_models:
@@ -5,66 +5,90 @@ import numpy as np
 import pandas as pd
 from sklearn.base import RegressorMixin
 
+HOURS_PER_DAY: int = 24
+
 
 class StandardDeviationGenerator:
     def __init__(self, validation_data: pd.DataFrame) -> None:
 
         self.validation_data = validation_data
 
-    def generate_standard_deviation_data(self, model: RegressorMixin) -> RegressorMixin:
-
-        # Define some variables
-        predicted = None
-        self.standard_deviation = pd.DataFrame()
-
-        # Loop over horizons and ask prediction for each specific horizon
-        for horizon in self.validation_data.horizon.unique():
-            # Make subset for this specific horizon
-            sub_val = self.validation_data[self.validation_data.horizon == horizon]
-
-            try:
-                predicted = model.predict(sub_val.iloc[:, 1:-1])
-            except Exception as e:
-                print("Could not get prediction from new model!", e)
-
-            # Calculate confidence interval for this horizon
-            confidence_interval_horizon = self._calculate_standard_deviation(
-                sub_val.iloc[:, 0], predicted
-            )
-            confidence_interval_horizon[
-                "horizon"
-            ] = horizon  # Label with respective horizon
-            self.standard_deviation = self.standard_deviation.append(
-                confidence_interval_horizon
-            )
+    def generate_standard_deviation_data(
+        self, model: RegressorMixin, predicted: np.array = None
+    ) -> RegressorMixin:
+        """Determine the standard deviation of the model error per horizon and hour
+
+            The model predicts the complete validation set (all horizons) at once,
+            after which the standard deviation is determined with a single grouped
+            reduction over horizon and hour.
+
+        Args:
+            model (RegressorMixin): Trained model
+            predicted (np.array, optional): Forecast of the model for the validation
+                data, when already predicted.
+
+        Returns:
+            RegressorMixin: Model with a standard_deviation attribute, a DataFrame with
+                float columns "stdev", "hour" and "horizon"
+        """
+        if predicted is None:
+            predicted = model.predict(self.validation_data.iloc[:, 1:-1])
+
+        self.standard_deviation = self._calculate_standard_deviation(
+            self.validation_data.iloc[:, 0],
+            predicted,
+            self.validation_data.horizon,
+        )
 
         model.standard_deviation = self.standard_deviation
 
         return model
 
     @staticmethod
-    def _calculate_standard_deviation(realised, predicted):
+    def _calculate_standard_deviation(
+        realised: pd.Series, predicted: np.array, horizon: pd.Series
+    ) -> pd.DataFrame:
         """Protected static method to calculate the corrections for a model
 
         Args:
             realised: pd.series with realised load
-            predicted: pd.series with load predicted by new model
+            predicted: np.array with load predicted by new model
+            horizon: pd.series with the horizon of each realised value
 
         Returns:
-            pd.DataFrame: with model corrections
+            pd.DataFrame: with model corrections, 24 hours for each horizon in order of
+                appearance
         """
-        result = pd.DataFrame(index=range(24), columns=["stdev", "hour"])
-        # Calculate the error for each predicted point
-        error = realised - predicted
-        error.index = error.index.hour  # Hour only, remove the rest
-        # For the time starts with 00, 01, 02, etc. TODO (MAKE MORE ELEGANT SOLUTION THAN A LOOP)
-        for hour in range(24):
-            hour_error = error[error.index == hour]
-            result["stdev"].iloc[hour] = np.std(
-                hour_error[1:]
-            )  # Exclude first item as this is the hour itself!
-            result["hour"].iloc[hour] = hour
-
-        result = result.astype("float")
-
-        return result
+        errors = pd.DataFrame(
+            {
+                "horizon": horizon.to_numpy(dtype=np.float64),
+                "hour": realised.index.hour,
+                "error": realised.to_numpy(dtype=np.float64)
+                - np.asarray(predicted, dtype=np.float64),
+            }
+        )
+        group_keys = ["horizon", "hour"]
+
+        # Exclude first item of each hour as this is the hour itself!
+        errors = errors[errors.groupby(group_keys).cumcount() > 0]
+
+        stdev = errors.groupby(group_keys)["error"].std(ddof=0)
+        # Unlike np.std, the grouped std skips NaN, so set hours with NaN errors to NaN
+        has_nan = errors["error"].isna().groupby([errors.horizon, errors.hour]).any()
+        stdev[has_nan] = np.nan
+
+        # Make sure every horizon has all hours, hours without errors get a NaN
+        horizons = pd.unique(horizon)
+        stdev_index = pd.MultiIndex.from_product(
+            [horizons, range(HOURS_PER_DAY)], names=group_keys
+        )
+        stdev = stdev.reindex(stdev_index)
+
+        return pd.DataFrame(
+            {
+                "stdev": stdev.to_numpy(dtype=np.float64),
+                "hour": stdev_index.get_level_values("hour").to_numpy(np.float64),
+                "horizon": stdev_index.get_level_values("horizon").to_numpy(np.float64),
+            },
+            index=np.tile(np.arange(HOURS_PER_DAY), len(horizons)),
+        )
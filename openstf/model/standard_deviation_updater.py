@@ -0,0 +1,232 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MOMENT_COLUMNS = ["horizon", "hour", "count", "mean", "m2"]
+# Number of realised errors the standard deviation determined during training is
+# worth, when the running moments are initialized from it
+PRIOR_COUNT: int = 30
+
+
+class StandardDeviationUpdater:
+    def __init__(
+        self, moments: pd.DataFrame, last_update: Optional[datetime] = None
+    ) -> None:
+        """Running moments of the model error per horizon and hour
+
+            The moments (count, mean and sum of squared deviations) can be merged
+            with the moments of new realised errors, which makes it possible to keep
+            the standard deviation of a model up to date without retraining.
+
+        Args:
+            moments (pd.DataFrame): DataFrame with float columns "horizon", "hour",
+                "count", "mean" and "m2"
+            last_update (datetime, optional): Datetime of the most recent error that
+                is included in the moments
+        """
+        self.moments = moments[MOMENT_COLUMNS].reset_index(drop=True)
+        self.last_update = last_update
+
+    @classmethod
+    def from_standard_deviation(
+        cls, standard_deviation: pd.DataFrame, prior_count: int = PRIOR_COUNT
+    ) -> "StandardDeviationUpdater":
+        """Initialize the running moments from the standard deviation of a model
+
+            The standard deviation determined during training is regarded as the
+            result of prior_count errors with zero mean. Hours without a standard
+            deviation start without any errors.
+
+        Args:
+            standard_deviation (pd.DataFrame): Standard deviation as generated by
+                the StandardDeviationGenerator
+            prior_count (int): Number of errors the standard deviation is worth
+
+        Returns:
+            StandardDeviationUpdater: Updater with the prior moments
+        """
+        stdev = standard_deviation.stdev.to_numpy(dtype=np.float64)
+        count = np.where(np.isnan(stdev), 0.0, float(prior_count))
+
+        moments = pd.DataFrame(
+            {
+                "horizon": standard_deviation.horizon.to_numpy(dtype=np.float64),
+                "hour": standard_deviation.hour.to_numpy(dtype=np.float64),
+                "count": count,
+                "mean": np.zeros_like(stdev),
+                "m2": np.nan_to_num(count * stdev**2),
+            }
+        )
+
+        return cls(moments)
+
+    def update(
+        self, realised: pd.Series, predicted_load: pd.DataFrame
+    ) -> "StandardDeviationUpdater":
+        """Fold the errors of realised versus predicted load into the moments
+
+            Only forecast horizons which are already part of the moments are updated
+            and errors up to the last update are skipped, so folding the same data
+            twice has no effect.
+
+        Args:
+            realised (pd.Series): Realised load with a datetime index
+            predicted_load (pd.DataFrame): Predicted load as retrieved for the KPI
+                calculation, with a "forecast_<t_ahead>h" column per horizon
+
+        Returns:
+            StandardDeviationUpdater: Updater with the new errors included
+        """
+        errors = self._calculate_errors(realised, predicted_load)
+
+        if self.last_update is not None:
+            errors = errors[errors.index > self.last_update]
+
+        errors = errors[errors.horizon.isin(self.moments.horizon)]
+
+        if len(errors) == 0:
+            return self
+
+        self.moments = self.merge_moments(
+            self.moments, self.calculate_error_moments(errors)
+        )
+        self.last_update = errors.index.max().to_pydatetime()
+
+        return self
+
+    @property
+    def standard_deviation(self) -> pd.DataFrame:
+        """Standard deviation of the errors, in the format of the
+        StandardDeviationGenerator
+
+        Returns:
+            pd.DataFrame: DataFrame with float columns "stdev", "hour" and "horizon",
+                hours without errors have a NaN standard deviation
+        """
+        count = self.moments["count"].to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stdev = np.sqrt(self.moments.m2.to_numpy() / count)
+        stdev[count == 0] = np.nan
+
+        return pd.DataFrame(
+            {
+                "stdev": stdev,
+                "hour": self.moments.hour.to_numpy(dtype=np.float64),
+                "horizon": self.moments.horizon.to_numpy(dtype=np.float64),
+            },
+            index=self.moments.hour.to_numpy(dtype=int),
+        )
+
+    def to_dict(self) -> dict:
+        last_update = None if self.last_update is None else self.last_update.isoformat()
+        return dict(
+            last_update=last_update,
+            moments=self.moments.to_dict(orient="list"),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StandardDeviationUpdater":
+        last_update = data.get("last_update")
+        if last_update is not None:
+            last_update = datetime.fromisoformat(last_update)
+
+        moments = pd.DataFrame(data["moments"], columns=MOMENT_COLUMNS, dtype=float)
+
+        return cls(moments, last_update)
+
+    @staticmethod
+    def calculate_error_moments(errors: pd.DataFrame) -> pd.DataFrame:
+        """Calculate the moments of errors per horizon and hour
+
+        Args:
+            errors (pd.DataFrame): DataFrame with columns "horizon", "hour", "error"
+
+        Returns:
+            pd.DataFrame: DataFrame with float columns "horizon", "hour", "count",
+                "mean" and "m2"
+        """
+        grouped = errors.groupby(["horizon", "hour"])["error"]
+        moments = pd.DataFrame(
+            {
+                "count": grouped.count().astype(np.float64),
+                "mean": grouped.mean(),
+                "m2": grouped.var(ddof=0) * grouped.count(),
+            }
+        ).reset_index()
+
+        return moments[MOMENT_COLUMNS].astype(np.float64)
+
+    @staticmethod
+    def merge_moments(moments: pd.DataFrame, other: pd.DataFrame) -> pd.DataFrame:
+        """Merge two sets of moments with the parallel variant of Welford's algorithm
+
+            For every horizon and hour the moments are combined as if all errors were
+            processed at once, see Chan et al. (1979).
+
+        Args:
+            moments (pd.DataFrame): Moments
+            other (pd.DataFrame): Moments to merge into moments
+
+        Returns:
+            pd.DataFrame: Merged moments, sorted on horizon and hour
+        """
+        # Sort explicitly, whether an outer merge sorts depends on the pandas version
+        merged = moments.merge(
+            other,
+            on=["horizon", "hour"],
+            how="outer",
+            sort=True,
+            suffixes=("_a", "_b"),
+        ).fillna(0.0)
+
+        count_a, count_b = merged.count_a, merged.count_b
+        count = count_a + count_b
+        delta = merged.mean_b - merged.mean_a
+        # Groups without any errors have a count of zero, keep their moments at zero
+        fraction_b = (count_b / count.where(count > 0)).fillna(0.0)
+
+        merged["count"] = count
+        merged["mean"] = merged.mean_a + delta * fraction_b
+        merged["m2"] = merged.m2_a + merged.m2_b + delta**2 * count_a * fraction_b
+
+        return merged[MOMENT_COLUMNS]
+
+    @staticmethod
+    def _calculate_errors(
+        realised: pd.Series, predicted_load: pd.DataFrame
+    ) -> pd.DataFrame:
+        """Calculate the error of every forecast horizon
+
+        Args:
+            realised (pd.Series): Realised load with a datetime index
+            predicted_load (pd.DataFrame): Predicted load with a "forecast_<t_ahead>h"
+                column per horizon
+
+        Returns:
+            pd.DataFrame: Long DataFrame with float columns "horizon", "hour" and
+                "error", indexed by the datetime of the error
+        """
+        forecast_columns = [
+            col for col in predicted_load.columns if col.startswith("forecast_")
+        ]
+        forecasts = predicted_load[forecast_columns].reindex(realised.index)
+        # Column name "forecast_47.0h" corresponds to horizon 47.0
+        forecasts.columns = [float(col[len("forecast_") : -1]) for col in forecasts]
+
+        errors = forecasts.rsub(realised, axis="index")
+
+        # Stack to one row per datetime and horizon, missing errors are dropped
+        errors = (
+            errors.rename_axis(index="datetime", columns="horizon")
+            .stack()
+            .rename("error")
+            .reset_index(level="horizon")
+        )
+        errors["hour"] = errors.index.hour.astype(np.float64)
+
+        return errors[["horizon", "hour", "error"]]
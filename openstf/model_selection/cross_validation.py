@@ -0,0 +1,319 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import structlog
+from openstf.dataclasses.model_specifications import ModelSpecificationDataClass
+from openstf_dbc.services.prediction_job import PredictionJobDataClass
+
+from openstf.enums import CrossValidationWindow
+from openstf.exceptions import InputDataInsufficientError
+from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
+from openstf.metrics.metrics import get_eval_metric_function
+from openstf.model.model_creator import ModelCreator
+from openstf.model_selection.model_selection import (
+    NANOSECONDS_PER_DAY,
+    RandomState,
+    SplitPlan,
+    get_day_ordinals,
+    make_split_plan,
+)
+from openstf.validation import validation
+
+DEFAULT_CV_HORIZONS: List[float] = [0.25, 47.0]
+DEFAULT_N_FOLDS: int = 4
+# Days forecasted by every fold, the origin moves this many days per fold
+DEFAULT_TEST_DAYS: int = 7
+# Folds need enough training days to sample a stratified validation set from
+MIN_TRAIN_DAYS: int = 30
+VALIDATION_FRACTION: float = 0.15
+EARLY_STOPPING_ROUNDS: int = 10
+CV_METRICS: List[str] = ["mae", "rmse", "r_mae", "bias", "nsme"]
+
+
+@dataclass
+class Fold(SplitPlan):
+    """Rolling origin fold, the test rows are the days from the origin on.
+
+    Attributes:
+        origin (pd.Timestamp): Start of the first test day
+    """
+
+    origin: pd.Timestamp = None
+
+
+def make_rolling_origin_folds(
+    data: pd.DataFrame,
+    n_folds: int = DEFAULT_N_FOLDS,
+    test_days: int = DEFAULT_TEST_DAYS,
+    window: Union[str, CrossValidationWindow] = CrossValidationWindow.EXPANDING,
+    train_days: Optional[int] = None,
+    min_train_days: int = MIN_TRAIN_DAYS,
+    validation_fraction: float = VALIDATION_FRACTION,
+    random_state: RandomState = None,
+) -> List[Fold]:
+    """Make rolling origin folds, the last fold tests on the last days of the data.
+
+    The origins are test_days days apart. Every fold trains on the days before its
+    origin, all days for an expanding window or the last train_days days for a
+    sliding window, and tests on the test_days days from its origin. The
+    validation days, for early stopping, are sampled from the training days with
+    stratification like make_split_plan.
+
+    The folds hold row positions, the data (with features) is not copied.
+
+    Args:
+        data (pd.DataFrame): Data, sorted on its index, with "load" as first column
+        n_folds (int): Number of folds
+        test_days (int): Number of days tested by every fold
+        window (str or CrossValidationWindow): "expanding" or "sliding"
+        train_days (int, optional): Number of training days of a sliding window
+        min_train_days (int): Minimum number of training days of a fold
+        validation_fraction (float): Fraction of the peak days of the training days
+            that is used for validation
+        random_state (int or np.random.Generator, optional): Seed or generator of
+            the sampling of the validation days. Defaults to None.
+
+    Raises:
+        ValueError: If a sliding window has no train_days.
+        InputDataInsufficientError: If the first fold has less than min_train_days
+            training days.
+
+    Returns:
+        List[Fold]: Folds, ordered on origin
+    """
+    window = CrossValidationWindow(window)
+    if window == CrossValidationWindow.SLIDING and train_days is None:
+        raise ValueError("A sliding window requires the number of train days")
+
+    day_ordinals = get_day_ordinals(data.index)
+    days = np.unique(day_ordinals)
+    # The same generator samples every fold, so the folds have other validation days
+    random_state = np.random.default_rng(random_state)
+
+    folds = []
+    for fold in range(n_folds):
+        origin = len(days) - (n_folds - fold) * test_days
+        train_start = 0
+        if window == CrossValidationWindow.SLIDING:
+            train_start = max(0, origin - train_days)
+        if origin - train_start < min_train_days:
+            raise InputDataInsufficientError(
+                f"Fold {fold} has {max(0, origin - train_start)} training days, "
+                f"at least {min_train_days} days are required"
+            )
+
+        train_positions = np.flatnonzero(
+            np.isin(day_ordinals, days[train_start:origin])
+        )
+        test_positions = np.flatnonzero(
+            np.isin(day_ordinals, days[origin : origin + test_days])
+        )
+
+        # Sample the validation days from the training days only
+        plan = make_split_plan(
+            data[["load"]].iloc[train_positions],
+            test_fraction=0.0,
+            validation_fraction=validation_fraction,
+            random_state=random_state,
+        )
+
+        folds.append(
+            Fold(
+                train_index=train_positions[plan.train_index],
+                validation_index=train_positions[plan.validation_index],
+                test_index=test_positions,
+                peaks=plan.peaks,
+                peaks_val_train=plan.peaks_val_train,
+                origin=pd.Timestamp(days[origin] * NANOSECONDS_PER_DAY).tz_localize(
+                    data.index.tz
+                ),
+            )
+        )
+
+    return folds
+
+
+def get_data_with_features(
+    pj: PredictionJobDataClass,
+    modelspecs: ModelSpecificationDataClass,
+    input_data: pd.DataFrame,
+    horizons: List[float],
+) -> pd.DataFrame:
+    """Validate the input data and compute the features, once for all folds.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        modelspecs (ModelSpecificationDataClass): Model specifications, optionally
+            with the feature names
+        input_data (pd.DataFrame): Raw input data, the load and predictors
+        horizons (List[float]): Horizons in hours
+
+    Raises:
+        InputDataInsufficientError: When the input data is insufficient
+
+    Returns:
+        pd.DataFrame: Data with features, "load" as first and "horizon" as last
+            column
+    """
+    validated_data = validation.clean(validation.validate(pj["id"], input_data))
+    if not validation.is_data_sufficient(validated_data):
+        raise InputDataInsufficientError(
+            "Input data is insufficient, after validation and cleaning"
+        )
+    return TrainFeatureApplicator(
+        horizons=horizons, feature_names=modelspecs.feature_names
+    ).add_features(validated_data)
+
+
+def forecast_folds(
+    pj: PredictionJobDataClass,
+    hyper_params: dict,
+    data: pd.DataFrame,
+    folds: List[Fold],
+    n_workers: int = 1,
+    n_jobs: Optional[int] = None,
+) -> pd.DataFrame:
+    """Train a model per fold and forecast the test rows of the fold.
+
+    The folds are trained concurrently by n_workers threads, the n_jobs threads of
+    the thread budget are divided over the workers.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        hyper_params (dict): Hyperparameters of the models
+        data (pd.DataFrame): Data with features the folds were made for
+        folds (List[Fold]): Folds
+        n_workers (int): Number of folds trained concurrently
+        n_jobs (int, optional): Total number of threads used for training, defaults
+            to all available cores.
+
+    Returns:
+        pd.DataFrame: Forecasts of all folds stacked, indexed by datetime with the
+            columns origin, horizon, realised and forecast.
+    """
+    # Divide the thread budget over the workers
+    model_params = dict(hyper_params)
+    if n_jobs is not None or n_workers > 1:
+        n_jobs = n_jobs if n_jobs is not None else os.cpu_count()
+        model_params["n_jobs"] = max(1, n_jobs // n_workers)
+
+    forecast_fold = partial(_forecast_fold, pj=pj, data=data, model_params=model_params)
+    if n_workers == 1:
+        forecasts = [forecast_fold(fold) for fold in folds]
+    else:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            forecasts = list(executor.map(forecast_fold, folds))
+
+    return pd.concat(forecasts)
+
+
+def cross_validate(
+    pj: PredictionJobDataClass,
+    modelspecs: ModelSpecificationDataClass,
+    input_data: pd.DataFrame,
+    horizons: List[float] = None,
+    n_workers: int = 1,
+    n_jobs: Optional[int] = None,
+    **fold_kwargs,
+) -> pd.DataFrame:
+    """Rolling origin cross validation of the model of a prediction job.
+
+    The input data is validated and the features are computed once, over the full
+    period. Every fold (see make_rolling_origin_folds) trains a model on the rows
+    of its training days and is evaluated on its test days, per horizon.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        modelspecs (ModelSpecificationDataClass): Model specifications, with the
+            hyperparameters and optionally the feature names
+        input_data (pd.DataFrame): Raw input data, the load and predictors
+        horizons (List[float], optional): Horizons to train and evaluate on in
+            hours. Defaults to DEFAULT_CV_HORIZONS.
+        n_workers (int): Number of folds trained concurrently
+        n_jobs (int, optional): Total number of threads used for training, defaults
+            to all available cores.
+        **fold_kwargs: Keyword arguments of make_rolling_origin_folds
+
+    Raises:
+        InputDataInsufficientError: When the input data is insufficient
+
+    Returns:
+        pd.DataFrame: Metrics (CV_METRICS) per fold and horizon, with the columns
+            fold, origin, horizon, the number of test rows n and the metrics.
+    """
+    logger = structlog.get_logger(__name__)
+
+    if horizons is None:
+        horizons = DEFAULT_CV_HORIZONS
+
+    data_with_features = get_data_with_features(pj, modelspecs, input_data, horizons)
+
+    folds = make_rolling_origin_folds(data_with_features, **fold_kwargs)
+    logger.info("Cross validating", pid=pj["id"], num_folds=len(folds))
+
+    forecasts = forecast_folds(
+        pj,
+        modelspecs.hyper_params,
+        data_with_features,
+        folds,
+        n_workers=n_workers,
+        n_jobs=n_jobs,
+    )
+
+    rows = []
+    for (origin, horizon), forecast in forecasts.groupby(["origin", "horizon"]):
+        row = {"origin": origin, "horizon": horizon, "n": len(forecast)}
+        for metric in CV_METRICS:
+            row[metric] = get_eval_metric_function(metric)(
+                forecast["realised"], forecast["forecast"]
+            )
+        rows.append(row)
+
+    metrics = pd.DataFrame(rows)
+    metrics["fold"] = metrics["origin"].rank(method="dense").astype(int) - 1
+    return metrics[["fold", "origin", "horizon", "n"] + CV_METRICS]
+
+
+def _forecast_fold(
+    fold: Fold, pj: PredictionJobDataClass, data: pd.DataFrame, model_params: dict
+) -> pd.DataFrame:
+    train_data, validation_data, test_data = fold.split(data)
+    train_x, train_y = train_data.iloc[:, 1:-1], train_data.iloc[:, 0]
+    validation_x, validation_y = (
+        validation_data.iloc[:, 1:-1],
+        validation_data.iloc[:, 0],
+    )
+
+    model = ModelCreator.create_model(pj["model"], quantiles=pj["quantiles"])
+    model.set_params(
+        **{
+            key: value
+            for key, value in model_params.items()
+            if key in model.get_params().keys()
+        }
+    )
+    model.fit(
+        train_x,
+        train_y,
+        eval_set=[(train_x, train_y), (validation_x, validation_y)],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        verbose=False,
+    )
+
+    return pd.DataFrame(
+        {
+            "origin": fold.origin,
+            "horizon": test_data.iloc[:, -1],
+            "realised": test_data.iloc[:, 0],
+            "forecast": model.predict(test_data.iloc[:, 1:-1]),
+        },
+        index=test_data.index,
+    )
@@ -1,9 +1,9 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
-import secrets
+from dataclasses import dataclass, field
 from datetime import timedelta
-from typing import List, Tuple
+from typing import List, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -11,6 +11,68 @@ import pandas as pd
 AMOUNT_DAY = 96  # Duration of the periods (in T-15) that are in a day (default = 96)
 PERIOD_TIMEDELTA = 1  # Duration of the periods (in days) that will be sampled as validation data for each split.
 PEAK_FRACTION = 0.15
+NANOSECONDS_PER_DAY = 24 * 60 * 60 * 10**9
+
+# Seed or generator of the random sampling, None for an unpredictable split
+RandomState = Union[None, int, np.random.Generator]
+
+
+@dataclass
+class SplitPlan:
+    """Train, validation and test split of a data frame, as row positions.
+
+    The plan holds no data, it can be applied to the data it was made for (or a
+    frame with the same rows, for example with other columns) as often as needed.
+
+    Attributes:
+        train_index (np.array): Positions of the train rows, in order of the index
+        validation_index (np.array): Positions of the validation rows
+        test_index (np.array): Positions of the test rows
+        peaks (pd.DataFrame): Minimum and maximum load of the peak days
+        peaks_val_train (list): Peak days in the validation and in the train set
+    """
+
+    train_index: np.array
+    validation_index: np.array
+    test_index: np.array
+    peaks: pd.DataFrame = field(default_factory=pd.DataFrame)
+    peaks_val_train: list = field(default_factory=lambda: [[], []])
+
+    def split(
+        self, data: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Apply the split to the data.
+
+        Args:
+            data (pd.DataFrame): Data the plan was made for
+
+        Returns:
+            pd.DataFrame: Train data
+            pd.DataFrame: Validation data
+            pd.DataFrame: Test data
+        """
+        return (
+            data.iloc[self.train_index],
+            data.iloc[self.validation_index],
+            data.iloc[self.test_index],
+        )
+
+
+def get_day_ordinals(index: pd.DatetimeIndex) -> np.array:
+    """Day of every timestamp, as the number of days since 1970-01-01.
+
+    Days are the calendar days in the timezone of the index.
+
+    Args:
+        index (pd.DatetimeIndex): Datetime index
+
+    Returns:
+        np.array: Integer day ordinal of every timestamp
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8 // NANOSECONDS_PER_DAY
 
 
 def sample_indices_train_val(
@@ -28,62 +90,82 @@ def sample_indices_train_val(
         np.array: Sorted list with the indices corresponding to the peak
 
     """
+    peak_ordinals = get_day_ordinals(pd.to_datetime(list(peaks)))
+    sampled = np.isin(get_day_ordinals(data.index), peak_ordinals)
+    return list(peaks), np.sort(data.index[sampled].unique().to_numpy())
 
-    sampled = set()
-    peaks_val = []
-
-    for peak in peaks:
-        sampled |= set(data[data.index.date == peak].index)
-        peaks_val.append(peak)
-    return peaks_val, np.sort(list(sampled))
 
-
-def random_sample(all_peaks: np.array, k: int) -> np.array:
+def random_sample(
+    all_peaks: np.array, k: int, random_state: RandomState = None
+) -> np.array:
     """
-    Random sampling of numbers out of a np.array
-    (implemented due to security sonar cloud not accepting the random built-in functions)
+    Random sampling without replacement of numbers out of a np.array
 
     Args:
         all_peaks (np.array): List with numbers to sample from
         k (int): Number of wanted samples
+        random_state (int or np.random.Generator, optional): Seed or generator, the
+            same seed gives the same samples. Defaults to None.
 
     Returns:
-        np.array: Sorted array with the random samples (dates from the peaks)
+        np.array: Array with the random samples (dates from the peaks)
 
     """
+    return np.random.default_rng(random_state).choice(all_peaks, size=k, replace=False)
 
-    random_peaks = []
-    all_peaks_list = all_peaks.tolist()
-    for _ in range(k):
-        element_random = secrets.choice(all_peaks_list)
-        all_peaks_list.remove(element_random)
-        random_peaks.append(element_random)
-    return np.array(random_peaks)
 
+def sample_stratified(
+    data: pd.DataFrame,
+    size: int,
+    stratify_by: Tuple[str, ...] = ("horizon",),
+    random_state: RandomState = None,
+) -> np.array:
+    """Sample rows, every stratum gets its share of the sample.
 
-def split_data_train_validation_test(
+    Every stratum (the rows with the same values of the stratify_by columns) gets
+    a number of rows proportional to its size, at least one.
+
+    Args:
+        data (pd.DataFrame): Data to sample from
+        size (int): Number of rows in the sample, all rows if the data is smaller
+        stratify_by (tuple of str): Columns that define the strata, "hour" is the
+            hour of the index if the data has no hour column.
+        random_state (int or np.random.Generator, optional): Seed or generator of
+            the sampling. Defaults to None.
+
+    Returns:
+        np.array: Positions of the sampled rows, in the order of the data
+    """
+    if size >= len(data):
+        return np.arange(len(data))
+
+    strata = [
+        data.index.hour if key == "hour" and key not in data else data[key]
+        for key in stratify_by
+    ]
+    # Rank random priorities within every stratum, the lowest ranks are sampled
+    priorities = pd.Series(np.random.default_rng(random_state).random(len(data)))
+    groups = priorities.groupby([np.asarray(stratum) for stratum in strata])
+    ranks = groups.rank(method="first").to_numpy()
+    quota = np.maximum(
+        1, np.round(groups.transform("size").to_numpy() * size / len(data))
+    )
+
+    return np.flatnonzero(ranks <= quota)
+
+
+def make_split_plan(
     data_: pd.DataFrame,
     test_fraction: float = 0.1,
     validation_fraction: float = 0.15,
     back_test: bool = False,
     stratification_min_max: bool = True,
-) -> (List[int], pd.DataFrame, pd.DataFrame, pd.DataFrame):
-    """
-    Split input data into train, test and validation set.
-
-    Function for splitting data with features in a train, test and
-    validation dataset. In an operational setting the following sequence is
-    returned (when using stratification):
-
-    Test >> Train >> Validation
-
-    For a back test (indicated with argument "back_test") the following sequence
-    is returned:
-
-    Train >> Validation >> Test
+    random_state: RandomState = None,
+) -> SplitPlan:
+    """Make the train, validation and test split of the data.
 
-    The ratios of the different types can be set with test_fraction and
-    validation fraction.
+    See split_data_train_validation_test for the split. The rows of a set are
+    in the order of the index.
 
     Args:
         data_ (pandas.DataFrame): Cleaned data with features
@@ -94,70 +176,54 @@ def split_data_train_validation_test(
         back_test (bool): Indicates if data is intended for a back test.
         stratification_min_max (bool): Indicates if validation data must be sampled as
             periods, using stratification on min and max values per day.
-            If True, 'extreme days' are ensured to be included in the validation and train sets,
-            ensuring the validation set to be representative of the train set.
+        random_state (int or np.random.Generator, optional): Seed or generator of
+            the sampling of the validation days, the same seed gives the same split.
+            Defaults to None.
 
     Returns:
-        peak_all_days (lint:int):
-        train_data (pandas.DataFrame): Train data.
-        validation_data (pandas.DataFrame): Validation data.
-        test_data (pandas.DataFrame): Test data.
-
+        SplitPlan: Row positions of the train, validation and test data
     """
-
     train_fraction = 1 - (test_fraction + validation_fraction)
     if train_fraction < 0:
         raise ValueError(
             "Test ({test_fraction}) and validation fraction ({validation_fraction}) too high."
         )
 
-    # Get start date from the index
-    start_date = data_.index.min().to_pydatetime()
-    end_date = data_.index.max().to_pydatetime()
+    index = pd.DatetimeIndex(data_.index)
+    start_date = index.min().to_pydatetime()
+    end_date = index.max().to_pydatetime()
 
     # Calculate total of quarter hours (PTU's) in input data
-    number_indices = len(data_.index.unique())  # Total number of unique timepoints
-    delta = (
-        data_.index.unique().sort_values()[1] - data_.index.unique().sort_values()[0]
-    )  # Delta t, assumed to be constant throughout DataFrame
-    delta = timedelta(
-        seconds=delta.seconds
-    )  # Convert from pandas timedelta to original python timedelta
-
-    # Determine which dates are in testset
+    unique_index = index.unique().sort_values()
+    number_indices = len(unique_index)  # Total number of unique timepoints
+    # Delta t, assumed to be constant throughout DataFrame
+    delta = timedelta(seconds=(unique_index[1] - unique_index[0]).seconds)
+
+    # Determine which rows are in the test set, the boundary is in both sets
     if back_test:
         start_date_test = end_date - np.round(number_indices * test_fraction) * delta
-        test_data = data_[start_date_test:]
-        train_val_data = data_[:start_date_test]
+        is_test = index >= start_date_test
+        is_train_val = index <= start_date_test
     else:
         start_date_val = start_date + np.round(number_indices * test_fraction) * delta
-        test_data = data_[:start_date_val]
-        train_val_data = data_[start_date_val:]
-
-    # For determining the min and max values for the validation and train data
-    max_per_day = (
-        train_val_data[["load"]]
-        .resample("1D")
-        .max()
-        .sort_values(by="load", ascending=True)
-        .dropna()
-    )
-    min_per_day = (
-        train_val_data[["load"]]
-        .resample("1D")
-        .min()
-        .sort_values(by="load", ascending=True)
-        .dropna()
+        is_test = index <= start_date_val
+        is_train_val = index >= start_date_val
+
+    # Minimum and maximum load per day of the train and validation data
+    day_ordinals = get_day_ordinals(index)
+    load_per_day = pd.Series(data_["load"].to_numpy()[is_train_val]).groupby(
+        day_ordinals[is_train_val]
     )
+    max_per_day = load_per_day.max().dropna().sort_values(kind="mergesort")
+    min_per_day = load_per_day.min().dropna().sort_values(kind="mergesort")
+
     # Keep the top PEAK_FRACTION (upper and lower 15%)
-    max_dates = max_per_day.iloc[int((1 - PEAK_FRACTION) * len(max_per_day)) :, :]
-    min_dates = min_per_day.iloc[: int(PEAK_FRACTION * len(min_per_day)), :]
-    # Combine the max_dates and min_dates, and make sure no duplicate indices are present
-    min_max_dates = max_dates.append(
-        min_dates[min_dates.index.isin(max_dates.index) == False]
-    )
+    max_days = max_per_day.iloc[int((1 - PEAK_FRACTION) * len(max_per_day)) :]
+    min_days = min_per_day.iloc[: int(PEAK_FRACTION * len(min_per_day))]
+    # Combine the max_days and min_days, without duplicate days
+    peaks = pd.concat([max_days, min_days[~min_days.index.isin(max_days.index)]])
 
-    peak_n_days = len(min_max_dates)
+    peak_n_days = len(peaks)
 
     if peak_n_days < 3:
         stratification_min_max = (
@@ -169,17 +235,13 @@ def split_data_train_validation_test(
     # Sample periods in the training part as the validation set using stratification (peaks).
     if stratification_min_max:
         split_val = int((peak_n_days * validation_fraction) / PERIOD_TIMEDELTA)
-        peaks_val, idx_val_split = sample_indices_train_val(
-            data_,
-            random_sample(np.array(min_max_dates.index.date), k=split_val),
-        )
-        peaks_train = list(set(min_max_dates.index.date) - set(peaks_val))
-        peaks_val_train[0].append(peaks_val)
-        peaks_val_train[1].append(peaks_train)
+        peaks_val = random_sample(peaks.index.to_numpy(), split_val, random_state)
+        peaks_train = np.setdiff1d(peaks.index.to_numpy(), peaks_val)
+        peaks_val_train[0].append(_ordinals_to_dates(peaks_val))
+        peaks_val_train[1].append(_ordinals_to_dates(peaks_train))
 
-        idx_train_split = list(set(train_val_data.index) - set(idx_val_split))
-        validation_data = data_[data_.index.isin(idx_val_split)]
-        train_data = data_[data_.index.isin(idx_train_split)]
+        is_validation = np.isin(day_ordinals, peaks_val)
+        is_train = is_train_val & ~is_validation
 
     # Default sampling, take a one single validation set.
     else:
@@ -188,8 +250,8 @@ def split_data_train_validation_test(
                 start_date + np.round(number_indices * validation_fraction) * delta
             )
             end_date_train = end_date - np.round(number_indices * test_fraction) * delta
-            validation_data = data_[:start_date_train]
-            train_data = data_[start_date_train:end_date_train]
+            is_validation = index <= start_date_train
+            is_train = (index >= start_date_train) & (index <= end_date_train)
         else:
             start_date_val = (
                 start_date + np.round(number_indices * test_fraction) * delta
@@ -197,17 +259,93 @@ def split_data_train_validation_test(
             start_date_train = (
                 start_date_val + np.round(number_indices * validation_fraction) * delta
             )
-            train_data = data_[start_date_train:None]
-            validation_data = data_[start_date_val:start_date_train]
+            is_validation = (index >= start_date_val) & (index <= start_date_train)
+            is_train = index >= start_date_train
+
+    # Positions in the order of the index
+    order = index.argsort(kind="stable")
+
+    peaks_frame = peaks.to_frame("load")
+    # The day ordinals are local days, midnight in the timezone of the index
+    peaks_frame.index = pd.DatetimeIndex(
+        peaks.index.to_numpy() * NANOSECONDS_PER_DAY
+    ).tz_localize(index.tz)
+
+    return SplitPlan(
+        train_index=order[is_train[order]],
+        validation_index=order[is_validation[order]],
+        test_index=order[is_test[order]],
+        peaks=peaks_frame,
+        peaks_val_train=peaks_val_train,
+    )
+
+
+def split_data_train_validation_test(
+    data_: pd.DataFrame,
+    test_fraction: float = 0.1,
+    validation_fraction: float = 0.15,
+    back_test: bool = False,
+    stratification_min_max: bool = True,
+    random_state: RandomState = None,
+) -> (List[int], pd.DataFrame, pd.DataFrame, pd.DataFrame):
+    """
+    Split input data into train, test and validation set.
+
+    Function for splitting data with features in a train, test and
+    validation dataset. In an operational setting the following sequence is
+    returned (when using stratification):
+
+    Test >> Train >> Validation
+
+    For a back test (indicated with argument "back_test") the following sequence
+    is returned:
 
-    train_data = train_data.sort_index()
-    validation_data = validation_data.sort_index()
-    test_data = test_data.sort_index()
+    Train >> Validation >> Test
+
+    The ratios of the different types can be set with test_fraction and
+    validation fraction. Use make_split_plan to get the split without copying the
+    data.
+
+    Args:
+        data_ (pandas.DataFrame): Cleaned data with features
+        test_fraction (float): Number between 0 and 1 that indicates the desired
+            fraction of test data.
+        validation_fraction (float): Number between 0 and 1 that indicates the
+            desired fraction of validation data.
+        back_test (bool): Indicates if data is intended for a back test.
+        stratification_min_max (bool): Indicates if validation data must be sampled as
+            periods, using stratification on min and max values per day.
+            If True, 'extreme days' are ensured to be included in the validation and train sets,
+            ensuring the validation set to be representative of the train set.
+        random_state (int or np.random.Generator, optional): Seed or generator of
+            the sampling of the validation days, the same seed gives the same split.
+            Defaults to None.
+
+    Returns:
+        peak_all_days (lint:int):
+        train_data (pandas.DataFrame): Train data.
+        validation_data (pandas.DataFrame): Validation data.
+        test_data (pandas.DataFrame): Test data.
+
+    """
+    plan = make_split_plan(
+        data_,
+        test_fraction=test_fraction,
+        validation_fraction=validation_fraction,
+        back_test=back_test,
+        stratification_min_max=stratification_min_max,
+        random_state=random_state,
+    )
+    train_data, validation_data, test_data = plan.split(data_)
 
     return (
-        min_max_dates,
-        peaks_val_train,
+        plan.peaks,
+        plan.peaks_val_train,
         train_data,
         validation_data,
         test_data,
     )
+
+
+def _ordinals_to_dates(day_ordinals: np.array) -> list:
+    return list(pd.to_datetime(day_ordinals, unit="D").date)
@@ -12,6 +12,8 @@ class PerformanceMeter:
         self.levels = OrderedDict()
         self.level_timers = []
         self.checkpoint_timers = []
+        # Runtime in seconds of the most recently completed level
+        self.last_runtime = None
 
     def start_level(self, level_label, level_name, **kwargs):
         """Enters a new level in the performance meter and logs it.
@@ -77,6 +79,7 @@ class PerformanceMeter:
 
         runtime = round(perf_counter() - self.level_timers.pop(), ndigits=3)
         self.checkpoint_timers.pop()
+        self.last_runtime = runtime
 
         level_label, level_name = self.levels.popitem()
 
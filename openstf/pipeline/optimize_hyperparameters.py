@@ -1,10 +1,13 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Union, Tuple
+from typing import TYPE_CHECKING, List, Optional, Union, Tuple
 
-import optuna
 import pandas as pd
 import structlog
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
@@ -16,26 +19,40 @@ from openstf.exceptions import (
 )
 from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
 from openstf.model.model_creator import ModelCreator
-from openstf.model.objective import RegressorObjective
+from openstf.model.objective import FIDELITY_FRACTIONS, RegressorObjective
 from openstf.model.objective_creator import ObjectiveCreator
-
-# This is required to disable the default optuna logger and pass the logs to our own
-# structlog logger
 from openstf.model.regressors.regressor import OpenstfRegressor
 from openstf.model.serializer import PersistentStorageSerializer
 from openstf.validation import validation
 
-optuna.logging.enable_propagation()  # Propagate logs to the root logger.
-optuna.logging.disable_default_handler()  # Stop showing logs in sys.stderr.
+if TYPE_CHECKING:
+    # Optuna is slow to import, it is imported when an optimization is started
+    import optuna
 
 logger = structlog.get_logger(__name__)
 
 # See https://optuna.readthedocs.io/en/stable/reference/generated/optuna.study.Study.html#optuna.study.Study.optimize
 N_TRIALS: int = 50  # The number of trials.
 TIMEOUT: int = 200  # Stop study after the given number of second(s).
+# Most trials of a multi-fidelity search are pruned at a cheap rung, so many more
+# fit in the timeout
+MULTI_FIDELITY_N_TRIALS: int = 150
 TRAIN_HORIZONS: List[float] = [0.25, 24.0]
 TEST_FRACTION: float = 0.1
 VALIDATION_FRACTION: float = 0.1
+# Maximum number of warm start params that are tried first
+MAX_WARM_START_TRIALS: int = 5
+# Fraction of the trials of a multi-fidelity search that continues to the next rung
+FIDELITY_REDUCTION_FACTOR: int = 3
+# Persistent studies, an interrupted study is resumed when it was last updated
+# within this number of seconds, an older study is started over.
+STUDY_STORAGE_FILENAME: str = "study_{pid}.db"
+STUDY_RESUME_MAX_AGE: float = 24 * 3600
+# Trials that stopped sending heartbeats are marked as failed when resuming
+STUDY_HEARTBEAT_INTERVAL: int = 60
+STUDY_HEARTBEAT_GRACE_PERIOD: int = 180
+# Seconds a worker waits for a lock on the SQLite storage
+STUDY_STORAGE_TIMEOUT: int = 60
 
 
 def optimize_hyperparameters_pipeline(
@@ -44,10 +61,16 @@ def optimize_hyperparameters_pipeline(
     trained_models_folder: Union[str, Path],
     horizons: List[float] = TRAIN_HORIZONS,
     n_trials: int = N_TRIALS,
+    storage_folder: Optional[Union[str, Path]] = None,
+    n_workers: int = 1,
+    n_jobs: Optional[int] = None,
+    warm_start_params: Optional[List[dict]] = None,
+    search_space_fraction: Optional[float] = None,
+    multi_fidelity: bool = False,
 ) -> dict:
     """Optimize hyperparameters pipeline.
 
-    Expected prediction job key's: "name", "model"
+    Expected prediction job key's: "id", "name", "model"
 
     Args:
         pj (PredictionJobDataClass): Prediction job
@@ -55,6 +78,18 @@ def optimize_hyperparameters_pipeline(
         trained_models_folder (Path): Path where trained models are stored
         horizons (List[float]): horizons for feature engineering.
         n_trials (int, optional): The number of trials. Defaults to N_TRIALS.
+        storage_folder (Path, optional): Folder where the study is stored, see
+            optuna_optimization. Defaults to an in-memory study.
+        n_workers (int, optional): Number of worker processes that run trials,
+            requires a storage_folder. Defaults to 1.
+        n_jobs (int, optional): Total number of threads used for training, divided
+            over the workers. Defaults to the default of the model.
+        warm_start_params (list of dict, optional): Good hyperparameters, for
+            example of the previous optimization, which are tried first.
+        search_space_fraction (float, optional): Narrow the search space around the
+            warm start params, see RegressorObjective.
+        multi_fidelity (bool, optional): Use a multi-fidelity search, see
+            optuna_optimization. Defaults to False.
 
     Raises:
         ValueError: If the input_date is insufficient.
@@ -92,7 +127,16 @@ def optimize_hyperparameters_pipeline(
     objective = ObjectiveCreator.create_objective(model_type=pj["model"])
 
     model, study, objective = optuna_optimization(
-        pj, objective, validated_data_with_features, n_trials
+        pj,
+        objective,
+        validated_data_with_features,
+        n_trials,
+        storage_folder=storage_folder,
+        n_workers=n_workers,
+        n_jobs=n_jobs,
+        warm_start_params=warm_start_params,
+        search_space_fraction=search_space_fraction,
+        multi_fidelity=multi_fidelity,
     )
 
     logger.info(
@@ -116,7 +160,13 @@ def optimize_hyperparameters_pipeline(
         trial_number=study.best_trial.number,
     )
 
-    return study.best_params
+    best_params = study.best_params
+
+    # The study is finished, the next optimization starts a new study
+    if storage_folder is not None:
+        get_study_storage_path(storage_folder, pj["id"]).unlink()
+
+    return best_params
 
 
 def optuna_optimization(
@@ -124,53 +174,271 @@ def optuna_optimization(
     objective: RegressorObjective,
     validated_data_with_features: pd.DataFrame,
     n_trials: int,
-) -> Tuple[OpenstfRegressor, optuna.study.Study, RegressorObjective]:
+    storage_folder: Optional[Union[str, Path]] = None,
+    n_workers: int = 1,
+    n_jobs: Optional[int] = None,
+    warm_start_params: Optional[List[dict]] = None,
+    search_space_fraction: Optional[float] = None,
+    multi_fidelity: bool = False,
+) -> Tuple[OpenstfRegressor, "optuna.study.Study", RegressorObjective]:
     """Perform hyperparameter optimization with optuna
 
+    Without a storage folder the study is kept in memory. With a storage folder
+    the trials are stored in a SQLite database per pid. An interrupted study is
+    resumed, only the remaining trials are run, when it was last updated less than
+    STUDY_RESUME_MAX_AGE seconds ago. The trials can then be run by multiple
+    worker processes, which all train and evaluate on the same data split. After
+    the study the model is trained with the best parameters of the study.
+
+    The numerical values of the warm start params are tried in the first trials of
+    a new study, the other hyperparameters of these trials are sampled.
+
+    With a multi-fidelity search every trial is first trained on small fractions of
+    the training days (FIDELITY_FRACTIONS). A successive halving pruner only lets
+    the best trials of every rung continue, so only promising hyperparameters are
+    trained on all data and more trials fit in the time budget.
+
     Args:
         pj: Prediction job
         objective: Objective function for optuna
         validated_data_with_features: cleaned input dataframe
         n_trials: number of optuna trials
+        storage_folder: folder where the study is stored
+        n_workers: number of worker processes that run trials
+        n_jobs: total number of threads used for training, divided over the workers
+        warm_start_params: good hyperparameters which are tried first
+        search_space_fraction: narrow the search space around the warm start params
+        multi_fidelity: use a multi-fidelity search
 
     Returns:
         model (OpenstfRegressor): Optimized model
         study (optuna.study.Study): Optimization study from optuna
         objective : The objective object used by optuna
 
+    Raises:
+        ValueError: If multiple workers are requested without a storage folder.
     """
+    import optuna
+
+    _configure_optuna_logging()
+
+    if n_workers > 1 and storage_folder is None:
+        raise ValueError("Running trials in multiple workers requires a storage")
+
     model = ModelCreator.create_model(pj["model"])
+    # Divide the thread budget over the workers
+    if n_jobs is not None or n_workers > 1:
+        n_jobs = n_jobs if n_jobs is not None else os.cpu_count()
+        model.set_params(n_jobs=max(1, n_jobs // n_workers))
 
     objective = objective(
         model,
         validated_data_with_features,
+        warm_start_params=warm_start_params,
+        search_space_fraction=search_space_fraction,
+        fidelity_fractions=FIDELITY_FRACTIONS if multi_fidelity else None,
     )
+    pruner = _create_pruner(multi_fidelity)
+
+    if storage_folder is None:
+        study = optuna.create_study(
+            study_name=pj["model"],
+            pruner=pruner,
+            direction="minimize",
+        )
+        _enqueue_warm_start_trials(study, warm_start_params)
+
+        # Optuna updates the model by itself
+        # and the model is the optimized over this finishes
+        study.optimize(
+            objective,
+            n_trials=n_trials,
+            callbacks=[_log_study_progress],
+            show_progress_bar=False,
+            timeout=TIMEOUT,
+        )
+
+        return model, study, objective
+
+    storage_path = get_study_storage_path(storage_folder, pj["id"])
+    storage_path.parent.mkdir(parents=True, exist_ok=True)
+    if (
+        storage_path.exists()
+        and time.time() - storage_path.stat().st_mtime > STUDY_RESUME_MAX_AGE
+    ):
+        logger.info("Stored study is outdated, start a new study", pid=pj["id"])
+        storage_path.unlink()
+
+    # The workers get a copy of the objective, split once here so all trials use
+    # the same train, validation and test data
+    objective.split_data()
 
     study = optuna.create_study(
         study_name=pj["model"],
-        pruner=optuna.pruners.MedianPruner(n_warmup_steps=5),
+        storage=_get_study_storage(storage_path),
+        pruner=pruner,
         direction="minimize",
+        load_if_exists=True,
+    )
+    if len(study.trials) == 0:
+        _enqueue_warm_start_trials(study, warm_start_params)
+
+    n_finished = _count_finished_trials(study)
+    if n_finished > 0:
+        logger.info("Resuming stored study", pid=pj["id"], n_finished_trials=n_finished)
+
+    if n_finished < n_trials:
+        if n_workers == 1:
+            _optimize_stored_study(
+                objective, storage_path, pj["model"], n_trials, pruner
+            )
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [
+                    executor.submit(
+                        _optimize_stored_study,
+                        objective,
+                        storage_path,
+                        pj["model"],
+                        n_trials,
+                        pruner,
+                    )
+                    for _ in range(n_workers)
+                ]
+                for future in futures:
+                    future.result()
+
+    # The trials (partly) ran in other processes or in a previous run, train the
+    # model of the best trial in this process
+    best_trial = study.best_trial
+    objective(optuna.trial.FixedTrial(best_trial.params, number=best_trial.number))
+    objective.track_trials = {
+        f" trial: {trial.number}": {"score": trial.value, "params": trial.params}
+        for trial in study.get_trials(
+            deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,)
+        )
+    }
+
+    return objective.model, study, objective
+
+
+def get_study_storage_path(storage_folder: Union[str, Path], pid: int) -> Path:
+    """Get the path of the SQLite database in which the study of a pid is stored."""
+    return Path(storage_folder) / STUDY_STORAGE_FILENAME.format(pid=pid)
+
+
+def _create_pruner(multi_fidelity: bool) -> "optuna.pruners.BasePruner":
+    import optuna
+
+    if multi_fidelity:
+        # The rungs of the objective are the steps of the trial
+        return optuna.pruners.SuccessiveHalvingPruner(
+            min_resource=1, reduction_factor=FIDELITY_REDUCTION_FACTOR
+        )
+    return optuna.pruners.MedianPruner(n_warmup_steps=5)
+
+
+def _get_study_storage(storage_path: Path) -> "optuna.storages.RDBStorage":
+    import optuna
+
+    return optuna.storages.RDBStorage(
+        f"sqlite:///{storage_path}",
+        engine_kwargs={"connect_args": {"timeout": STUDY_STORAGE_TIMEOUT}},
+        heartbeat_interval=STUDY_HEARTBEAT_INTERVAL,
+        grace_period=STUDY_HEARTBEAT_GRACE_PERIOD,
+    )
+
+
+def _enqueue_warm_start_trials(
+    study: "optuna.study.Study", warm_start_params: Optional[List[dict]]
+) -> None:
+    enqueued = []
+    for params in warm_start_params or []:
+        # Only numerical values, a categorical value that is not one of the choices
+        # of the search space would fail the trial
+        params = {
+            key: value
+            for key, value in params.items()
+            if isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and not math.isnan(value)
+        }
+        if len(params) == 0 or params in enqueued:
+            continue
+        enqueued.append(params)
+        study.enqueue_trial(params)
+        if len(enqueued) == MAX_WARM_START_TRIALS:
+            break
+
+    if len(enqueued) > 0:
+        logger.info("Enqueued warm start trials", n_trials=len(enqueued))
+
+
+def _count_finished_trials(study: "optuna.study.Study") -> int:
+    import optuna
+
+    states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    return len(study.get_trials(deepcopy=False, states=states))
+
+
+def _optimize_stored_study(
+    objective: RegressorObjective,
+    storage_path: Path,
+    study_name: str,
+    n_trials: int,
+    pruner: "optuna.pruners.BasePruner",
+) -> None:
+    """Run trials of a stored study until it has n_trials finished trials.
+
+    Runs in a worker process, multiple workers can optimize the same study.
+    """
+    import optuna
+
+    _configure_optuna_logging()
+
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=_get_study_storage(storage_path),
+        pruner=pruner,
     )
+    # Trials of an interrupted run never finish, mark these as failed
+    optuna.storages.fail_stale_trials(study)
+
+    if _count_finished_trials(study) >= n_trials:
+        return
 
-    # Optuna updates the model by itself
-    # and the model is the optimized over this finishes
+    states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
     study.optimize(
         objective,
-        n_trials=n_trials,
-        callbacks=[_log_study_progress],
+        callbacks=[
+            optuna.study.MaxTrialsCallback(n_trials, states=states),
+            _log_study_progress,
+        ],
         show_progress_bar=False,
         timeout=TIMEOUT,
     )
 
-    return model, study, objective
+
+def _configure_optuna_logging() -> None:
+    # This is required to disable the default optuna logger and pass the logs to our
+    # own structlog logger
+    import optuna
+
+    optuna.logging.enable_propagation()  # Propagate logs to the root logger.
+    optuna.logging.disable_default_handler()  # Stop showing logs in sys.stderr.
 
 
 def _log_study_progress(
-    study: optuna.study.Study, trial: optuna.trial.FrozenTrial
+    study: "optuna.study.Study", trial: "optuna.trial.FrozenTrial"
 ) -> None:
-    # Collect study and trial data
-    trial_index = study.trials.index(trial)
-    best_trial_index = study.trials.index(study.best_trial)
+    # Collect study and trial data, the number of a trial is its index in the study
+    # (looked up by number as a stored study returns copies of the trials)
+    trial_index = trial.number
+    try:
+        best_trial_index = study.best_trial.number
+    except ValueError:
+        # All trials so far were pruned
+        best_trial_index = None
     value = trial.value
     params = trial.params
     duration = (trial.datetime_complete - trial.datetime_start).total_seconds()
@@ -1,14 +1,25 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
+import structlog
 from openstf.dataclasses.model_specifications import ModelSpecificationDataClass
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
 from sklearn.base import RegressorMixin
 
+from openstf.enums import CrossValidationWindow
+from openstf.exceptions import InputDataInsufficientError
 from openstf.model.confidence_interval_applicator import ConfidenceIntervalApplicator
+from openstf.model_selection.cross_validation import (
+    MIN_TRAIN_DAYS,
+    forecast_folds,
+    get_data_with_features,
+    make_rolling_origin_folds,
+)
+from openstf.model_selection.model_selection import RandomState, get_day_ordinals
 from openstf.pipeline.train_model import train_pipeline_common
 from openstf.postprocessing.postprocessing import (
     add_prediction_job_properties_to_forecast,
@@ -16,6 +27,8 @@ from openstf.postprocessing.postprocessing import (
 
 DEFAULT_TRAIN_HORIZONS: List[float] = [0.25, 24.0]
 DEFAULT_EARLY_STOPPING_ROUNDS: int = 10
+# A walk forward back test retrains the model every week by default
+DEFAULT_RETRAIN_INTERVAL_DAYS: int = 7
 
 
 def train_model_and_forecast_back_test(
@@ -69,3 +82,95 @@ def train_model_and_forecast_back_test(
     forecast["horizon"] = test_data.iloc[:, -1]
 
     return forecast, model, train_data, validation_data, test_data
+
+
+def walk_forward_back_test(
+    pj: PredictionJobDataClass,
+    modelspecs: ModelSpecificationDataClass,
+    input_data: pd.DataFrame,
+    training_horizons: List[float] = None,
+    retrain_interval_days: int = DEFAULT_RETRAIN_INTERVAL_DAYS,
+    min_train_days: int = MIN_TRAIN_DAYS,
+    window: Union[str, CrossValidationWindow] = CrossValidationWindow.EXPANDING,
+    train_days: Optional[int] = None,
+    n_workers: int = 1,
+    n_jobs: Optional[int] = None,
+    random_state: RandomState = None,
+) -> pd.DataFrame:
+    """Pipeline for a walk forward back test.
+
+        DO NOT USE THIS PIPELINE FOR OPERATIONAL FORECASTS
+
+    The input data is validated and the features are computed once for the whole
+    period. After the first min_train_days days a model is trained every
+    retrain_interval_days days, on the days before (see make_rolling_origin_folds
+    for the expanding and sliding window), and forecasts the following
+    retrain_interval_days days. The windows are trained concurrently by n_workers
+    threads, which divide the n_jobs threads of the thread budget.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job.
+        modelspecs (ModelSpecificationDataClass): Dataclass containing model specifications
+        input_data (pd.DataFrame): Input data
+        training_horizons (list): horizons to train on in hours.
+            These horizons are also used to make predictions (one for every horizon)
+        retrain_interval_days (int): Days between two trainings, the days
+            forecasted by every model
+        min_train_days (int): Training days of the first model
+        window (str or CrossValidationWindow): "expanding" or "sliding" window of
+            training days
+        train_days (int, optional): Number of training days of a sliding window
+        n_workers (int): Number of windows trained concurrently
+        n_jobs (int, optional): Total number of threads used for training, defaults
+            to all available cores.
+        random_state (int or np.random.Generator, optional): Seed or generator of
+            the sampling of the validation days.
+
+    Raises:
+        InputDataInsufficientError: When the input data is insufficient for a
+            single window.
+
+    Returns:
+        pd.DataFrame: Forecasts, indexed by horizon and datetime, with the columns
+            origin (the start of the forecasted window), realised and forecast.
+    """
+    logger = structlog.get_logger(__name__)
+
+    if training_horizons is None:
+        training_horizons = DEFAULT_TRAIN_HORIZONS
+
+    data_with_features = get_data_with_features(
+        pj, modelspecs, input_data, training_horizons
+    )
+
+    num_days = len(np.unique(get_day_ordinals(data_with_features.index)))
+    num_windows = (num_days - min_train_days) // retrain_interval_days
+    if num_windows < 1:
+        raise InputDataInsufficientError(
+            f"Input data has {num_days} days, a walk forward back test requires at "
+            f"least {min_train_days + retrain_interval_days} days"
+        )
+    folds = make_rolling_origin_folds(
+        data_with_features,
+        n_folds=num_windows,
+        test_days=retrain_interval_days,
+        window=window,
+        train_days=train_days,
+        min_train_days=min_train_days,
+        random_state=random_state,
+    )
+    logger.info("Walk forward back test", pid=pj["id"], num_windows=num_windows)
+
+    forecasts = forecast_folds(
+        pj,
+        modelspecs.hyper_params,
+        data_with_features,
+        folds,
+        n_workers=n_workers,
+        n_jobs=n_jobs,
+    )
+
+    # Compact table, stacked per horizon
+    forecasts = forecasts.astype({"realised": "float32", "forecast": "float32"})
+    forecasts.index.name = "datetime"
+    return forecasts.set_index("horizon", append=True).swaplevel().sort_index()
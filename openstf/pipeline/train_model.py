@@ -2,26 +2,34 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 import logging
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import structlog
 from openstf.dataclasses.model_specifications import ModelSpecificationDataClass
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
+from sklearn.metrics import r2_score
 
+from openstf.enums import MLModelType
 from openstf.exceptions import (
     InputDataInsufficientError,
     InputDataWrongColumnOrderError,
     OldModelHigherScoreError,
 )
 from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
+from openstf.metrics.metrics import mae
 from openstf.metrics.reporter import Report, Reporter
 from openstf.model.model_creator import ModelCreator
 from openstf.model.regressors.regressor import OpenstfRegressor
 from openstf.model.serializer import PersistentStorageSerializer
 from openstf.model.standard_deviation_generator import StandardDeviationGenerator
-from openstf.model_selection.model_selection import split_data_train_validation_test
+from openstf.model_selection.model_selection import (
+    sample_stratified,
+    split_data_train_validation_test,
+)
 from openstf.validation import validation
 
 DEFAULT_TRAIN_HORIZONS: List[float] = [0.25, 47.0]
@@ -29,6 +37,24 @@ MAXIMUM_MODEL_AGE: int = 7
 
 DEFAULT_EARLY_STOPPING_ROUNDS: int = 10
 PENALTY_FACTOR_OLD_MODEL: float = 1.2
+# The old and new model are compared on a sample of the validation data, which is
+# held out from the training of the new model, stratified on horizon and hour
+COMPARISON_SAMPLE_SIZE: int = 2000
+COMPARISON_STRATIFY_BY: Tuple[str, ...] = ("horizon", "hour")
+
+# Warm start training continues boosting from the old model on the recent data.
+# Dart boosters are never warm started, the weights of their trees depend on the
+# dropout during training.
+WARM_START_MODEL_TYPES: Tuple[MLModelType, ...] = (MLModelType.XGB, MLModelType.LGB)
+# A model is fully retrained when its last full training is older
+FULL_RETRAIN_INTERVAL_DAYS: int = 28
+# Recent days to continue boosting on, at least the age of the old model. Enough
+# days to sample a stratified validation set from.
+WARM_START_MIN_TRAINING_DAYS: int = 30
+# Maximum number of boosting rounds added by a warm start
+WARM_START_MAX_ROUNDS: int = 50
+# A model is fully retrained when its R^2 on the recent data is lower (drift)
+WARM_START_MIN_SCORE: float = 0.5
 
 
 def train_model_pipeline(
@@ -36,6 +62,7 @@ def train_model_pipeline(
     input_data: pd.DataFrame,
     check_old_model_age: bool,
     trained_models_folder: Union[str, Path],
+    warm_start: bool = False,
 ) -> None:
     """Midle level pipeline that takes care of all persistent storage dependencies
 
@@ -47,6 +74,8 @@ def train_model_pipeline(
         input_data (pd.DataFrame): Raw training input data
         check_old_model_age (bool): Check if training should be skipped because the model is too young
         trained_models_folder (Path): Path where trained models are stored
+        warm_start (bool): Continue boosting from the old model when possible,
+            see get_warm_start_model. Defaults to False.
 
     Returns:
         None
@@ -76,10 +105,14 @@ def train_model_pipeline(
         )
         return
 
+    init_model = None
+    if warm_start:
+        init_model = get_warm_start_model(pj, old_model)
+
     # Train model with core pipeline
     try:
         model, report, modelspecs_updated = train_model_pipeline_core(
-            pj, modelspecs, input_data, old_model
+            pj, modelspecs, input_data, old_model, init_model=init_model
         )
     except OldModelHigherScoreError as OMHSE:
         logger.error("Old model is better than new model", pid=pj["id"], exc_info=OMHSE)
@@ -101,8 +134,18 @@ def train_model_pipeline(
         )
         raise InputDataWrongColumnOrderError(IDWCOE)
 
-    # Save model
-    serializer.save_model(model, pj=pj, modelspecs=modelspecs_updated, report=report)
+    # Save model, tagged with how it was trained
+    training_tags = {
+        "training_mode": "warm_start"
+        if getattr(model, "warm_started", False)
+        else "full"
+    }
+    full_training_datetime = getattr(model, "full_training_datetime", None)
+    if full_training_datetime is not None:
+        training_tags["full_training_date"] = full_training_datetime.isoformat()
+    serializer.save_model(
+        model, pj=pj, modelspecs=modelspecs_updated, report=report, **training_tags
+    )
 
     # Clean up older models
     serializer.remove_old_models(pj=pj)
@@ -114,6 +157,9 @@ def train_model_pipeline_core(
     input_data: pd.DataFrame,
     old_model: OpenstfRegressor = None,
     horizons: List[float] = None,
+    init_model: OpenstfRegressor = None,
+    comparison_sample_size: int = COMPARISON_SAMPLE_SIZE,
+    comparison_stratify_by: Tuple[str, ...] = COMPARISON_STRATIFY_BY,
 ) -> Tuple[OpenstfRegressor, Report, ModelSpecificationDataClass]:
     """Train model core pipeline.
     Trains a new model given a prediction job, input data and compares it to an old model.
@@ -136,6 +182,12 @@ def train_model_pipeline_core(
         input_data (pd.DataFrame): Input data
         old_model (OpenstfRegressor, optional): Old model to compare to. Defaults to None.
         horizons (List[float]): horizons to train on in hours.
+        init_model (OpenstfRegressor, optional): Model to continue boosting from,
+            see train_pipeline_common. Defaults to None.
+        comparison_sample_size (int): Number of validation rows the old and new
+            model are compared on.
+        comparison_stratify_by (tuple of str): Columns (or "hour") the comparison
+            sample is stratified on, see sample_stratified.
 
     Raises:
         InputDataInsufficientError: when input data is insufficient.
@@ -143,7 +195,8 @@ def train_model_pipeline_core(
         OldModelHigherScoreError: When old model is better than new model.
 
     Returns:
-        Tuple[OpenstfRegressor, Report, ModelSpecificationDataClass]: Trained model and report (with figures)
+        Tuple[OpenstfRegressor, Report, ModelSpecificationDataClass]: Trained model and report (with figures),
+            the report has the per horizon comparison with the old model.
     """
 
     if horizons is None:
@@ -153,29 +206,39 @@ def train_model_pipeline_core(
 
     # Call common pipeline
     model, report, train_data, validation_data, test_data = train_pipeline_common(
-        pj, modelspecs, input_data, horizons
+        pj, modelspecs, input_data, horizons, init_model=init_model
     )
     modelspecs.feature_names = list(train_data.columns)
     logging.info("Fitted a new model, not yet stored")
 
     # Check if new model is better than old model
     if old_model:
-        combined = train_data.append(validation_data).reset_index(drop=True)
-        x_data, y_data = (
-            combined.iloc[:, 1:-1],
-            combined.iloc[:, 0],
+        sample = sample_stratified(
+            validation_data, comparison_sample_size, comparison_stratify_by
         )
-
-        # Score method always returns R^2
-        score_new_model = model.score(x_data, y_data)
+        comparison_data = validation_data.iloc[sample]
+        # The new model already predicted the validation data for the report
+        forecast_new_model = report.validation_forecast[sample]
 
         # Try to compare new model to old model.
         # If this does not success, for example since the feature names of the
         # old model differ from the new model, the new model is considered better
         try:
-            score_old_model = old_model.score(x_data, y_data)
+            forecast_old_model = old_model.predict(comparison_data.iloc[:, 1:-1])
+
+            report.model_comparison = compare_models(
+                comparison_data, forecast_new_model, forecast_old_model
+            )
+            logger.info(
+                "Compared new model to old model",
+                pid=pj["id"],
+                comparison=report.model_comparison.to_dict(orient="index"),
+            )
 
             # Check if R^2 is better for old model
+            realised = comparison_data.iloc[:, 0]
+            score_new_model = r2_score(realised, forecast_new_model)
+            score_old_model = r2_score(realised, forecast_old_model)
             if score_old_model > score_new_model * PENALTY_FACTOR_OLD_MODEL:
                 raise OldModelHigherScoreError(
                     f"Old model is better than new model for {pj['id']}."
@@ -197,9 +260,19 @@ def train_pipeline_common(
     horizons: List[float],
     test_fraction: float = 0.0,
     backtest: bool = False,
+    init_model: OpenstfRegressor = None,
 ) -> Tuple[OpenstfRegressor, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """Common pipeline shared with operational training and backtest training
 
+    With an init model the new model continues boosting from it, for at most
+    WARM_START_MAX_ROUNDS rounds, on the recent days of the input data (the age of
+    the init model, at least WARM_START_MIN_TRAINING_DAYS). When the init model
+    has other features or scores lower than WARM_START_MIN_SCORE on the recent days
+    (drift) a new model is trained on all data instead. The trained model has the
+    attributes warm_started and full_training_datetime, the time of the last
+    training on all data. A new model is also trained when the hyperparameters
+    differ from those of the init model, new boosting rounds should not mix them.
+
     Args:
         pj (PredictionJobDataClass): Prediction job
         modelspecs (ModelSpecificationDataClass): Dataclass containing model specifications
@@ -207,6 +280,7 @@ def train_pipeline_common(
         horizons (List[float]): horizons to train on in hours.
         test_fraction (float): fraction of data to use for testing
         backtest (bool): boolean if we need to do a backtest
+        init_model (OpenstfRegressor, optional): Model to continue boosting from
 
     Returns:
         Tuple[RegressorMixin, Report, pd.DataFrame, pd.DataFrame, pd.DataFrame]: Trained model, report
@@ -234,6 +308,18 @@ def train_pipeline_common(
         horizons=horizons, feature_names=modelspecs.feature_names
     ).add_features(validated_data)
 
+    if init_model is not None and _hyper_params_changed(
+        pj, modelspecs.hyper_params, init_model
+    ):
+        init_model = None
+
+    if init_model is not None:
+        recent_data = _get_warm_start_data(pj, data_with_features, init_model)
+        if recent_data is None:
+            init_model = None
+        else:
+            data_with_features = recent_data
+
     # Split data
     (
         peaks,
@@ -275,30 +361,189 @@ def train_pipeline_common(
     }
 
     model.set_params(**valid_hyper_parameters)
+
+    init_model_kwargs = {}
+    n_estimators = model.get_params()["n_estimators"]
+    if init_model is not None:
+        # Only limit the rounds added by this fit, see below
+        model.set_params(n_estimators=min(n_estimators, WARM_START_MAX_ROUNDS))
+        init_model_kwargs = _get_init_model_kwargs(pj, init_model)
+
     model.fit(
         train_x,
         train_y,
         eval_set=eval_set,
         early_stopping_rounds=DEFAULT_EARLY_STOPPING_ROUNDS,
         verbose=False,
+        **init_model_kwargs,
+    )
+    # The hyperparameters of the model are stored with it and used for the next
+    # training, so the warm start limit should not persist
+    model.set_params(n_estimators=n_estimators)
+    model.warm_started = init_model is not None
+    model.full_training_datetime = (
+        init_model.full_training_datetime
+        if init_model is not None
+        else datetime.utcnow()
     )
     # Gets the feature importance df or None if we don't have feature importance
     model.feature_importance_dataframe = model.set_feature_importance()
 
     logging.info("Fitted a new model, not yet stored")
 
+    # The forecast for the validation data is reused by the confidence interval
+    # determination, the report and the comparison with the old model
+    validation_forecast = model.predict(validation_x)
+
     # Do confidence interval determination
     model = StandardDeviationGenerator(
         validation_data
-    ).generate_standard_deviation_data(model)
+    ).generate_standard_deviation_data(model, predicted=validation_forecast)
 
     # Report about the training process
     reporter = Reporter(train_data, validation_data, test_data)
-    report = reporter.generate_report(model)
+    report = reporter.generate_report(model, validation_forecast=validation_forecast)
 
     return model, report, train_data, validation_data, test_data
 
 
+def compare_models(
+    comparison_data: pd.DataFrame,
+    forecast_new_model: np.array,
+    forecast_old_model: np.array,
+) -> pd.DataFrame:
+    """Compare the forecasts of the new and old model per horizon.
+
+    Args:
+        comparison_data (pd.DataFrame): Data the models are compared on, with the
+            realised load as first and the horizon as last column
+        forecast_new_model (np.array): Forecast of the new model
+        forecast_old_model (np.array): Forecast of the old model
+
+    Returns:
+        pd.DataFrame: Per horizon the number of rows n and the R^2 and MAE of the new
+            and the old model
+    """
+    forecasts = pd.DataFrame(
+        {
+            "horizon": comparison_data.iloc[:, -1].to_numpy(),
+            "realised": comparison_data.iloc[:, 0].to_numpy(),
+            "new": np.asarray(forecast_new_model),
+            "old": np.asarray(forecast_old_model),
+        }
+    )
+
+    rows = {}
+    for horizon, horizon_forecasts in forecasts.groupby("horizon"):
+        realised = horizon_forecasts["realised"]
+        rows[horizon] = {"n": len(horizon_forecasts)}
+        for name in ["new", "old"]:
+            rows[horizon][f"r2_{name}_model"] = r2_score(
+                realised, horizon_forecasts[name]
+            )
+            rows[horizon][f"mae_{name}_model"] = mae(realised, horizon_forecasts[name])
+
+    return pd.DataFrame.from_dict(rows, orient="index").rename_axis("horizon")
+
+
+def get_warm_start_model(
+    pj: PredictionJobDataClass, old_model: Optional[OpenstfRegressor]
+) -> Optional[OpenstfRegressor]:
+    """Get the old model if the new model can continue boosting from it.
+
+    This is the case for XGB and LGB models without dart boosting, of which the
+    last full training is less than FULL_RETRAIN_INTERVAL_DAYS days ago.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        old_model (OpenstfRegressor): Old model
+
+    Returns:
+        OpenstfRegressor: Old model to continue from or None to train a new model
+    """
+    logger = structlog.get_logger(__name__)
+
+    if old_model is None or MLModelType(pj["model"]) not in WARM_START_MODEL_TYPES:
+        return None
+
+    params = old_model.get_params()
+    if "dart" in (params.get("booster"), params.get("boosting_type")):
+        logger.info("Dart booster can not be warm started", pid=pj["id"])
+        return None
+
+    # Models trained before warm starting was available are retrained fully
+    full_training_datetime = getattr(old_model, "full_training_datetime", None)
+    if full_training_datetime is None or datetime.utcnow() - full_training_datetime > (
+        timedelta(days=FULL_RETRAIN_INTERVAL_DAYS)
+    ):
+        logger.info("Full retraining is due", pid=pj["id"])
+        return None
+
+    return old_model
+
+
+def _hyper_params_changed(
+    pj: PredictionJobDataClass, hyper_params: dict, init_model: OpenstfRegressor
+) -> bool:
+    """Whether the hyperparameters differ from those the init model was trained with,
+    the number of threads is not a hyperparameter of the model."""
+    logger = structlog.get_logger(__name__)
+
+    init_params = init_model.get_params()
+    changed = [
+        key
+        for key, value in hyper_params.items()
+        if key in init_params and key != "n_jobs" and value != init_params[key]
+        # The missing value parameter is NaN in both
+        and not (_is_nan(value) and _is_nan(init_params[key]))
+    ]
+    if changed:
+        logger.info("Hyperparameters changed, train a new model", pid=pj["id"])
+    return len(changed) > 0
+
+
+def _is_nan(value) -> bool:
+    return isinstance(value, float) and np.isnan(value)
+
+
+def _get_warm_start_data(
+    pj: PredictionJobDataClass,
+    data_with_features: pd.DataFrame,
+    init_model: OpenstfRegressor,
+) -> Optional[pd.DataFrame]:
+    """Get the recent data to continue boosting on, None when the full data should
+    be used because the features changed or the init model drifted."""
+    logger = structlog.get_logger(__name__)
+
+    features = data_with_features.iloc[:, 1:-1]
+    if list(init_model.feature_names) != list(features.columns):
+        logger.info("Features changed, train a new model", pid=pj["id"])
+        return None
+
+    n_days = max(WARM_START_MIN_TRAINING_DAYS, int(getattr(init_model, "age", 0)))
+    start = data_with_features.index.max() - timedelta(days=n_days)
+    recent_data = data_with_features[data_with_features.index > start]
+    if not validation.is_data_sufficient(recent_data):
+        logger.info("Not enough recent data to warm start", pid=pj["id"])
+        return None
+
+    score = init_model.score(recent_data.iloc[:, 1:-1], recent_data.iloc[:, 0])
+    if score < WARM_START_MIN_SCORE:
+        logger.info("Old model drifted, train a new model", pid=pj["id"], score=score)
+        return None
+
+    logger.info("Warm start from old model", pid=pj["id"], days=n_days)
+    return recent_data
+
+
+def _get_init_model_kwargs(
+    pj: PredictionJobDataClass, init_model: OpenstfRegressor
+) -> dict:
+    if MLModelType(pj["model"]) == MLModelType.XGB:
+        return {"xgb_model": init_model.get_booster()}
+    return {"init_model": init_model.booster_}
+
+
 def get_model_age(trained_models_folder: str, pid: int) -> float:
     """returns age of most recently trained model in days.
     If no previous model can be found, this returns float(inf).
@@ -0,0 +1,93 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+from openstf_dbc.services.prediction_job import PredictionJobDataClass
+from sklearn.base import RegressorMixin
+
+from openstf.exceptions import ModelWithoutStDev
+from openstf.model.serializer import PersistentStorageSerializer
+from openstf.model.standard_deviation_updater import StandardDeviationUpdater
+
+
+def update_standard_deviation_pipeline(
+    pj: PredictionJobDataClass,
+    realised: pd.DataFrame,
+    predicted_load: pd.DataFrame,
+    trained_models_folder: Union[str, Path],
+) -> pd.DataFrame:
+    """Update standard deviation pipeline
+
+    This is the top-level pipeline which includes loading the most recent model for
+    the given prediction job and saving its running standard deviation next to it.
+    The next time the model is loaded, this standard deviation is used for the
+    confidence interval.
+
+    Expected prediction job keys: "id"
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        realised (pd.DataFrame): Realised load with a "load" column
+        predicted_load (pd.DataFrame): Predicted load with a "forecast_<t_ahead>h"
+            column per horizon
+        trained_models_folder (Path): Path where trained models are stored
+
+    Returns:
+        pd.DataFrame: Updated standard deviation
+
+    """
+    serializer = PersistentStorageSerializer(
+        trained_models_folder=trained_models_folder
+    )
+    # Load most recent model for the given pid
+    model, _ = serializer.load_model(pj["id"])
+    updater = serializer.load_standard_deviation_updater(model)
+
+    updater = update_standard_deviation_pipeline_core(
+        model, realised, predicted_load, updater
+    )
+
+    serializer.save_standard_deviation_updater(model, updater)
+
+    return updater.standard_deviation
+
+
+def update_standard_deviation_pipeline_core(
+    model: RegressorMixin,
+    realised: pd.DataFrame,
+    predicted_load: pd.DataFrame,
+    updater: Optional[StandardDeviationUpdater] = None,
+) -> StandardDeviationUpdater:
+    """Update standard deviation pipeline (core)
+
+    Folds the errors of the realised versus the predicted load into the running
+    standard deviation of the model. This pipeline has no database or persistent
+    storage dependencies.
+
+    Args:
+        model (RegressorMixin): Model with a standard deviation
+        realised (pd.DataFrame): Realised load with a "load" column
+        predicted_load (pd.DataFrame): Predicted load with a "forecast_<t_ahead>h"
+            column per horizon
+        updater (StandardDeviationUpdater, optional): Running standard deviation of
+            the model. Defaults to None, which starts from the standard deviation
+            determined during training.
+
+    Raises:
+        ModelWithoutStDev: When no running standard deviation is given and the
+            model has no standard deviation
+
+    Returns:
+        StandardDeviationUpdater: Running standard deviation including the new errors
+    """
+    if updater is None:
+        if getattr(model, "standard_deviation", None) is None:
+            raise ModelWithoutStDev("No stdev available")
+        updater = StandardDeviationUpdater.from_standard_deviation(
+            model.standard_deviation
+        )
+
+    return updater.update(realised["load"], predicted_load)
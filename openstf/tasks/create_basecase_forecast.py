@@ -19,12 +19,15 @@ Example:
         $ python create_basecase_forecast.py
 """
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
 
 from openstf.pipeline.create_basecase_forecast import create_basecase_forecast_pipeline
+from openstf.tasks.utils.forecastwriter import BufferedForecastWriter
+from openstf.tasks.utils.modelinputfetcher import BulkModelInputFetcher
 from openstf.tasks.utils.predictionjobloop import PredictionJobLoop
 from openstf.tasks.utils.taskcontext import TaskContext
 
@@ -33,7 +36,10 @@ T_AHEAD_DAYS: int = 14
 
 
 def create_basecase_forecast_task(
-    pj: PredictionJobDataClass, context: TaskContext
+    pj: PredictionJobDataClass,
+    context: TaskContext,
+    forecast_writer: BufferedForecastWriter = None,
+    model_input_fetcher: BulkModelInputFetcher = None,
 ) -> None:
     """Top level task that creates a basecase forecast.
     On this task level all database and context manager dependencies are resolved.
@@ -41,13 +47,19 @@ def create_basecase_forecast_task(
     Args:
         pj (PredictionJobDataClass): Prediction job
         context (TaskContext): Contect object that holds a config manager and a database connection
+        forecast_writer (BufferedForecastWriter, optional): Writer that buffers the
+            forecast, defaults to writing directly to the database.
+        model_input_fetcher (BulkModelInputFetcher, optional): Fetcher that shares
+            predictors between prediction jobs, defaults to the database.
     """
     # Define datetime range for input data
     datetime_start = datetime.utcnow() - timedelta(days=T_BEHIND_DAYS)
     datetime_end = datetime.utcnow() + timedelta(days=T_AHEAD_DAYS)
 
     # Retrieve input data
-    input_data = context.database.get_model_input(
+    if model_input_fetcher is None:
+        model_input_fetcher = context.database
+    input_data = model_input_fetcher.get_model_input(
         pid=pj["id"],
         location=[pj["lat"], pj["lon"]],
         datetime_start=datetime_start,
@@ -66,18 +78,31 @@ def create_basecase_forecast_task(
     ]
 
     # Write basecase forecast to the database
-    context.database.write_forecast(basecase_forecast, t_ahead_series=True)
+    if forecast_writer is None:
+        forecast_writer = context.database
+    forecast_writer.write_forecast(basecase_forecast, t_ahead_series=True)
 
 
 def main():
     taskname = Path(__file__).name.replace(".py", "")
 
     with TaskContext(taskname) as context:
-        model_type = ["xgb", "xgb_quantile", "lgb"]
-
-        PredictionJobLoop(context, model_type=model_type).map(
-            create_basecase_forecast_task, context
-        )
+        model_type = ["xgb", "xgb_quantile", "lgb", "lgb_quantile"]
+
+        # Predictors are fetched once for prediction jobs at the same location and
+        # forecasts of multiple prediction jobs are written together
+        fetcher = BulkModelInputFetcher(context.database)
+        with BufferedForecastWriter(context.database.write_forecast) as writer:
+            PredictionJobLoop(
+                context, model_type=model_type, forecast_writer=writer
+            ).map(
+                partial(
+                    create_basecase_forecast_task,
+                    forecast_writer=writer,
+                    model_input_fetcher=fetcher,
+                ),
+                context,
+            )
 
 
 if __name__ == "__main__":
@@ -28,12 +28,16 @@ Attributes:
 
 """
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
 
+import pandas as pd
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
 
 from openstf.enums import MLModelType
 from openstf.pipeline.create_forecast import create_forecast_pipeline
+from openstf.tasks.utils.forecastwriter import BufferedForecastWriter
+from openstf.tasks.utils.modelinputfetcher import BulkModelInputFetcher
 from openstf.tasks.utils.predictionjobloop import PredictionJobLoop
 from openstf.tasks.utils.taskcontext import TaskContext
 
@@ -53,25 +57,72 @@ def create_forecast_task(pj: PredictionJobDataClass, context: TaskContext) -> No
         pj (PredictionJobDataClass): Prediction job
         context (TaskContext): Contect object that holds a config manager and a database connection
     """
-    # Extract trained models folder
-    trained_models_folder = context.config.paths.trained_models_folder
+    input_data = get_forecast_input_data(pj, context)
+    create_forecast_from_input_data(pj, input_data, context)
+
+
+def get_forecast_input_data(
+    pj: PredictionJobDataClass,
+    context: TaskContext,
+    model_input_fetcher: BulkModelInputFetcher = None,
+) -> pd.DataFrame:
+    """Retrieve the input data of a forecast from the database.
+
+    This is the fetch step of the create forecast task.
+
+    Expected prediction job keys: "id", "lat", "lon"
 
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        context (TaskContext): Contect object that holds a config manager and a database connection
+        model_input_fetcher (BulkModelInputFetcher, optional): Fetcher that shares
+            predictors between prediction jobs, defaults to the database.
+
+    Returns:
+        pd.DataFrame: Input data for the forecast
+    """
     # Define datetime range for input data
     datetime_start = datetime.utcnow() - timedelta(days=T_BEHIND_DAYS)
     datetime_end = datetime.utcnow() + timedelta(days=T_AHEAD_DAYS)
 
     # Retrieve input data
-    input_data = context.database.get_model_input(
+    if model_input_fetcher is None:
+        model_input_fetcher = context.database
+    return model_input_fetcher.get_model_input(
         pid=pj["id"],
         location=[pj["lat"], pj["lon"]],
         datetime_start=datetime_start,
         datetime_end=datetime_end,
     )
+
+
+def create_forecast_from_input_data(
+    pj: PredictionJobDataClass,
+    input_data: pd.DataFrame,
+    context: TaskContext,
+    forecast_writer: BufferedForecastWriter = None,
+) -> None:
+    """Create a forecast from retrieved input data and write it to the database.
+
+    This is the compute step of the create forecast task.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        input_data (pd.DataFrame): Input data as retrieved by get_forecast_input_data
+        context (TaskContext): Contect object that holds a config manager and a database connection
+        forecast_writer (BufferedForecastWriter, optional): Writer that buffers the
+            forecast, defaults to writing directly to the database.
+    """
+    # Extract trained models folder
+    trained_models_folder = context.config.paths.trained_models_folder
+
     # Make forecast with the forecast pipeline
     forecast = create_forecast_pipeline(pj, input_data, trained_models_folder)
 
     # Write forecast to the database
-    context.database.write_forecast(forecast, t_ahead_series=True)
+    if forecast_writer is None:
+        forecast_writer = context.database
+    forecast_writer.write_forecast(forecast, t_ahead_series=True)
 
 
 def main(model_type=None):
@@ -83,10 +134,17 @@ def main(model_type=None):
         if model_type is None:
             model_type = [ml.value for ml in MLModelType]
 
-        PredictionJobLoop(
-            context,
-            model_type=model_type,
-        ).map(create_forecast_task, context)
+        # Predictors are fetched once for prediction jobs at the same location and
+        # forecasts of multiple prediction jobs are written together
+        fetcher = BulkModelInputFetcher(context.database)
+        with BufferedForecastWriter(context.database.write_forecast) as writer:
+            PredictionJobLoop(
+                context, model_type=model_type, forecast_writer=writer
+            ).map_with_prefetch(
+                partial(get_forecast_input_data, model_input_fetcher=fetcher),
+                partial(create_forecast_from_input_data, forecast_writer=writer),
+                context,
+            )
 
 
 if __name__ == "__main__":
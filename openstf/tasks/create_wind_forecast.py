@@ -15,18 +15,22 @@ Example:
 Attributes:
 
 """
+from functools import partial
 from pathlib import Path
 
 from openstf.feature_engineering import weather_features
+from openstf.tasks.utils.forecastwriter import BufferedForecastWriter
 from openstf.tasks.utils.predictionjobloop import PredictionJobLoop
 from openstf.tasks.utils.taskcontext import TaskContext
 
 
-def make_wind_forecast_pj(pj, context):
+def make_wind_forecast_pj(pj, context, forecast_writer=None):
     """Make a wind prediction for a specific prediction job
 
     Args:
         pj: (dict) prediction job
+        forecast_writer (BufferedForecastWriter, optional): Writer that buffers the
+            forecast, defaults to writing directly to the database.
     """
     context.logger.info("Get turbine data", turbine_type=pj["turbine_type"])
     turbine_data = context.database.get_power_curve(pj["turbine_type"])
@@ -52,7 +56,9 @@ def make_wind_forecast_pj(pj, context):
     power["algtype"] = "powerCurve"
     power["customer"] = pj["name"]
     power["description"] = pj["description"]
-    context.database.write_forecast(power, t_ahead_series=True)
+    if forecast_writer is None:
+        forecast_writer = context.database
+    forecast_writer.write_forecast(power, t_ahead_series=True)
 
 
 def main():
@@ -63,9 +69,11 @@ def main():
         prediction_jobs = context.database.get_prediction_jobs_wind()
         prediction_jobs = [x for x in prediction_jobs if x["model"] == "latest"]
 
-        PredictionJobLoop(context, prediction_jobs=prediction_jobs).map(
-            make_wind_forecast_pj, context
-        )
+        # Forecasts of multiple prediction jobs are written together
+        with BufferedForecastWriter(context.database.write_forecast) as writer:
+            PredictionJobLoop(
+                context, prediction_jobs=prediction_jobs, forecast_writer=writer
+            ).map(partial(make_wind_forecast_pj, forecast_writer=writer), context)
 
 
 if __name__ == "__main__":
@@ -16,24 +16,55 @@ Example:
         $ python optimize_hyperparameters.py
 
 """
+import json
+import os
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import List, Optional
 
+import pandas as pd
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
 
 from openstf.enums import MLModelType
+from openstf.model.serializer import PersistentStorageSerializer
 from openstf.monitoring import teams
-from openstf.pipeline.optimize_hyperparameters import optimize_hyperparameters_pipeline
+from openstf.pipeline.optimize_hyperparameters import (
+    MULTI_FIDELITY_N_TRIALS,
+    N_TRIALS,
+    optimize_hyperparameters_pipeline,
+)
+from openstf.tasks.utils.checkpointjournal import CheckpointJournal
 from openstf.tasks.utils.predictionjobloop import PredictionJobLoop
 from openstf.tasks.utils.taskcontext import TaskContext
 
 MAX_AGE_HYPER_PARAMS_DAYS = 31
 DEFAULT_TRAINING_PERIOD_DAYS = 91
+JOURNAL_FOLDER = "journals"
+# Studies are stored so an interrupted optimization is resumed
+STUDY_FOLDER = "optuna_studies"
+# Number of processes that run the trials of a study and their total thread budget
+OPTIMIZATION_N_WORKERS = 1
+OPTIMIZATION_N_JOBS = None
+# Train most trials only on a subsample of the data, see optuna_optimization. Off by
+# default: the median pruner already stops bad trials after a few boosting rounds,
+# which is cheaper than a rung on the subsampled data for the current data sizes.
+OPTIMIZATION_MULTI_FIDELITY = False
+# The search starts from the hyperparameters of the current model of the pid and of
+# the pids with the most similar daily load profile which were optimized before with
+# the same model type. The profiles are stored per pid, so they are shared by all
+# runs and workers of the task.
+PROFILE_FOLDER = "hyperparameter_profiles"
+WARM_START_N_SIMILAR = 2
+WARM_START_MIN_CORRELATION = 0.8
+WARM_START_SEARCH_FRACTION = 0.25
+# Profiles of pids which were not optimized for this many days are not used
+MAX_AGE_PROFILE_DAYS = 3 * MAX_AGE_HYPER_PARAMS_DAYS
 
 
 def optimize_hyperparameters_task(
     pj: PredictionJobDataClass, context: TaskContext
-) -> None:
+) -> bool:
     """Optimize hyperparameters task.
 
     Expected prediction job keys: "id", "model", "lat", "lon", "name", "description"
@@ -42,6 +73,10 @@ def optimize_hyperparameters_task(
     Args:
         pj (PredictionJobDataClass): Prediction job
         context (TaskContext): Task context
+
+    Returns:
+        bool: Whether the hyperparameters were optimized, which also saves a new
+            model. False if the hyperparameters were optimized recently.
     """
     # Folder where to store models
     trained_models_folder = Path(context.config.paths.trained_models_folder)
@@ -57,7 +92,7 @@ def optimize_hyperparameters_task(
                 last_optimized_days=last_optimized_days,
                 max_age=MAX_AGE_HYPER_PARAMS_DAYS,
             )
-            return
+            return False
 
     datetime_start = datetime.utcnow() - timedelta(days=DEFAULT_TRAINING_PERIOD_DAYS)
     datetime_end = datetime.utcnow()
@@ -69,11 +104,27 @@ def optimize_hyperparameters_task(
         datetime_end=datetime_end,
     )
 
+    load_profile = get_daily_load_profile(input_data)
+    warm_start_params = get_warm_start_params(
+        pj, load_profile, trained_models_folder, context
+    )
+
     # Optimize hyperparams
     hyperparameters = optimize_hyperparameters_pipeline(
         pj,
         input_data,
         trained_models_folder=trained_models_folder,
+        n_trials=MULTI_FIDELITY_N_TRIALS if OPTIMIZATION_MULTI_FIDELITY else N_TRIALS,
+        multi_fidelity=OPTIMIZATION_MULTI_FIDELITY,
+        storage_folder=trained_models_folder / STUDY_FOLDER,
+        n_workers=OPTIMIZATION_N_WORKERS,
+        n_jobs=OPTIMIZATION_N_JOBS,
+        warm_start_params=warm_start_params,
+        search_space_fraction=WARM_START_SEARCH_FRACTION,
+    )
+
+    register_optimized_hyperparameters(
+        pj, load_profile, hyperparameters, trained_models_folder
     )
 
     context.database.write_hyper_params(pj, hyperparameters)
@@ -85,16 +136,164 @@ def optimize_hyperparameters_task(
 
     teams.post_teams(teams.format_message(title=title, params=hyperparameters))
 
+    return True
+
+
+def get_daily_load_profile(input_data: pd.DataFrame) -> Optional[pd.Series]:
+    """Normalized mean load per time of day, used to find similar prediction jobs.
+
+    Args:
+        input_data (pd.DataFrame): Input data with a load column
+
+    Returns:
+        pd.Series: Daily load profile, None when there is no (varying) load.
+    """
+    load = input_data["load"].dropna()
+    if load.empty:
+        return None
+
+    profile = load.groupby(load.index.hour * 60 + load.index.minute).mean()
+    if profile.std() == 0 or pd.isna(profile.std()):
+        return None
+    return (profile - profile.mean()) / profile.std()
+
+
+def get_warm_start_params(
+    pj: PredictionJobDataClass,
+    load_profile: Optional[pd.Series],
+    trained_models_folder: Path,
+    context: TaskContext,
+) -> List[dict]:
+    """Get the hyperparameters from which the optimization of a pid is started.
+
+    These are the hyperparameters of the current model of the pid followed by the
+    optimized hyperparameters of the pids with the same model type and the most
+    similar daily load profile, see register_optimized_hyperparameters.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        load_profile (pd.Series): Daily load profile of the pid
+        trained_models_folder (Path): Path where trained models are stored
+        context (TaskContext): Task context
+
+    Returns:
+        list of dict: Hyperparameters, the most promising first
+    """
+    warm_start_params = []
+
+    try:
+        model, _ = PersistentStorageSerializer(trained_models_folder).load_model(
+            pid=pj["id"]
+        )
+        warm_start_params.append(model.get_params())
+    except Exception as e:
+        # Warm starting is optional, without a model the search starts cold
+        context.logger.info("No current model to warm start from", error=str(e))
+
+    if load_profile is None:
+        return warm_start_params
+
+    similarities = []
+    for record in _read_optimized_profiles(trained_models_folder, pj["model"]):
+        if record["pid"] == pj["id"]:
+            continue
+        profile = pd.Series(record["profile"])
+        profile.index = profile.index.astype(int)
+        correlation = load_profile.corr(profile)
+        if correlation >= WARM_START_MIN_CORRELATION:
+            similarities.append((correlation, record["pid"], record["hyper_params"]))
+
+    similarities.sort(key=lambda similarity: similarity[0], reverse=True)
+    for correlation, pid, hyperparameters in similarities[:WARM_START_N_SIMILAR]:
+        context.logger.info(
+            "Warm start from similar prediction job",
+            similar_pid=pid,
+            correlation=round(correlation, 3),
+        )
+        warm_start_params.append(hyperparameters)
+
+    return warm_start_params
+
+
+def register_optimized_hyperparameters(
+    pj: PredictionJobDataClass,
+    load_profile: Optional[pd.Series],
+    hyperparameters: dict,
+    trained_models_folder: Path,
+) -> None:
+    """Store the optimized hyperparameters of a pid to warm start similar pids.
+
+    The load profile, model type and hyperparameters are written to a json file
+    per pid in the PROFILE_FOLDER of the trained models folder.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        load_profile (pd.Series): Daily load profile of the pid
+        hyperparameters (dict): Optimized hyperparameters
+        trained_models_folder (Path): Path where trained models are stored
+    """
+    if load_profile is None:
+        return
+
+    record = dict(
+        pid=pj["id"],
+        model=pj["model"],
+        profile={str(minute): value for minute, value in load_profile.items()},
+        hyper_params=hyperparameters,
+    )
+    folder = Path(trained_models_folder) / PROFILE_FOLDER
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{pj['id']}.json"
+    # Write to a temporary file first, so readers never see a partial file
+    temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporary_path, "w") as file:
+        json.dump(record, file, default=_to_json)
+    os.replace(temporary_path, path)
+
+
+def _read_optimized_profiles(trained_models_folder: Path, model_type: str) -> list:
+    oldest_allowed = time.time() - MAX_AGE_PROFILE_DAYS * 24 * 60 * 60
+    records = []
+    for path in (Path(trained_models_folder) / PROFILE_FOLDER).glob("*.json"):
+        try:
+            if path.stat().st_mtime < oldest_allowed:
+                continue
+            with open(path, "r") as file:
+                record = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if record.get("model") == model_type:
+            records.append(record)
+    return records
 
-def main():
+
+def _to_json(value):
+    # Numpy scalars, for example from the optimization
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def main(resume=False):
+    """Optimize the hyperparameters for all prediction jobs.
+
+    Args:
+        resume (bool, optional): Skip the prediction jobs which were already
+            optimized successfully by a previous run of today. Defaults to False.
+    """
     taskname = Path(__file__).name.replace(".py", "")
 
     with TaskContext(taskname) as context:
         model_type = [ml.value for ml in MLModelType]
 
-        PredictionJobLoop(context, model_type=model_type).map(
-            optimize_hyperparameters_task, context
+        checkpoint_journal = CheckpointJournal(
+            Path(context.config.paths.trained_models_folder) / JOURNAL_FOLDER,
+            taskname,
+            resume=resume,
         )
+        PredictionJobLoop(
+            context, model_type=model_type, checkpoint_journal=checkpoint_journal
+        ).map(optimize_hyperparameters_task, context)
 
 
 if __name__ == "__main__":
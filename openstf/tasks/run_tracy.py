@@ -7,17 +7,26 @@ Tracy checks the mysql todolist and tries her best to execute the
 functions with desired inputs
 This scripts works as follows:
   1. Checks the mysql table 'todolist' for jobs (which are not already in progress and
-    which are not already failed)
-  2. Set all newly aquired jobs to 'in progress'
-For each job;
-  3. Convert input arguments to a dict with 'args' and 'kwargs'
-  4. Interpret the given function and arguments
-  5. Execute the job
-  6. Post result to Slack
-  7. Remove job from mysql table
-If job fails, set in progress to 2
-All functions that tracy is able to execute need to be imported and defined in the
-available_functions.
+    which are not already failed, or in progress with an expired lease)
+  2. Claims a batch of pids: all jobs of those pids are set to 'in progress'
+  3. Coalesces the jobs per pid: duplicate jobs run once, and a train model job is
+    subsumed by an optimize hyperparameters job, which also trains a model
+For each pid (in parallel when multiple workers are used);
+  4. Execute the job(s)
+  5. Remove the job(s) from mysql table
+If a pid fails, set in progress of its jobs to 2 and post the job(s) to Teams.
+Jobs with an unknown function are set to 2 as well and posted to Teams as unknown.
+Steps 1 to 5 are repeated until no claimable jobs are left.
+
+The ktp api does not store when a job was claimed, therefore the leases are kept in a
+local json file. A job that is still in progress after its lease expired (for
+example, because the process running it was killed) is claimed again. When leases
+are used, every pid runs in a supervised worker process with the lease duration as
+timeout, so a job never runs longer than its lease.
+
+Because the lease file is local, Tracy should run on a single host. A job in progress
+without a lease in the file is considered expired, so a Tracy on another host would
+claim the jobs that are in progress here again.
 
 Example:
     This module is meant to be called directly from a CRON job.
@@ -38,92 +47,347 @@ Attributes:
 # PRIMARY KEY (`id`), UNIQUE `id` (`id`))
 # ENGINE = InnoDB;
 
+import json
+import os
+import tempfile
+import time
+from collections import defaultdict
 from pathlib import Path
 
 from openstf.enums import TracyJobResult
 from openstf.monitoring import teams
 from openstf.tasks.optimize_hyperparameters import optimize_hyperparameters_task
 from openstf.tasks.train_model import train_model_task
+from openstf.tasks.utils.predictionjobloop import (
+    PredictionJobException,
+    PredictionJobLoop,
+)
 from openstf.tasks.utils.taskcontext import TaskContext
 
+# (TODO remove old names when jobs are done)
+TRAIN_MODEL_FUNCTIONS = ["train_model", "train_specific_model"]
+OPTIMIZE_HYPERPARAMETERS_FUNCTIONS = [
+    "optimize_hyperparameters",
+    "optimize_hyperparameters_for_specific_pid",
+]
+
+TRACY_BATCH_SIZE = 10
+TRACY_N_WORKERS = 2
+TRACY_LEASE_SECONDS = 6 * 60 * 60
+TRACY_LEASE_FILENAME = "tracy_leases.json"
+
+INPROGRESS_FAILED = 2
+
+
+class TracyLeases:
+    def __init__(self, path, lease_seconds=TRACY_LEASE_SECONDS):
+        """Leases of claimed Tracy jobs, stored in a local json file.
+
+        Args:
+            path (str or pathlib.Path): Path of the json file, the file is created when
+                the first lease is acquired.
+            lease_seconds (float, optional): Duration of a lease in seconds.
+        """
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        # Leases as last read from the file, with the file state they were read at
+        self._cache = None
+
+    def _load(self):
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return {}
+
+        # The file is only read again when it was changed
+        file_state = self._file_state(stat)
+        if self._cache is not None and self._cache[0] == file_state:
+            return dict(self._cache[1])
+
+        try:
+            with open(self.path, "r") as file:
+                leases = {
+                    int(job_id): float(exp) for job_id, exp in json.load(file).items()
+                }
+        except (ValueError, OSError):
+            # A corrupt lease file makes every in progress job claimable again
+            return {}
+
+        self._cache = (file_state, leases)
+        return dict(leases)
+
+    def _save(self, leases):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=self.path.parent, suffix=".tmp"
+        )
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump({str(job_id): exp for job_id, exp in leases.items()}, file)
+        os.replace(temp_path, self.path)
+        self._cache = (self._file_state(self.path.stat()), dict(leases))
 
-def run_tracy(context):
-    # Get all Tracy jobs
-    tracy_jobs = context.database.ktp_api.get_all_tracy_jobs(inprogress=0)
-    num_jobs = len(tracy_jobs)
+    @staticmethod
+    def _file_state(stat):
+        # Every save replaces the file, which gives it a new inode
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
 
-    if num_jobs == 0:
-        context.logger.warning(f"Number of tracy jobs is {num_jobs}, exit task")
+    def is_expired(self, job_id):
+        """Whether the lease of a job expired, a job without lease is expired too."""
+        return self._load().get(job_id, 0.0) < time.time()
+
+    def acquire(self, job_ids):
+        """Acquire (or renew) the leases of jobs."""
+        leases = self._load()
+        expires = time.time() + self.lease_seconds
+        leases.update({job_id: expires for job_id in job_ids})
+        self._save(leases)
+
+    def release(self, job_ids):
+        """Release the leases of jobs."""
+        leases = self._load()
+        for job_id in job_ids:
+            leases.pop(job_id, None)
+        self._save(leases)
+
+
+def run_tracy(
+    context,
+    n_workers=1,
+    lease_file=None,
+    lease_seconds=TRACY_LEASE_SECONDS,
+    batch_size=TRACY_BATCH_SIZE,
+    worker_context_factory=None,
+):
+    """Process all Tracy jobs.
+
+    Args:
+        context (TaskContext): Task context
+        n_workers (int, optional): Number of pids that are processed in parallel.
+            Defaults to 1.
+        lease_file (str or pathlib.Path, optional): Local json file with the leases
+            of the claimed jobs. Defaults to None, which means jobs in progress are
+            never claimed again.
+        lease_seconds (float, optional): Duration of a lease in seconds, also the
+            timeout of the jobs of a pid when a lease file is given.
+        batch_size (int, optional): Maximum number of pids claimed at once.
+        worker_context_factory (callable, optional): Creates the context of a
+            worker process, see PredictionJobLoop.
+    """
+    leases = None
+    if lease_file is not None:
+        leases = TracyLeases(lease_file, lease_seconds)
+
+    # Never claim a job twice in a single run
+    claimed_job_ids = set()
+    num_batches = 0
+
+    while True:
+        jobs_per_pid = claim_tracy_jobs(context, leases, batch_size, claimed_job_ids)
+
+        if len(jobs_per_pid) == 0:
+            break
+
+        if num_batches == 0:
+            context.logger.info("Start processing Tracy jobs")
+        num_batches += 1
+
+        run_tracy_batch(
+            context, jobs_per_pid, leases, n_workers, worker_context_factory
+        )
+
+    if num_batches == 0:
+        context.logger.warning("Number of tracy jobs is 0, exit task")
         return
 
-    context.logger.info("Start processing Tracy jobs", num_jobs=num_jobs)
+    context.logger.info(
+        "Finished processing all Tracy jobs - Tracy out!", num_batches=num_batches
+    )
+
 
-    for i, job in enumerate(tracy_jobs):
+def claim_tracy_jobs(context, leases, batch_size, claimed_job_ids):
+    """Claim the jobs of at most batch_size pids.
 
-        # get a new logger with bound job
-        logger = context.logger.bind(job=job)
-        logger.info("Process job", job_counter=i, total_jobs=num_jobs)
+    All claimable jobs of a claimed pid are claimed together, so they can be
+    coalesced. Jobs with an unknown function are marked as failed.
 
-        # Set all retrieved items of the todolist to inprogress
-        job["inprogress"] = 1
-        context.database.ktp_api.update_tracy_job(job)
+    Args:
+        context (TaskContext): Task context
+        leases (TracyLeases): Leases of the claimed jobs, or None
+        batch_size (int): Maximum number of pids
+        claimed_job_ids (set): Ids of the jobs claimed earlier in this run, the
+            newly claimed job ids are added
 
+    Returns:
+        dict: Claimed jobs per pid, in order of the oldest job
+    """
+    ktp_api = context.database.ktp_api
+    jobs = list(ktp_api.get_all_tracy_jobs(inprogress=0))
+    if leases is not None:
+        jobs += [
+            job
+            for job in ktp_api.get_all_tracy_jobs(inprogress=1)
+            if leases.is_expired(job["id"])
+        ]
+
+    jobs_per_pid = defaultdict(list)
+    for job in sorted(jobs, key=lambda job: job["id"]):
+        if job["id"] in claimed_job_ids:
+            continue
         pid = int(job["args"])
-        pj = context.database.get_prediction_job(pid)
-        result, exc = run_tracy_job(job, pj, context)
-        # job processing was succefull
-        if result is TracyJobResult.SUCCESS:
+        if pid not in jobs_per_pid and len(jobs_per_pid) >= batch_size:
+            continue
+        jobs_per_pid[pid].append(job)
+
+    for pid, pid_jobs in jobs_per_pid.items():
+        for job in pid_jobs:
+            claimed_job_ids.add(job["id"])
+            # Set all retrieved items of the todolist to inprogress
+            job["inprogress"] = 1
+            ktp_api.update_tracy_job(job)
+
+        if leases is not None:
+            leases.acquire([job["id"] for job in pid_jobs])
+
+        unknown_jobs = [
+            job for job in pid_jobs if _normalize_function(job["function"]) is None
+        ]
+        for job in unknown_jobs:
+            context.logger.error(f"Unkown Tracy job {job['function']}", job=job)
+            pid_jobs.remove(job)
+            _mark_failed(context, job, title="Unknown function of Tracy job")
+        if leases is not None and len(unknown_jobs) > 0:
+            leases.release([job["id"] for job in unknown_jobs])
+
+    return {pid: pid_jobs for pid, pid_jobs in jobs_per_pid.items() if pid_jobs}
+
+
+def run_tracy_batch(
+    context, jobs_per_pid, leases=None, n_workers=1, worker_context_factory=None
+):
+    """Run the claimed jobs, coalesced per pid.
+
+    Successful jobs are deleted, the jobs of a failed pid are marked as failed.
+
+    Args:
+        context (TaskContext): Task context
+        jobs_per_pid (dict): Claimed jobs per pid
+        leases (TracyLeases, optional): Leases of the claimed jobs
+        n_workers (int, optional): Number of pids that are processed in parallel
+        worker_context_factory (callable, optional): Creates the context of a
+            worker process, see PredictionJobLoop.
+    """
+    functions_per_pid = {
+        pid: coalesce_tracy_jobs(pid_jobs) for pid, pid_jobs in jobs_per_pid.items()
+    }
+
+    def on_successful(pj):
+        for job in jobs_per_pid[pj["id"]]:
+            logger = context.logger.bind(job=job)
             logger.info("Succesfully processed Tracy job")
             # Delete job when succesfull
             context.database.ktp_api.delete_tracy_job(job)
             logger.info("Delete Tracy job")
 
-        # job was unknown
-        elif result is TracyJobResult.UNKNOWN:
-            logger.error(f"Unkown Tracy job {job['function']}")
-
-        # job processing failed / raised an exception
-        elif result is TracyJobResult.FAILED:
-            job["inprogress"] = 2
-            context.database.ktp_api.update_tracy_job(job)
+    def on_exception(pj, exc):
+        for job in jobs_per_pid[pj["id"]]:
             msg = "Exception occured while processing Tracy job"
-            logger.error(msg, exc_info=exc)
-            teams.post_teams(teams.format_message(title=msg, params=job))
+            context.logger.bind(job=job).error(msg, exc_info=exc)
+            _mark_failed(context, job, title=msg)
 
-    context.logger.info("Finished processing all Tracy jobs - Tracy out!")
+    def on_end(pj, successful):
+        if leases is not None:
+            leases.release([job["id"] for job in jobs_per_pid[pj["id"]]])
 
+    prediction_jobs = [context.database.get_prediction_job(pid) for pid in jobs_per_pid]
 
-def run_tracy_job(job, pj, context):
-    # Try to process Tracy job
+    loop = PredictionJobLoop(
+        context,
+        random_order=False,
+        prediction_jobs=prediction_jobs,
+        on_successful_callback=on_successful,
+        on_exception_callback=on_exception,
+        on_end_callback=on_end,
+        n_workers=n_workers,
+        worker_context_factory=worker_context_factory,
+        job_timeout=None if leases is None else leases.lease_seconds,
+    )
     try:
-        # If train model job (TODO remove old name when jobs are done)
-        if job["function"] in ["train_model", "train_specific_model"]:
-            train_model_task(pj, context, check_old_model_age=False)
+        # Functions are passed as positional argument, so they are not logged
+        loop.map(run_tracy_functions, context, functions_per_pid)
+    except PredictionJobException:
+        # Failed jobs are already handled by the exception callback
+        pass
+
+
+def coalesce_tracy_jobs(jobs):
+    """Coalesce the jobs of a single pid into the functions to run.
+
+    Duplicate jobs run once. Optimizing hyperparameters trains a new model as well,
+    so a train model job is subsumed by an optimize hyperparameters job.
+
+    Args:
+        jobs (list): Tracy jobs of a single pid, with known functions
+
+    Returns:
+        list: Normalized function names, in order of execution
+    """
+    functions = {_normalize_function(job["function"]) for job in jobs}
+    return [
+        function
+        for function in ("optimize_hyperparameters", "train_model")
+        if function in functions
+    ]
+
+
+def run_tracy_functions(pj, context, functions_per_pid):
+    """Run the coalesced Tracy functions of a pid.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        context (TaskContext): Task context
+        functions_per_pid (dict): Normalized function names per pid, see
+            coalesce_tracy_jobs
+
+    Returns:
+        TracyJobResult: Result of the jobs
+    """
+    functions = functions_per_pid[pj["id"]]
+    model_trained = False
+
+    if "optimize_hyperparameters" in functions:
+        # Hyperparameters that were optimized recently are not optimized again
+        model_trained = bool(optimize_hyperparameters_task(pj, context))
+
+    if "train_model" in functions and not model_trained:
+        # A requested training is always a full training
+        train_model_task(pj, context, check_old_model_age=False, warm_start=False)
+
+    return TracyJobResult.SUCCESS
 
-        # If optimize hyperparameters job (TODO remove old name when jobs are done)
-        elif job["function"] in [
-            "optimize_hyperparameters",
-            "optimize_hyperparameters_for_specific_pid",
-        ]:
-            optimize_hyperparameters_task(pj, context)
 
-        # Else unknown job
-        else:
-            return TracyJobResult.UNKNOWN, None
+def _normalize_function(function):
+    """Normalized name of a Tracy job function, None if the function is unknown."""
+    if function in TRAIN_MODEL_FUNCTIONS:
+        return "train_model"
+    if function in OPTIMIZE_HYPERPARAMETERS_FUNCTIONS:
+        return "optimize_hyperparameters"
+    return None
 
-        # job processing was succesfull
-        return TracyJobResult.SUCCESS, None
 
-    # Processing of Tracy job failed
-    except Exception as e:
-        return TracyJobResult.FAILED, e
+def _mark_failed(context, job, title):
+    job["inprogress"] = INPROGRESS_FAILED
+    context.database.ktp_api.update_tracy_job(job)
+    teams.post_teams(teams.format_message(title=title, params=job))
 
 
 def main():
     taskname = Path(__file__).name.replace(".py", "")
 
     with TaskContext(taskname) as context:
-        run_tracy(context)
+        lease_file = (
+            Path(context.config.paths.trained_models_folder) / TRACY_LEASE_FILENAME
+        )
+        run_tracy(context, n_workers=TRACY_N_WORKERS, lease_file=lease_file)
 
 
 if __name__ == "__main__":
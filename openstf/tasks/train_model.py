@@ -23,25 +23,33 @@ Example:
 
 """
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
 
+import pandas as pd
 from openstf.dataclasses.model_specifications import ModelSpecificationDataClass
 from openstf_dbc.services.prediction_job import PredictionJobDataClass
 
 from openstf.enums import MLModelType
 from openstf.pipeline.train_model import train_model_pipeline
 
+from openstf.tasks.utils.checkpointjournal import CheckpointJournal
+from openstf.tasks.utils.modelinputfetcher import BulkModelInputFetcher
 from openstf.tasks.utils.predictionjobloop import PredictionJobLoop
 from openstf.tasks.utils.taskcontext import TaskContext
 
 TRAINING_PERIOD_DAYS: int = 120
 DEFAULT_CHECK_MODEL_AGE: bool = True
+# Continue boosting from the old model when possible, see train_model_pipeline
+DEFAULT_WARM_START: bool = True
+JOURNAL_FOLDER: str = "journals"
 
 
 def train_model_task(
     pj: PredictionJobDataClass,
     context: TaskContext,
     check_old_model_age: bool = DEFAULT_CHECK_MODEL_AGE,
+    warm_start: bool = DEFAULT_WARM_START,
 ) -> None:
     """Train model task.
 
@@ -55,27 +63,84 @@ def train_model_task(
         context (TaskContext): Contect object that holds a config manager and a
             database connection.
         check_old_model_age (bool): check if model is too young to be retrained
+        warm_start (bool): continue boosting from the old model when possible
     """
-    # Get the paths for storing model and reports from the config manager
-    trained_models_folder = Path(context.config.paths.trained_models_folder)
-    context.logger.debug(f"trained_models_folder: {trained_models_folder}")
-
     context.perf_meter.checkpoint("Added metadata to PredictionJob")
 
+    input_data = get_training_input_data(pj, context)
+
+    context.perf_meter.checkpoint("Retrieved timeseries input")
+
+    train_model_from_input_data(
+        pj,
+        input_data,
+        context,
+        check_old_model_age=check_old_model_age,
+        warm_start=warm_start,
+    )
+
+
+def get_training_input_data(
+    pj: PredictionJobDataClass,
+    context: TaskContext,
+    model_input_fetcher: BulkModelInputFetcher = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Retrieve the training input data from the database.
+
+    This is the fetch step of the train model task.
+
+    Expected prediction job keys: "id", "lat", "lon"
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        context (TaskContext): Contect object that holds a config manager and a
+            database connection.
+        model_input_fetcher (BulkModelInputFetcher, optional): Fetcher that shares
+            predictors between prediction jobs, defaults to the database.
+        **kwargs: Keyword arguments of the train model task, these are not used.
+
+    Returns:
+        pd.DataFrame: Training input data
+    """
     # Define start and end of the training input data
     datetime_start = datetime.utcnow() - timedelta(days=TRAINING_PERIOD_DAYS)
     datetime_end = datetime.utcnow()
 
     # todo: See if we can check model age before getting the data
     # Get training input data from database
-    input_data = context.database.get_model_input(
+    if model_input_fetcher is None:
+        model_input_fetcher = context.database
+    return model_input_fetcher.get_model_input(
         pid=pj["id"],
         location=[pj["lat"], pj["lon"]],
         datetime_start=datetime_start,
         datetime_end=datetime_end,
     )
 
-    context.perf_meter.checkpoint("Retrieved timeseries input")
+
+def train_model_from_input_data(
+    pj: PredictionJobDataClass,
+    input_data: pd.DataFrame,
+    context: TaskContext,
+    check_old_model_age: bool = DEFAULT_CHECK_MODEL_AGE,
+    warm_start: bool = DEFAULT_WARM_START,
+) -> None:
+    """Train a model on retrieved training input data.
+
+    This is the compute step of the train model task.
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        input_data (pd.DataFrame): Input data as retrieved by get_training_input_data
+        context (TaskContext): Contect object that holds a config manager and a
+            database connection.
+        check_old_model_age (bool): check if model is too young to be retrained
+        warm_start (bool): continue boosting from the old model when possible
+    """
+    # Get the paths for storing model and reports from the config manager
+    trained_models_folder = Path(context.config.paths.trained_models_folder)
+    context.logger.debug(f"trained_models_folder: {trained_models_folder}")
 
     # Excecute the model training pipeline
     train_model_pipeline(
@@ -83,18 +148,40 @@ def train_model_task(
         input_data,
         check_old_model_age=check_old_model_age,
         trained_models_folder=trained_models_folder,
+        warm_start=warm_start,
     )
 
     context.perf_meter.checkpoint("Model trained")
 
 
-def main(model_type=None):
+def main(model_type=None, resume=False):
+    """Train models for all prediction jobs.
+
+    Args:
+        model_type (list, optional): Model types of the prediction jobs to train.
+            Defaults to all model types.
+        resume (bool, optional): Skip the prediction jobs which were already trained
+            successfully by a previous run of today. Defaults to False.
+    """
     if model_type is None:
         model_type = [ml.value for ml in MLModelType]
 
     taskname = Path(__file__).name.replace(".py", "")
     with TaskContext(taskname) as context:
-        PredictionJobLoop(context, model_type=model_type).map(train_model_task, context)
+        checkpoint_journal = CheckpointJournal(
+            Path(context.config.paths.trained_models_folder) / JOURNAL_FOLDER,
+            taskname,
+            resume=resume,
+        )
+        # Predictors are fetched once for prediction jobs at the same location
+        fetcher = BulkModelInputFetcher(context.database)
+        PredictionJobLoop(
+            context, model_type=model_type, checkpoint_journal=checkpoint_journal
+        ).map_with_prefetch(
+            partial(get_training_input_data, model_input_fetcher=fetcher),
+            train_model_from_input_data,
+            context,
+        )
 
 
 if __name__ == "__main__":
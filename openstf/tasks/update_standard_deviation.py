@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""update_standard_deviation.py
+This module contains the CRON job that is periodically executed to keep the standard
+deviation of the models up to date without retraining them.
+
+The folowing tasks are caried out:
+  1: Retrieve the realised and predicted load of the last day (as used for the KPIs)
+  2: Fold the realised errors into the running standard deviation of the model
+  3: Save the running standard deviation next to the model
+
+Example:
+    This module is meant to be called directly from a CRON job.
+    Alternatively this code can be run directly by running::
+        $ python update_standard_deviation.py
+Attributes:
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from openstf_dbc.services.prediction_job import PredictionJobDataClass
+
+from openstf.enums import MLModelType
+from openstf.exceptions import NoPredictedLoadError, NoRealisedLoadError
+from openstf.pipeline.update_standard_deviation import (
+    update_standard_deviation_pipeline,
+)
+from openstf.tasks.utils.predictionjobloop import PredictionJobLoop
+from openstf.tasks.utils.taskcontext import TaskContext
+
+
+def update_standard_deviation_task(
+    pj: PredictionJobDataClass,
+    context: TaskContext,
+    start_time: datetime,
+    end_time: datetime,
+) -> None:
+    """Top level task that updates the standard deviation of a model.
+
+    On this task level all database and context manager dependencies are resolved.
+
+    Expected prediction job keys: "id"
+
+    Args:
+        pj (PredictionJobDataClass): Prediction job
+        context (TaskContext): Contect object that holds a config manager and a database connection
+        start_time (datetime): Start of the period with realised errors
+        end_time (datetime): End of the period with realised errors
+
+    Raises:
+        NoPredictedLoadError: When no predicted load for given datatime range.
+        NoRealisedLoadError: When no realised load for given datetime range.
+    """
+    # Extract trained models folder
+    trained_models_folder = context.config.paths.trained_models_folder
+
+    # Retrieve the same data as used for the KPI calculation
+    realised = context.database.get_load_pid(pj["id"], start_time, end_time, "15T")
+    predicted_load = context.database.get_predicted_load_tahead(
+        pj, start_time, end_time
+    )
+
+    if len(predicted_load) == 0:
+        raise NoPredictedLoadError(pj["id"], start_time, end_time)
+
+    if len(realised) == 0:
+        raise NoRealisedLoadError(pj["id"], start_time, end_time)
+
+    update_standard_deviation_pipeline(
+        pj, realised, predicted_load, trained_models_folder
+    )
+
+
+def main(model_type=None):
+    taskname = Path(__file__).name.replace(".py", "")
+    if model_type is None:
+        model_type = [ml.value for ml in MLModelType]
+
+    with TaskContext(taskname) as context:
+        # Set start and end time
+        start_time = datetime.utcnow() - timedelta(days=1)
+        end_time = datetime.utcnow()
+
+        PredictionJobLoop(context, model_type=model_type).map(
+            update_standard_deviation_task,
+            context,
+            start_time=start_time,
+            end_time=end_time,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+JOURNAL_DATE_FORMAT = "%Y%m%d"
+# Journals of a task that were not written to for this many days are removed
+JOURNAL_RETENTION_DAYS = 7
+
+
+class CheckpointJournal:
+    def __init__(
+        self,
+        folder,
+        task_name,
+        run_window=None,
+        resume=True,
+        retention_days=JOURNAL_RETENTION_DAYS,
+    ):
+        """Append-only journal with the outcome of every prediction job of a task run.
+
+        The journal of a run is a file of json lines, one line per finished
+        prediction job, named after the task and the run window. A task that is
+        restarted within the same run window can skip the prediction jobs which
+        were already completed successfully. Old journals of the task are removed.
+
+        Args:
+            folder (str or pathlib.Path): Folder in which the journals are stored
+            task_name (str): Name of the task
+            run_window (str, optional): Identifier of the period in which a
+                restarted task continues the previous run. Defaults to the current
+                date, so a task continues runs of the same day.
+            resume (bool, optional): Whether to continue the journal of a previous
+                run in the same run window. If False, a new journal is started.
+                Defaults to True.
+            retention_days (float, optional): Journals of the task which were last
+                written to more than this many days ago are removed. Defaults to
+                JOURNAL_RETENTION_DAYS.
+        """
+        if run_window is None:
+            run_window = datetime.utcnow().strftime(JOURNAL_DATE_FORMAT)
+
+        self.path = Path(folder) / f"{task_name}_{run_window}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if not resume and self.path.is_file():
+            self.path.unlink()
+
+        self._remove_old_journals(task_name, retention_days)
+
+    def completed_pids(self):
+        """Pids of the prediction jobs that were completed successfully.
+
+        A prediction job that failed after an earlier success is not completed.
+
+        Returns:
+            set: Completed pids
+        """
+        if not self.path.is_file():
+            return set()
+
+        completed = set()
+        with open(self.path, "r") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash while writing can leave an incomplete last line
+                    continue
+                if record["successful"]:
+                    completed.add(record["pid"])
+                else:
+                    completed.discard(record["pid"])
+
+        return completed
+
+    def record(self, pid, successful):
+        """Append the outcome of a prediction job to the journal.
+
+        The line is flushed to disk immediately, so it survives a crash of the task.
+
+        Args:
+            pid (int): Prediction job id
+            successful (bool): Whether the prediction job was successful
+        """
+        record = dict(
+            pid=pid,
+            successful=bool(successful),
+            datetime=datetime.utcnow().isoformat(),
+        )
+        with open(self.path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _remove_old_journals(self, task_name, retention_days):
+        oldest_allowed = time.time() - retention_days * 24 * 60 * 60
+        for path in self.path.parent.glob(f"{task_name}_*.jsonl"):
+            if path == self.path:
+                continue
+            try:
+                if path.stat().st_mtime < oldest_allowed:
+                    path.unlink()
+            except FileNotFoundError:
+                # Removed by a concurrent run of the task
+                pass
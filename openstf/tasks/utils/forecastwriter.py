@@ -0,0 +1,271 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import pandas as pd
+import structlog
+
+from openstf.tasks.utils.predictionjobloop import PredictionJobException
+
+# Flush when the buffer holds at least this many rows
+FLUSH_MAX_ROWS: int = 50000
+# Maximum time in seconds a forecast is kept in the buffer
+FLUSH_MAX_DELAY: float = 60.0
+# Time in seconds a forecast with a t ahead series is flushed before its t aheads
+# would change, which leaves time for the write itself
+T_AHEAD_MARGIN: float = 5.0
+
+
+class _BufferedForecast:
+    def __init__(self, data, kwargs, deadline):
+        self.data = data
+        self.kwargs = kwargs
+        self.deadline = deadline
+        self.pids = [int(pid) for pid in data["pid"].unique()] if "pid" in data else []
+
+    @property
+    def group_key(self):
+        # Forecasts are only combined when written with the same arguments and
+        # columns, so the combined write equals the separate writes
+        return tuple(sorted(self.kwargs.items())), tuple(self.data.columns)
+
+
+class BufferedForecastWriter:
+    def __init__(
+        self,
+        write_function,
+        max_rows=FLUSH_MAX_ROWS,
+        max_delay=FLUSH_MAX_DELAY,
+    ):
+        """Collects forecasts of multiple prediction jobs and writes them in batches.
+
+        Has the same write_forecast method as the database, a forecast is written
+        together with other buffered forecasts with the same arguments and columns.
+        The buffer is flushed when it holds max_rows rows, when a forecast was
+        buffered for max_delay seconds and when the writer is closed.
+
+        The t ahead series is determined by the database relative to the time of
+        writing. A forecast with t_ahead_series=True is therefore flushed before the
+        t ahead of any of its rows would change, so the written t ahead series is the
+        same as when the forecast was written immediately.
+
+        A batch that fails is written again per forecast, so a failure is
+        attributed to the pid(s) of the forecast that caused it. Failures are
+        collected in failures. When the writer is passed to the prediction job loop,
+        the loop reports a prediction job as successful only after its forecast is
+        written and takes its write failure from failures. The failures that are left
+        are raised by close.
+
+        Should be used as:
+        with BufferedForecastWriter(context.database.write_forecast) as writer:
+            PredictionJobLoop(context, forecast_writer=writer).map(
+                partial(create_forecast, forecast_writer=writer), context
+            )
+
+        The writer can only be used in the process that created it.
+
+        Args:
+            write_function (callable): Function that writes a forecast, with the
+                signature of DataBase.write_forecast
+            max_rows (int, optional): Number of buffered rows that triggers a flush.
+            max_delay (float, optional): Maximum time in seconds a forecast is
+                buffered.
+        """
+        self.write_function = write_function
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.logger = structlog.get_logger(self.__class__.__name__)
+
+        self.failures = {}
+        self.num_written = defaultdict(int)
+
+        self._buffer = []
+        self._buffered_pids = set()
+        self._num_rows = 0
+        # Guards the buffer, held while flushing so writes never run concurrently
+        self._lock = threading.RLock()
+        self._buffer_changed = threading.Condition(self._lock)
+        self._closed = False
+        self._flusher = threading.Thread(
+            target=self._flush_on_deadline, name="forecast-writer", daemon=True
+        )
+        self._flusher.start()
+
+    def write_forecast(self, data, **kwargs):
+        """Add a forecast to the buffer, see DataBase.write_forecast for arguments.
+
+        Args:
+            data (pd.DataFrame): Forecast with a pid column
+            **kwargs: Keyword arguments of DataBase.write_forecast
+        """
+        if self._closed:
+            raise RuntimeError("Cannot write forecast, the writer is closed")
+
+        deadline = time.time() + self.max_delay
+        if kwargs.get("t_ahead_series", False):
+            deadline = min(deadline, self._t_ahead_deadline(data))
+
+        with self._lock:
+            forecast = _BufferedForecast(data, kwargs, deadline)
+            self._buffer.append(forecast)
+            self._buffered_pids.update(forecast.pids)
+            self._num_rows += len(data)
+
+            if self._num_rows >= self.max_rows:
+                self.flush()
+            else:
+                self._buffer_changed.notify()
+
+    def flush(self):
+        """Write all buffered forecasts."""
+        with self._lock:
+            buffer, self._buffer, self._num_rows = self._buffer, [], 0
+            self._buffered_pids = set()
+
+            groups = defaultdict(list)
+            for forecast in buffer:
+                groups[forecast.group_key].append(forecast)
+
+            for forecasts in groups.values():
+                self._write_batch(forecasts)
+
+    def is_buffered(self, pid):
+        """Whether a forecast of the pid is buffered or being written.
+
+        Args:
+            pid (int): Id of the prediction job
+
+        Returns:
+            bool: True if a forecast of the pid is not written yet
+        """
+        # The lock is held while flushing, so this waits for a running write
+        with self._lock:
+            return pid in self._buffered_pids
+
+    def close(self):
+        """Flush the buffer and stop the writer.
+
+        Raises:
+            PredictionJobException: If the forecast of one or more pids could not be
+                written and the failure was not taken by the prediction job loop,
+                with the same metrics as the prediction job loop.
+        """
+        self._stop()
+        if len(self.failures) > 0:
+            raise PredictionJobException(self.metrics)
+
+    @property
+    def metrics(self):
+        pids = set(self.num_written) | set(self.failures)
+        exceptions = defaultdict(list)
+        for pid, exception in self.failures.items():
+            exceptions[str(exception)].append(pid)
+
+        return {
+            "num_jobs": len(pids),
+            "jobs_started": len(pids),
+            "jobs_successful": len(pids) - len(self.failures),
+            "jobs_unsuccessful": len(self.failures),
+            "pids_unsuccessful": sorted(self.failures),
+            "exceptions": dict(exceptions),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_info, stack_info):
+        if exc_type is None:
+            self.close()
+            return
+
+        # Do not hide the exception that is already raised
+        self._stop()
+        if len(self.failures) > 0:
+            self.logger.error(
+                "Forecasts of one or more pids could not be written", **self.metrics
+            )
+
+    def _stop(self):
+        with self._lock:
+            self._closed = True
+            self._buffer_changed.notify()
+        self._flusher.join()
+        self.flush()
+
+    def _write_batch(self, forecasts):
+        kwargs = forecasts[0].kwargs
+        batch = pd.concat([forecast.data for forecast in forecasts])
+
+        try:
+            self.write_function(batch, **kwargs)
+        except Exception as exception:
+            if len(forecasts) == 1:
+                self._record_failure(forecasts[0], exception)
+                return
+            self.logger.warning(
+                "Writing batch of forecasts failed, writing forecasts separately",
+                num_forecasts=len(forecasts),
+                exc_info=exception,
+            )
+            for forecast in forecasts:
+                self._write_batch([forecast])
+            return
+
+        for forecast in forecasts:
+            for pid in forecast.pids:
+                self.num_written[pid] += 1
+        self.logger.info(
+            "Written batch of forecasts", num_forecasts=len(forecasts), rows=len(batch)
+        )
+
+    def _record_failure(self, forecast, exception):
+        self.logger.error(
+            "Writing forecast failed", pids=forecast.pids, exc_info=exception
+        )
+        for pid in forecast.pids:
+            self.failures[pid] = exception
+
+    def _flush_on_deadline(self):
+        with self._lock:
+            while not self._closed:
+                if len(self._buffer) == 0:
+                    self._buffer_changed.wait()
+                    continue
+
+                timeout = min(f.deadline for f in self._buffer) - time.time()
+                if timeout > 0:
+                    self._buffer_changed.wait(timeout)
+                    continue
+
+                try:
+                    self.flush()
+                except Exception as exception:
+                    # Should not happen, failures of writes are recorded
+                    self.logger.error("Flushing forecasts failed", exc_info=exception)
+
+    @staticmethod
+    def _t_ahead_deadline(data):
+        """Time (as unix timestamp) before which the t ahead series of the forecast
+        does not change.
+
+        The t ahead of a row is the number of whole hours between its datetime and
+        the time of writing, which changes when that difference is a whole number
+        of hours.
+        """
+        if len(data) == 0:
+            return float("inf")
+
+        now = datetime.utcnow()
+        index = pd.DatetimeIndex(data.index)
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+
+        seconds_ahead = (index - now).total_seconds().to_numpy()
+        seconds_until_change = (seconds_ahead % 3600).min()
+
+        return time.time() + seconds_until_change - T_AHEAD_MARGIN
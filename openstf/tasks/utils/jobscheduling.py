@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Weight of the most recent runtime in the expected runtime of a prediction job
+RUNTIME_SMOOTHING = 0.5
+
+ORDER_LONGEST_FIRST = "longest_first"
+ORDER_DEADLINE = "deadline"
+ORDERS = (ORDER_LONGEST_FIRST, ORDER_DEADLINE)
+
+
+class RuntimeHistory:
+    def __init__(self, path):
+        """History of the runtime per prediction job, stored in a local json file.
+
+        The expected runtime of a prediction job is an exponentially smoothed
+        average of its measured runtimes.
+
+        Args:
+            path (str or pathlib.Path): Path of the json file, the file is created when
+                the history is saved.
+        """
+        self.path = Path(path)
+        self.runtimes = {}
+
+        if self.path.is_file():
+            with open(self.path, "r") as file:
+                self.runtimes = {
+                    int(pid): float(runtime) for pid, runtime in json.load(file).items()
+                }
+
+    def update(self, pid, runtime):
+        """Add a measured runtime (in seconds) of a prediction job."""
+        previous = self.runtimes.get(pid)
+        if previous is not None:
+            runtime = RUNTIME_SMOOTHING * runtime + (1 - RUNTIME_SMOOTHING) * previous
+        self.runtimes[pid] = runtime
+
+    def expected_runtime(self, pid):
+        """Expected runtime of a prediction job in seconds.
+
+        Prediction jobs without history get the median runtime of all prediction
+        jobs, or zero if there is no history at all.
+        """
+        if pid in self.runtimes:
+            return self.runtimes[pid]
+        if len(self.runtimes) == 0:
+            return 0.0
+        return float(np.median(list(self.runtimes.values())))
+
+    def save(self):
+        """Save the history, the file is replaced atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=self.path.parent, suffix=".tmp"
+        )
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump({str(pid): value for pid, value in self.runtimes.items()}, file)
+        os.replace(temp_path, self.path)
+
+
+def order_longest_first(prediction_jobs, runtime_history):
+    """Order prediction jobs on expected runtime, longest first.
+
+    Running the longest prediction jobs first prevents a few long prediction jobs
+    from ending up at the end of a parallel loop. Prediction jobs with an equal
+    expected runtime keep their order.
+
+    Args:
+        prediction_jobs (list): Prediction jobs
+        runtime_history (RuntimeHistory): History of the runtimes
+
+    Returns:
+        list: Ordered prediction jobs
+    """
+    return sorted(
+        prediction_jobs,
+        key=lambda pj: runtime_history.expected_runtime(pj["id"]),
+        reverse=True,
+    )
+
+
+def order_deadline(
+    prediction_jobs, runtime_history, deadline, priority_function=None, n_workers=1
+):
+    """Order prediction jobs to finish the most important ones before a deadline.
+
+    The prediction jobs are ordered on priority (highest first) and, for equal
+    priority, on expected runtime (shortest first). Going through this order, every
+    prediction job that is expected to finish before the deadline is scheduled
+    first, the remaining prediction jobs are scheduled after those in the same
+    order.
+
+    Args:
+        prediction_jobs (list): Prediction jobs
+        runtime_history (RuntimeHistory): History of the runtimes
+        deadline (float): Available time in seconds
+        priority_function (callable, optional): Callable that gets a prediction job
+            and returns its priority, a higher value is more important. Defaults to
+            None, which gives all prediction jobs the same priority.
+        n_workers (int, optional): Number of prediction jobs that run in parallel.
+            Defaults to 1.
+
+    Returns:
+        list: Ordered prediction jobs
+    """
+    if priority_function is None:
+        priority_function = lambda pj: 0  # noqa E731
+
+    ordered = sorted(
+        prediction_jobs,
+        key=lambda pj: (
+            -priority_function(pj),
+            runtime_history.expected_runtime(pj["id"]),
+        ),
+    )
+
+    # The workers share the available time
+    budget = deadline * n_workers
+    before_deadline, after_deadline = [], []
+    for pj in ordered:
+        runtime = runtime_history.expected_runtime(pj["id"])
+        if runtime <= budget:
+            budget -= runtime
+            before_deadline.append(pj)
+        else:
+            after_deadline.append(pj)
+
+    return before_deadline + after_deadline
@@ -0,0 +1,161 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import structlog
+from openstf_dbc.utils import process_datetime_range
+
+# Number of shared predictor frames (per location and window) kept in memory
+MAX_CACHED_PREDICTORS: int = 256
+DEFAULT_FORECAST_RESOLUTION = "15min"
+
+WEATHER_PREDICTORS = ["weather_data"]
+# Market and load profile predictors do not depend on the location
+LOCATION_INDEPENDENT_PREDICTORS = ["market_data", "load_profiles"]
+
+
+class BulkModelInputFetcher:
+    def __init__(self, database, max_cached=MAX_CACHED_PREDICTORS):
+        """Fetches model input, sharing predictors between prediction jobs.
+
+        Has the same get_model_input method as the database and returns the same
+        model input. Prediction jobs with the same (rounded) datetime window share
+        the market and load profile predictors, prediction jobs that also share a
+        location share the weather predictors. These are fetched once per window
+        (and location) and kept in a least recently used cache, only the load is
+        fetched per prediction job.
+
+        The shared predictors are never modified, every prediction job gets its own
+        model input frame, so a pipeline can add columns to it.
+
+        The fetcher can be used by multiple threads, for example by the prefetch
+        stage of the PredictionJobLoop. A predictor frame is fetched only once,
+        also when multiple threads need it at the same time.
+
+        Args:
+            database (openstf_dbc.database.DataBase): Database (or a stand-in) with
+                the get_load_pid and get_predictors methods
+            max_cached (int, optional): Maximum number of cached predictor frames
+        """
+        self.database = database
+        self.max_cached = max_cached
+        self.logger = structlog.get_logger(self.__class__.__name__)
+        self.num_fetched = 0
+        self.num_reused = 0
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._key_locks = {}
+
+    def get_model_input(
+        self,
+        pid,
+        location,
+        datetime_start=None,
+        datetime_end=None,
+        forecast_resolution=DEFAULT_FORECAST_RESOLUTION,
+    ):
+        """Get the load and predictors of a prediction job.
+
+        Equal to DataBase.get_model_input.
+
+        Args:
+            pid (int): Prediction job id
+            location (tuple): Latitude and longitude (or a location name)
+            datetime_start (datetime, optional): Start datetime. Defaults to 14 days
+                before today.
+            datetime_end (datetime, optional): End datetime. Defaults to 3 days after
+                today.
+            forecast_resolution (str, optional): Time resolution of model input
+                (see pandas Date Offset frequency strings). Defaults to "15min".
+
+        Returns:
+            pd.DataFrame: Model input
+        """
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        if datetime_start is None:
+            datetime_start = today - timedelta(14)
+        if datetime_end is None:
+            datetime_end = today + timedelta(3)
+
+        # The rounded window is the window that is actually queried
+        datetime_start, datetime_end, datetime_index = process_datetime_range(
+            start=datetime_start, end=datetime_end, freq=forecast_resolution
+        )
+        window = (datetime_start, datetime_end, forecast_resolution)
+
+        if not isinstance(location, str):
+            location = tuple(location)
+
+        weather_predictors = self._get_shared(
+            ("weather", location) + window,
+            lambda: self._get_predictors(window, WEATHER_PREDICTORS, location),
+        )
+        other_predictors = self._get_shared(
+            ("other",) + window,
+            lambda: self._get_predictors(window, LOCATION_INDEPENDENT_PREDICTORS),
+        )
+
+        load = self.database.get_load_pid(
+            pid, datetime_start, datetime_end, forecast_resolution
+        )
+
+        # Assemble the model input like the database does
+        model_input = pd.DataFrame(index=datetime_index)
+        model_input.index.name = "index"
+
+        if not load.empty:
+            load = load.resample(forecast_resolution).mean().interpolate(limit=3)
+            model_input = pd.concat([model_input, load], axis=1)
+        else:
+            self.logger.warning("No load data returned, fill with NaN.", pid=pid)
+            model_input["load"] = np.nan
+
+        predictors = pd.concat(
+            [pd.DataFrame(index=datetime_index), weather_predictors, other_predictors],
+            axis=1,
+        )
+        return pd.concat([model_input, predictors], axis=1)
+
+    def _get_predictors(self, window, predictor_groups, location=None):
+        datetime_start, datetime_end, forecast_resolution = window
+        return self.database.get_predictors(
+            datetime_start=datetime_start,
+            datetime_end=datetime_end,
+            forecast_resolution=forecast_resolution,
+            location=location,
+            predictor_groups=predictor_groups,
+        )
+
+    def _get_shared(self, key, fetch):
+        """Get a shared frame from the cache, or fetch it once on a miss."""
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.num_reused += 1
+                return self._cache[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread fetches a key, the others wait for it
+        with key_lock:
+            with self._cache_lock:
+                if key in self._cache:
+                    self.num_reused += 1
+                    return self._cache[key]
+
+            frame = fetch()
+
+            with self._cache_lock:
+                self.num_fetched += 1
+                self._cache[key] = frame
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+                self._key_locks.pop(key, None)
+
+        return frame
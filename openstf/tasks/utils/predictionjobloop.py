@@ -2,9 +2,38 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
+import multiprocessing
+import multiprocessing.util
+import os
+import pickle
 import random
+import signal
 import sys
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import partial
+from multiprocessing.connection import wait as wait_connections
+from time import perf_counter
+
+from openstf.tasks.utils.jobscheduling import (
+    ORDER_DEADLINE,
+    ORDER_LONGEST_FIRST,
+    ORDERS,
+    RuntimeHistory,
+    order_deadline,
+    order_longest_first,
+)
+
+# Context of a worker process of a parallel prediction job loop
+_worker_context = None
+
+# Maximum time in seconds between checks of the supervised worker processes
+SUPERVISION_INTERVAL = 1.0
 
 
 class PredictionJobLoop:
@@ -18,7 +47,18 @@ class PredictionJobLoop:
         on_end_callback=None,
         prediction_jobs=None,
         debug_pid=None,
-        **pj_kwargs
+        n_workers=1,
+        worker_context_factory=None,
+        prefetch_depth=2,
+        runtime_history_file=None,
+        order=None,
+        deadline=None,
+        priority_function=None,
+        job_timeout=None,
+        job_max_rss_mb=None,
+        checkpoint_journal=None,
+        forecast_writer=None,
+        **pj_kwargs,
     ):
         """Convenience objects that maps a function over prediction jobs.
 
@@ -29,6 +69,12 @@ class PredictionJobLoop:
 
         Tip: For debugging a specific PID, use debug_pid=specific_pid
 
+        When a job_timeout or job_max_rss_mb is given, the prediction jobs run in
+        supervised worker processes (n_workers, at least one). A prediction job that
+        exceeds a limit is stopped together with its worker process, which is
+        replaced by a new one. The prediction job fails with a
+        PredictionJobTimeoutError or PredictionJobMemoryError.
+
         Args:
             context (openstf.tasks.util.taskcontext.TaskContext): The
                 context to run this loop in.
@@ -51,6 +97,45 @@ class PredictionJobLoop:
                 prediction jobs from database based on pj_kwargs
             debug_pid (int): enter a specific pid for debugging.
                 If not None, the prediction job loop will only look at this pid
+            n_workers (int, optional): Number of worker processes that run the
+                prediction jobs in parallel. Defaults to 1, which runs the
+                prediction jobs one after another in the current process.
+            worker_context_factory (callable, optional): Picklable callable that
+                creates the context of a worker process, which replaces the context
+                in the arguments of the mapped function. Defaults to a new
+                TaskContext with the name of the context, so every worker has its
+                own database connection. A context with an __exit__ method is
+                closed when its worker exits or is replaced.
+            prefetch_depth (int, optional): Number of prediction jobs for which the
+                input is fetched ahead when using map_with_prefetch. Defaults to 2.
+            runtime_history_file (str or pathlib.Path, optional): Local json file in
+                which the runtime of every prediction job is kept. Required when an
+                order is given. Defaults to None, which does not keep runtimes.
+            order (str, optional): Order the prediction jobs on their expected
+                runtime, after the random order is applied. Either "longest_first",
+                which minimizes the total runtime of a parallel loop, or "deadline",
+                which runs the most important prediction jobs that fit before the
+                deadline first. Defaults to None, which keeps the random order.
+            deadline (float, optional): Available time in seconds for the
+                "deadline" order.
+            priority_function (callable, optional): Callable that gets a prediction
+                job and returns its priority for the "deadline" order, a higher
+                value is more important. Defaults to equal priorities.
+            job_timeout (float, optional): Maximum wall-clock time in seconds of a
+                prediction job. Defaults to None, which means no limit.
+            job_max_rss_mb (float, optional): Maximum resident memory in MB of the
+                process that runs a prediction job. Only enforced on platforms
+                with /proc (Linux). Defaults to None, which means no limit.
+            checkpoint_journal (CheckpointJournal, optional): Journal in which the
+                outcome of every prediction job is recorded. Prediction jobs that
+                are completed according to the journal are skipped, so a restarted
+                task continues where it stopped. Defaults to None.
+            forecast_writer (BufferedForecastWriter, optional): Writer to which the
+                mapped function writes its forecasts. A prediction job is then only
+                successful once its forecast is written, a prediction job of which
+                the forecast could not be written is unsuccessful. Can only be used
+                when the prediction jobs run in the current process. Defaults to
+                None.
             **pj_kwargs: Any other kwargs willed will be directed to the
                 prediction job getting function.
 
@@ -63,15 +148,80 @@ class PredictionJobLoop:
         self.on_end_callback = on_end_callback
         self.pj_kwargs = pj_kwargs
         self.debug_pid = debug_pid
+        self.n_workers = n_workers
+        self.prefetch_depth = prefetch_depth
+        self.job_timeout = job_timeout
+        self.job_max_rss_mb = job_max_rss_mb
+        self.checkpoint_journal = checkpoint_journal
+        self.forecast_writer = forecast_writer
+
+        if self.forecast_writer is not None and self._uses_worker_processes:
+            raise ValueError(
+                "A forecast writer can only be used when the prediction jobs run in "
+                "the current process"
+            )
+
+        if worker_context_factory is None:
+            worker_context_factory = partial(_create_worker_context, context.name)
+        self.worker_context_factory = worker_context_factory
 
         if prediction_jobs is None:
             self.prediction_jobs = self._get_prediction_jobs()
         else:
             self.prediction_jobs = prediction_jobs
 
+        if self.checkpoint_journal is not None:
+            self.prediction_jobs = self._skip_completed_prediction_jobs()
+
         if self.random_order:
             random.shuffle(self.prediction_jobs)
 
+        self.runtime_history = None
+        if runtime_history_file is not None:
+            self.runtime_history = RuntimeHistory(runtime_history_file)
+
+        if order is not None:
+            self.prediction_jobs = self._order_prediction_jobs(
+                order, deadline, priority_function
+            )
+
+    def _skip_completed_prediction_jobs(self):
+        """Removes the prediction jobs that are completed according to the journal."""
+        completed_pids = self.checkpoint_journal.completed_pids()
+        prediction_jobs = [
+            pj for pj in self.prediction_jobs if pj["id"] not in completed_pids
+        ]
+
+        num_skipped = len(self.prediction_jobs) - len(prediction_jobs)
+        if num_skipped > 0:
+            self.context.logger.info(
+                "Skipping prediction jobs completed in a previous run",
+                num_skipped=num_skipped,
+                journal=str(self.checkpoint_journal.path),
+            )
+
+        return prediction_jobs
+
+    def _order_prediction_jobs(self, order, deadline, priority_function):
+        """Orders the prediction jobs on their expected runtime."""
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order '{order}', valid orders are {ORDERS}")
+        if self.runtime_history is None:
+            raise ValueError("A runtime_history_file is required to order jobs")
+
+        if order == ORDER_LONGEST_FIRST:
+            return order_longest_first(self.prediction_jobs, self.runtime_history)
+
+        if deadline is None:
+            raise ValueError(f"A deadline is required for the '{ORDER_DEADLINE}' order")
+        return order_deadline(
+            self.prediction_jobs,
+            self.runtime_history,
+            deadline,
+            priority_function,
+            self.n_workers,
+        )
+
     def _get_prediction_jobs(self):
         """Fetches prediction jobs from database."""
         self.context.logger.info(
@@ -94,6 +244,11 @@ class PredictionJobLoop:
     def map(self, function, *args, **kwargs):
         """Maps the passed function over all prediction jobs.
 
+        When n_workers is larger than one, the prediction jobs are run in a pool of
+        worker processes. The function and its arguments should then be picklable,
+        the context is replaced by the context of the worker. The callbacks are
+        called in the current process as soon as a prediction job is finished.
+
         Args:
             function (callable): The function that will be applied to each prediction
                 job separately.
@@ -106,17 +261,150 @@ class PredictionJobLoop:
             PredictionJobException: This exception will be raised if one or more
             prediction jobs raised an exception during the loop.
         """
+        self._map(function, None, args, kwargs)
+
+    def map_with_prefetch(self, fetch_function, function, *args, **kwargs):
+        """Maps the passed functions over all prediction jobs, fetching ahead.
+
+        The fetch function retrieves the input of a prediction job, for example from
+        the database, and the function does the computations with that input. While
+        a prediction job is computed, the input of the next prediction jobs (at most
+        prefetch_depth) is fetched concurrently in a thread pool. The fetch function
+        should therefore not use the performance meter.
+
+        For every prediction job a "prefetch" checkpoint is logged, with the time
+        waited for the input as runtime and the number of inputs that were
+        ready as prefetch_queue_depth.
+
+        When the prediction jobs run in worker processes, every worker process
+        fetches and computes its prediction jobs itself, see map.
+
+        Args:
+            fetch_function (callable): The function that fetches the input of a
+                prediction job, gets the same arguments as the function.
+            function (callable): The function that will be applied to each prediction
+                job separately. The fetched input is passed as second argument.
+            *args: Any other arguments or passed to both functions.
+            **kwargs: All keyword arguments are passed to both functions.
+
+        Raises:
+            PredictionJobException: This exception will be raised if one or more
+            prediction jobs raised an exception during the loop.
+        """
+        if self._uses_worker_processes:
+            function = partial(_fetch_and_run, fetch_function, function)
+            fetch_function = None
+
+        self._map(function, fetch_function, args, kwargs)
+
+    @property
+    def _uses_worker_processes(self):
+        return (
+            self.n_workers > 1
+            or self.job_timeout is not None
+            or self.job_max_rss_mb is not None
+        )
+
+    def _map(self, function, fetch_function, args, kwargs):
         pids_successful = []
         pids_unsuccessful = []
         pids_unsuccessful_dict = defaultdict(list)
-        last_job_exception = None
 
         num_jobs = len(self.prediction_jobs)
         self.context.perf_meter.checkpoint("pre-loop")
 
+        try:
+            if self.job_timeout is not None or self.job_max_rss_mb is not None:
+                last_job_exception = self._map_supervised(
+                    function,
+                    args,
+                    kwargs,
+                    pids_successful,
+                    pids_unsuccessful,
+                    pids_unsuccessful_dict,
+                )
+            elif self.n_workers > 1:
+                last_job_exception = self._map_parallel(
+                    function,
+                    args,
+                    kwargs,
+                    pids_successful,
+                    pids_unsuccessful,
+                    pids_unsuccessful_dict,
+                )
+            else:
+                last_job_exception = self._map_sequential(
+                    function,
+                    fetch_function,
+                    args,
+                    kwargs,
+                    pids_successful,
+                    pids_unsuccessful,
+                    pids_unsuccessful_dict,
+                )
+        finally:
+            # Keep the runtimes, also when the loop is interrupted
+            if self.runtime_history is not None:
+                self.runtime_history.save()
+
+        jobs_successful = len(pids_successful)
+        jobs_unsuccessful = len(pids_unsuccessful)
+        jobs_started = jobs_successful + jobs_unsuccessful
+
+        # This log is for human readable logging
+        self.context.perf_meter.checkpoint(
+            "loop",
+            num_jobs=num_jobs,
+            jobs_started=jobs_started,
+            jobs_successful=jobs_successful,
+            jobs_unsuccessful=jobs_unsuccessful,
+            successful=int(jobs_unsuccessful > 0),
+        )
+
+        if jobs_unsuccessful > 0:
+            metrics = {
+                "num_jobs": num_jobs,
+                "pids_successful": pids_successful,
+                "pids_unsuccessful": pids_unsuccessful,
+                "exceptions": pids_unsuccessful_dict,
+                "jobs_successful": jobs_successful,
+                "jobs_unsuccessful": jobs_unsuccessful,
+                "jobs_started": jobs_started,
+            }
+
+            raise PredictionJobException(metrics) from last_job_exception
+
+    def _map_sequential(
+        self,
+        function,
+        fetch_function,
+        args,
+        kwargs,
+        pids_successful,
+        pids_unsuccessful,
+        pids_unsuccessful_dict,
+    ):
+        """Runs the prediction jobs one after another in the current process.
+
+        Returns:
+            Exception: The last exception raised by a prediction job or None
+        """
+        last_job_exception = None
+        num_jobs = len(self.prediction_jobs)
+        # Prediction jobs that ran successfully, but of which the forecast is not
+        # written yet
+        unwritten_jobs = []
+
+        prefetcher = None
+        if fetch_function is not None:
+            prefetcher = _Prefetcher(
+                fetch_function, self.prediction_jobs, args, kwargs, self.prefetch_depth
+            )
+
         # loop over prediction jobs
         for i, prediction_job in enumerate(self.prediction_jobs):
             successful = False
+            unwritten = False
 
             self.context.logger = self.context.logger.bind(
                 prediction_id=prediction_job["id"],
@@ -128,12 +416,27 @@ class PredictionJobLoop:
             )
 
             try:
-                function(prediction_job, *args, **kwargs)
+                if prefetcher is None:
+                    function(prediction_job, *args, **kwargs)
+                else:
+                    queue_depth = prefetcher.queue_depth
+                    try:
+                        data = prefetcher.get()
+                    finally:
+                        self.context.perf_meter.checkpoint(
+                            "prefetch", prefetch_queue_depth=queue_depth
+                        )
+                    function(prediction_job, data, *args, **kwargs)
 
-                pids_successful.append(prediction_job["id"])
                 successful = True
 
-                self._handle_successful_iteration(prediction_job)
+                if self.forecast_writer is None:
+                    pids_successful.append(prediction_job["id"])
+                    self._handle_successful_iteration(prediction_job)
+                else:
+                    # Reported when the forecast is written
+                    unwritten_jobs.append(prediction_job)
+                    unwritten = True
 
             except Exception as exception:
                 pids_unsuccessful.append(prediction_job["id"])
@@ -145,36 +448,298 @@ class PredictionJobLoop:
                 if self.stop_on_exception:
                     break
             finally:
-                self._handle_finished_last_iteration(prediction_job, successful)
+                self._handle_finished_last_iteration(
+                    prediction_job, successful, end_callback=not unwritten
+                )
 
             self.context.logger = self.context.logger.unbind("prediction_id")
 
-        jobs_successful = len(pids_successful)
-        jobs_unsuccessful = len(pids_unsuccessful)
-        jobs_started = jobs_successful + jobs_unsuccessful
+            if len(unwritten_jobs) > 0:
+                write_exception = self._handle_written_jobs(
+                    unwritten_jobs,
+                    pids_successful,
+                    pids_unsuccessful,
+                    pids_unsuccessful_dict,
+                )
+                if write_exception is not None:
+                    last_job_exception = write_exception
+                    if self.stop_on_exception:
+                        break
 
-        # This log is for human readable logging
-        self.context.perf_meter.checkpoint(
-            "loop",
-            num_jobs=num_jobs,
-            jobs_started=jobs_started,
-            jobs_successful=jobs_successful,
-            jobs_unsuccessful=jobs_unsuccessful,
-            successful=int(jobs_unsuccessful > 0),
+        if prefetcher is not None:
+            prefetcher.close()
+
+        if self.forecast_writer is not None:
+            # Report the prediction jobs of which the forecast is still buffered
+            self.forecast_writer.flush()
+            write_exception = self._handle_written_jobs(
+                unwritten_jobs,
+                pids_successful,
+                pids_unsuccessful,
+                pids_unsuccessful_dict,
+            )
+            if write_exception is not None:
+                last_job_exception = write_exception
+
+        return last_job_exception
+
+    def _handle_written_jobs(
+        self, unwritten_jobs, pids_successful, pids_unsuccessful, pids_unsuccessful_dict
+    ):
+        """Reports the prediction jobs of which the forecast is written.
+
+        A prediction job of which the forecast could not be written is unsuccessful,
+        its failure is taken from the forecast writer. Reported prediction jobs are
+        removed from unwritten_jobs.
+
+        Returns:
+            Exception: The last exception of a failed write or None
+        """
+        last_write_exception = None
+
+        for prediction_job in list(unwritten_jobs):
+            pid = prediction_job["id"]
+            if self.forecast_writer.is_buffered(pid):
+                continue
+            unwritten_jobs.remove(prediction_job)
+
+            self.context.logger = self.context.logger.bind(
+                prediction_id=pid, prediction_name=prediction_job["name"]
+            )
+            exception = self.forecast_writer.failures.pop(pid, None)
+
+            if exception is None:
+                pids_successful.append(pid)
+                self._handle_successful_iteration(prediction_job)
+            else:
+                pids_unsuccessful.append(pid)
+                pids_unsuccessful_dict[str(exception)].append(pid)
+                last_write_exception = exception
+
+                self.context.logger.error(
+                    "Forecast of this iteration could not be written",
+                    exc_info=exception,
+                )
+                self._handle_exception_callback(prediction_job, exception)
+
+            self._handle_end_callback(prediction_job, exception is None)
+            self.context.logger = self.context.logger.unbind("prediction_id")
+
+        return last_write_exception
+
+    def _map_parallel(
+        self,
+        function,
+        args,
+        kwargs,
+        pids_successful,
+        pids_unsuccessful,
+        pids_unsuccessful_dict,
+    ):
+        """Runs the prediction jobs in a pool of worker processes.
+
+        At most n_workers prediction jobs are submitted at the same time, so no new
+        prediction jobs are started after an exception if stop_on_exception is set.
+        The iteration levels of the performance meter are kept by the workers, the
+        runtime history gets the time between submitting and finishing a job.
+
+        Returns:
+            Exception: The last exception raised by a prediction job or None
+        """
+        last_job_exception = None
+        num_jobs = len(self.prediction_jobs)
+
+        # The context can not be passed to another process, mark where it is used
+        worker_args = tuple(_replace_context(arg, self.context) for arg in args)
+        worker_kwargs = {
+            key: _replace_context(value, self.context) for key, value in kwargs.items()
+        }
+
+        prediction_jobs = iter(enumerate(self.prediction_jobs))
+        running = {}
+        stop = False
+
+        with ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_initialize_worker,
+            initargs=(self.worker_context_factory,),
+        ) as executor:
+            while True:
+                # Keep every worker busy until all prediction jobs are submitted
+                while not stop and len(running) < self.n_workers:
+                    i, prediction_job = next(prediction_jobs, (None, None))
+                    if prediction_job is None:
+                        break
+                    future = executor.submit(
+                        _run_prediction_job,
+                        function,
+                        prediction_job,
+                        i,
+                        num_jobs,
+                        worker_args,
+                        worker_kwargs,
+                    )
+                    running[future] = (prediction_job, perf_counter())
+
+                if len(running) == 0:
+                    break
+
+                # Handle the results as soon as prediction jobs are finished
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    prediction_job, submitted = running.pop(future)
+                    exception = self._handle_worker_result(
+                        prediction_job,
+                        future.result,
+                        perf_counter() - submitted,
+                        pids_successful,
+                        pids_unsuccessful,
+                        pids_unsuccessful_dict,
+                    )
+                    if exception is not None:
+                        last_job_exception = exception
+                        stop = stop or self.stop_on_exception
+
+        return last_job_exception
+
+    def _map_supervised(
+        self,
+        function,
+        args,
+        kwargs,
+        pids_successful,
+        pids_unsuccessful,
+        pids_unsuccessful_dict,
+    ):
+        """Runs the prediction jobs in supervised worker processes.
+
+        The workers are checked at least every SUPERVISION_INTERVAL seconds. A
+        worker that exceeds the time or memory limit of its prediction job is
+        killed and replaced, as is a worker that died unexpectedly.
+
+        Returns:
+            Exception: The last exception raised by a prediction job or None
+        """
+        last_job_exception = None
+        num_jobs = len(self.prediction_jobs)
+
+        # The context can not be passed to another process, mark where it is used
+        worker_args = tuple(_replace_context(arg, self.context) for arg in args)
+        worker_kwargs = {
+            key: _replace_context(value, self.context) for key, value in kwargs.items()
+        }
+
+        prediction_jobs = iter(enumerate(self.prediction_jobs))
+        workers = [
+            _SupervisedWorker(self.worker_context_factory)
+            for _ in range(max(1, self.n_workers))
+        ]
+        stop = False
+
+        try:
+            while True:
+                # Give every idle worker a prediction job
+                for worker in workers:
+                    if stop or worker.prediction_job is not None:
+                        continue
+                    i, prediction_job = next(prediction_jobs, (None, None))
+                    if prediction_job is None:
+                        break
+                    worker.submit(
+                        function,
+                        prediction_job,
+                        i,
+                        num_jobs,
+                        worker_args,
+                        worker_kwargs,
+                    )
+
+                busy_workers = [w for w in workers if w.prediction_job is not None]
+                if len(busy_workers) == 0:
+                    break
+
+                wait_connections(
+                    [w.connection for w in busy_workers]
+                    + [w.process.sentinel for w in busy_workers],
+                    timeout=SUPERVISION_INTERVAL,
+                )
+
+                for worker in busy_workers:
+                    get_result = worker.check(self.job_timeout, self.job_max_rss_mb)
+                    if get_result is None:
+                        continue
+
+                    prediction_job, runtime = worker.prediction_job, worker.runtime
+                    worker.prediction_job = None
+
+                    exception = self._handle_worker_result(
+                        prediction_job,
+                        get_result,
+                        runtime,
+                        pids_successful,
+                        pids_unsuccessful,
+                        pids_unsuccessful_dict,
+                    )
+                    if exception is not None:
+                        last_job_exception = exception
+                        stop = stop or self.stop_on_exception
+        finally:
+            for worker in workers:
+                worker.close()
+
+        return last_job_exception
+
+    def _handle_worker_result(
+        self,
+        prediction_job,
+        get_result,
+        runtime,
+        pids_successful,
+        pids_unsuccessful,
+        pids_unsuccessful_dict,
+    ):
+        """Handles a prediction job that was run by a worker process.
+
+        Args:
+            prediction_job (dict): The finished prediction job
+            get_result (callable): Returns the result of the prediction job or raises
+                the exception of the prediction job
+            runtime (float): Runtime in seconds of the prediction job
+
+        Returns:
+            Exception: The exception of the prediction job or None if successful
+        """
+        successful = False
+        job_exception = None
+
+        if self.runtime_history is not None:
+            self.runtime_history.update(prediction_job["id"], runtime)
+
+        self.context.logger = self.context.logger.bind(
+            prediction_id=prediction_job["id"],
+            prediction_name=prediction_job["name"],
         )
 
-        if jobs_unsuccessful > 0:
-            metrics = {
-                "num_jobs": num_jobs,
-                "pids_successful": pids_successful,
-                "pids_unsuccessful": pids_unsuccessful,
-                "exceptions": pids_unsuccessful_dict,
-                "jobs_successful": jobs_successful,
-                "jobs_unsuccessful": jobs_unsuccessful,
-                "jobs_started": jobs_started,
-            }
+        try:
+            get_result()
 
-            raise PredictionJobException(metrics) from last_job_exception
+            pids_successful.append(prediction_job["id"])
+            successful = True
+
+            self._handle_successful_iteration(prediction_job)
+
+        except Exception as exception:
+            pids_unsuccessful.append(prediction_job["id"])
+            pids_unsuccessful_dict[str(exception)].append(prediction_job["id"])
+            job_exception = exception
+
+            self._handle_exception_during_iteration(prediction_job, exception)
+        finally:
+            self._handle_end_callback(prediction_job, successful)
+
+        self.context.logger = self.context.logger.unbind("prediction_id")
+
+        return job_exception
 
     def _handle_successful_iteration(self, prediction_job):
         if self.on_successful_callback is not None:
@@ -197,6 +762,9 @@ class PredictionJobLoop:
             stack_info=stack_info,
         )
 
+        self._handle_exception_callback(prediction_job, e)
+
+    def _handle_exception_callback(self, prediction_job, e):
         if self.on_exception_callback is None:
             return
 
@@ -211,10 +779,24 @@ class PredictionJobLoop:
                 stack_info=stack_info,
             )
 
-    def _handle_finished_last_iteration(self, prediction_job, successful):
+    def _handle_finished_last_iteration(
+        self, prediction_job, successful, end_callback=True
+    ):
 
         self.context.perf_meter.complete_level(successful)
 
+        if self.runtime_history is not None:
+            self.runtime_history.update(
+                prediction_job["id"], self.context.perf_meter.last_runtime
+            )
+
+        if end_callback:
+            self._handle_end_callback(prediction_job, successful)
+
+    def _handle_end_callback(self, prediction_job, successful):
+        if self.checkpoint_journal is not None:
+            self.checkpoint_journal.record(prediction_job["id"], successful)
+
         if self.on_end_callback is not None:
             try:
                 self.on_end_callback(prediction_job, successful)
@@ -234,3 +816,299 @@ class PredictionJobException(Exception):
         if metrics is None:
             metrics = {}
         self.metrics = metrics
+
+
+class PredictionJobKilledError(Exception):
+    """A prediction job was killed, because its worker process exceeded a limit"""
+
+    def __init__(self, message, pid=None):
+        super().__init__(message)
+        self.pid = pid
+
+    def __reduce__(self):
+        return (self.__class__, (self.args[0], self.pid))
+
+
+class PredictionJobTimeoutError(PredictionJobKilledError):
+    """A prediction job exceeded its wall-clock timeout"""
+
+
+class PredictionJobMemoryError(PredictionJobKilledError):
+    """A prediction job exceeded its maximum resident memory"""
+
+
+class _Prefetcher:
+    def __init__(self, fetch_function, prediction_jobs, args, kwargs, depth):
+        """Fetches the input of prediction jobs ahead in a thread pool.
+
+        The inputs are returned in the order of the prediction jobs. At most depth
+        inputs are fetched or waiting to be used at the same time.
+        """
+        self.fetch_function = fetch_function
+        self.prediction_jobs = iter(prediction_jobs)
+        self.args = args
+        self.kwargs = kwargs
+        self.executor = ThreadPoolExecutor(max_workers=max(1, depth))
+        self.futures = deque()
+
+        for _ in range(max(1, depth)):
+            self._submit_next()
+
+    @property
+    def queue_depth(self):
+        """Number of inputs that are fetched and waiting to be used."""
+        return sum(future.done() for future in self.futures)
+
+    def get(self):
+        """Get the input of the next prediction job, waits until it is fetched."""
+        future = self.futures.popleft()
+        # Immediately start fetching the next input, so it is fetched during compute
+        self._submit_next()
+        return future.result()
+
+    def close(self):
+        # Inputs that are not fetched yet are not needed anymore
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+
+    def _submit_next(self):
+        prediction_job = next(self.prediction_jobs, None)
+        if prediction_job is not None:
+            self.futures.append(
+                self.executor.submit(
+                    self.fetch_function, prediction_job, *self.args, **self.kwargs
+                )
+            )
+
+
+class _SupervisedWorker:
+    def __init__(self, worker_context_factory):
+        """Worker process that runs one prediction job at a time.
+
+        The worker is started immediately. After a prediction job is submitted the
+        supervising process checks the worker with check.
+        """
+        self.worker_context_factory = worker_context_factory
+        self.prediction_job = None
+        self.runtime = None
+        self._start()
+
+    def _start(self):
+        self.connection, worker_connection = multiprocessing.Pipe()
+        # Not a daemon, so a prediction job can start processes itself (for example
+        # a parallel hyperparameter optimization). The worker is stopped by close,
+        # or exits when the pipe of the supervising process is closed.
+        self.process = multiprocessing.Process(
+            target=_supervised_worker_main,
+            args=(self.worker_context_factory, worker_connection),
+            daemon=False,
+        )
+        self.process.start()
+        worker_connection.close()
+
+    def submit(self, function, prediction_job, i, num_jobs, args, kwargs):
+        self.prediction_job = prediction_job
+        self.submitted = perf_counter()
+        self.connection.send((function, prediction_job, i, num_jobs, args, kwargs))
+
+    def check(self, timeout, max_rss_mb):
+        """Checks the submitted prediction job.
+
+        Args:
+            timeout (float): Maximum wall-clock time in seconds or None
+            max_rss_mb (float): Maximum resident memory in MB or None
+
+        Returns:
+            callable: None while the prediction job is running. Otherwise a callable
+                that raises the exception of the prediction job, if any.
+        """
+        self.runtime = perf_counter() - self.submitted
+        pid = self.prediction_job["id"]
+
+        if self.connection.poll():
+            try:
+                successful, exception = self.connection.recv()
+            except EOFError:
+                # The worker died while sending its result
+                return self._restart_and_raise(
+                    PredictionJobKilledError("Worker process died", pid)
+                )
+            return _raise_if_exception(None if successful else exception)
+
+        if not self.process.is_alive():
+            return self._restart_and_raise(
+                PredictionJobKilledError(
+                    f"Worker process died with exit code {self.process.exitcode}", pid
+                )
+            )
+
+        if timeout is not None and self.runtime > timeout:
+            return self._restart_and_raise(
+                PredictionJobTimeoutError(
+                    f"Prediction job exceeded the timeout of {timeout} seconds", pid
+                )
+            )
+
+        rss_mb = _get_rss_mb(self.process.pid)
+        if max_rss_mb is not None and rss_mb is not None and rss_mb > max_rss_mb:
+            return self._restart_and_raise(
+                PredictionJobMemoryError(
+                    f"Prediction job exceeded the maximum memory of {max_rss_mb} MB",
+                    pid,
+                )
+            )
+
+        return None
+
+    def close(self):
+        if self.process.is_alive() and self.prediction_job is None:
+            self.connection.send(None)
+            self.process.join(SUPERVISION_INTERVAL)
+        self._stop_process()
+        self.connection.close()
+
+    def _restart_and_raise(self, exception):
+        self._stop_process()
+        self.connection.close()
+        self._start()
+        return _raise_if_exception(exception)
+
+    def _stop_process(self):
+        """Stops the worker, it is killed if it does not exit in time."""
+        if self.process.is_alive():
+            # The worker exits on SIGTERM, which closes its context
+            self.process.terminate()
+            self.process.join(SUPERVISION_INTERVAL)
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+
+
+def _raise_if_exception(exception):
+    def get_result():
+        if exception is not None:
+            raise exception
+
+    return get_result
+
+
+def _get_rss_mb(process_id):
+    """Resident memory of a process in MB, None if it can not be determined."""
+    try:
+        with open(f"/proc/{process_id}/statm", "r") as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+
+def _supervised_worker_main(worker_context_factory, connection):
+    """Main function of a supervised worker process."""
+    signal.signal(signal.SIGTERM, _exit_worker)
+    _initialize_worker(worker_context_factory)
+
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            # The supervising process is gone
+            break
+        # None is sent to stop the worker
+        if job is None:
+            break
+        try:
+            _run_prediction_job(*job)
+            connection.send((True, None))
+        except Exception as exception:
+            connection.send((False, exception))
+
+
+class _WorkerContext:
+    """Placeholder for the context in the arguments passed to a worker process."""
+
+
+def _replace_context(value, context):
+    return _WorkerContext() if value is context else value
+
+
+def _create_worker_context(task_name):
+    # Imported here, as the task context itself depends on this module
+    from openstf.tasks.utils.taskcontext import TaskContext
+
+    # Exited by _close_worker_context when the worker process exits
+    return TaskContext(task_name, post_teams_on_exception=False).__enter__()
+
+
+def _initialize_worker(worker_context_factory):
+    global _worker_context
+    _reset_inherited_database()
+    _worker_context = worker_context_factory()
+    # Run when the worker process exits, also after a SIGTERM of a supervised worker
+    multiprocessing.util.Finalize(None, _close_worker_context, exitpriority=10)
+
+
+def _reset_inherited_database():
+    """Forget the database connections a forked worker inherited from its parent.
+
+    The database classes of openstf_dbc are singletons, so without a reset the
+    context of a worker would reuse the connection pool and sockets of the parent.
+    """
+    # Imported here, the loop itself does not depend on the database package
+    from openstf_dbc import Singleton
+    from openstf_dbc.data_interface import _DataInterface
+
+    data_interface = Singleton._instances.get(_DataInterface)
+    if data_interface is not None:
+        # Drop the pooled connections without closing them, they belong to the parent
+        data_interface.mysql_engine.dispose(close=False)
+    Singleton._instances.clear()
+
+
+def _close_worker_context():
+    global _worker_context
+    context, _worker_context = _worker_context, None
+    if hasattr(context, "__exit__"):
+        context.__exit__(None, None, None)
+
+
+def _exit_worker(signum, frame):
+    sys.exit(128 + signum)
+
+
+def _fetch_and_run(fetch_function, function, prediction_job, *args, **kwargs):
+    data = fetch_function(prediction_job, *args, **kwargs)
+    return function(prediction_job, data, *args, **kwargs)
+
+
+def _run_prediction_job(function, prediction_job, i, num_jobs, args, kwargs):
+    """Runs a single prediction job in a worker process."""
+    context = _worker_context
+    args = [context if isinstance(arg, _WorkerContext) else arg for arg in args]
+    kwargs = {
+        key: context if isinstance(value, _WorkerContext) else value
+        for key, value in kwargs.items()
+    }
+
+    context.logger = context.logger.bind(
+        prediction_id=prediction_job["id"],
+        prediction_name=prediction_job["name"],
+    )
+    context.perf_meter.start_level(
+        "iteration", i, num_jobs=num_jobs, pid=prediction_job["id"], **kwargs
+    )
+
+    successful = False
+    try:
+        function(prediction_job, *args, **kwargs)
+        successful = True
+    except Exception as exception:
+        # The exception is passed back to the main process, make sure that works
+        try:
+            pickle.loads(pickle.dumps(exception))
+        except Exception:
+            raise RuntimeError(str(exception)) from None
+        raise
+    finally:
+        context.perf_meter.complete_level(successful)
+        context.logger = context.logger.unbind("prediction_id")
@@ -0,0 +1,239 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import multiprocessing
+import threading
+import time
+from multiprocessing.connection import wait as wait_connections
+
+import structlog
+
+# Time in seconds between two checks for due tasks
+SCHEDULER_TICK = 1.0
+# Time in seconds a task process gets to exit when the scheduler stops
+TASK_PROCESS_STOP_TIMEOUT = 10.0
+
+
+class ScheduledTask:
+    def __init__(self, name, interval, function):
+        """A task that is run by the scheduler at a fixed interval.
+
+        Args:
+            name (str): Name of the task
+            interval (float): Time in seconds between the starts of two runs
+            function (callable): Function without arguments that runs the task, for
+                example the main function of a task module
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval of task '{name}' should be positive")
+
+        self.name = name
+        self.interval = interval
+        self.function = function
+        self.next_run = None
+        self.process = None
+
+    @property
+    def is_running(self):
+        return self.process is not None and self.process.is_running
+
+
+class TaskScheduler:
+    def __init__(self, tasks, clock=time.monotonic):
+        """Runs tasks at fixed intervals from the current (long running) process.
+
+        Every task runs in its own long running process, which is forked from the
+        scheduler at the first run of the task and reused for its later runs. So a
+        long task does not delay the others, and tasks do not share global state
+        (like the active MLflow run) while their runs overlap. A task is never run
+        while its previous run is still running, a run that would overlap is
+        skipped. An exception raised by a task is logged and does not stop the
+        scheduler, a task process that died is replaced at the next run.
+
+        The task processes keep imported modules, database connections and
+        in-memory caches warm between runs.
+
+        Args:
+            tasks (list of ScheduledTask): Tasks to run, the first run of every task
+                starts immediately
+            clock (callable, optional): Monotonic clock in seconds.
+        """
+        self.tasks = tasks
+        self.clock = clock
+        self.logger = structlog.get_logger(self.__class__.__name__)
+        self._stop = threading.Event()
+
+        now = self.clock()
+        for task in self.tasks:
+            task.next_run = now
+
+    def run_pending(self):
+        """Starts all tasks that are due.
+
+        Returns:
+            float: Time in seconds until the next task is due
+        """
+        now = self.clock()
+
+        for task in self.tasks:
+            if now < task.next_run:
+                continue
+
+            # The next run is planned relative to the planned start, which prevents
+            # drift. Runs that were missed completely are not caught up.
+            while task.next_run <= now:
+                task.next_run += task.interval
+
+            if task.is_running:
+                self.logger.warning(
+                    "Previous run of task is still running, skipping this run",
+                    task=task.name,
+                )
+                continue
+
+            if task.process is None or not task.process.is_alive():
+                task.process = _TaskProcess(task.name, task.function)
+            task.process.start_run()
+
+        return max(0.0, min(task.next_run for task in self.tasks) - now)
+
+    def run_forever(self, tick=SCHEDULER_TICK):
+        """Runs the tasks until stop is called (or the process is interrupted).
+
+        Args:
+            tick (float, optional): Maximum time in seconds between two checks for
+                due tasks.
+        """
+        self.logger.info(
+            "Started scheduler",
+            tasks={task.name: task.interval for task in self.tasks},
+        )
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(min(self.run_pending(), tick))
+        except KeyboardInterrupt:
+            self.logger.info("Scheduler interrupted")
+        finally:
+            self.join()
+            self.close()
+        self.logger.info("Stopped scheduler")
+
+    def stop(self):
+        """Stops the scheduler, running tasks are finished first."""
+        self._stop.set()
+
+    def join(self):
+        """Waits for all running tasks to finish."""
+        for task in self.tasks:
+            if task.is_running:
+                self.logger.info("Waiting for task to finish", task=task.name)
+                task.process.join()
+
+    def close(self):
+        """Stops the task processes, call join first to finish the running tasks."""
+        for task in self.tasks:
+            if task.process is not None:
+                task.process.close()
+                task.process = None
+
+
+class _TaskProcess:
+    def __init__(self, name, function):
+        """Process that runs a task each time start_run is called.
+
+        The process is forked, so the function does not have to be picklable.
+        It is not a daemon, so a task can start worker processes itself.
+        """
+        self.name = name
+        self.logger = structlog.get_logger(TaskScheduler.__name__)
+        self.running = False
+        self.connection, task_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.get_context("fork").Process(
+            target=_task_process_main,
+            args=(name, function, task_connection),
+            name=name,
+            daemon=False,
+        )
+        self.process.start()
+        task_connection.close()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    @property
+    def is_running(self):
+        if self.running:
+            self._check_finished()
+        return self.running
+
+    def start_run(self):
+        self.connection.send(True)
+        self.running = True
+
+    def join(self):
+        while self.is_running:
+            wait_connections([self.connection, self.process.sentinel])
+
+    def close(self):
+        if self.process.is_alive() and not self.running:
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+            self.process.join(TASK_PROCESS_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+    def _check_finished(self):
+        if self.connection.poll():
+            try:
+                self.connection.recv()
+                self.running = False
+                return
+            except EOFError:
+                pass
+        if not self.process.is_alive():
+            self.logger.error(
+                "Process of scheduled task died",
+                task=self.name,
+                exitcode=self.process.exitcode,
+            )
+            self.running = False
+
+
+def _task_process_main(name, function, connection):
+    """Main function of the process of a scheduled task."""
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            # The scheduler is gone
+            break
+        # None is sent to stop the process
+        if message is None:
+            break
+        _run_task(name, function)
+        connection.send(True)
+
+
+def _run_task(name, function):
+    logger = structlog.get_logger(TaskScheduler.__name__)
+    logger.info("Start scheduled run of task", task=name)
+    start = time.perf_counter()
+    try:
+        function()
+    except Exception as e:
+        # The task context already reported the exception
+        logger.error("Scheduled run of task raised an exception", task=name, error=e)
+    except SystemExit as e:
+        # Tasks that exit early should not stop the scheduler
+        logger.warning("Scheduled task exited", task=name, code=e.code)
+    finally:
+        logger.info(
+            "Finished scheduled run of task",
+            task=name,
+            runtime=round(time.perf_counter() - start, 2),
+        )
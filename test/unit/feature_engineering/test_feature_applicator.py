@@ -38,6 +38,19 @@ class TestFeatureApplicator(TestCase):
             list(np.sort(data_with_features.columns.to_list())),
         )
 
+    def test_train_feature_applicator_compact_dtypes(self):
+        data_with_features = TrainFeatureApplicator(horizons=[0.25, 24.0]).add_features(
+            self.input_data
+        )
+
+        # Load and horizon keep their dtype, features are float32 or uint8 flags
+        self.assertEqual(data_with_features["load"].dtype, np.float64)
+        self.assertEqual(data_with_features["horizon"].dtype, np.float64)
+        feature_dtypes = set(data_with_features.iloc[:, 1:-1].dtypes)
+        self.assertTrue(feature_dtypes <= {np.dtype(np.float32), np.dtype(np.uint8)})
+        # The regressors get a float32 matrix
+        self.assertEqual(data_with_features.iloc[:, 1:-1].values.dtype, np.float32)
+
     def test_operational_feature_applicator_correct_order(self):
         # Test for expected column order of the output
         # Also check "horizons" is not in the output
@@ -6,7 +6,10 @@ from unittest import TestCase
 import numpy as np
 import pandas as pd
 
-from openstf.feature_engineering.general import enforce_feature_order
+from openstf.feature_engineering.general import (
+    enforce_compact_dtypes,
+    enforce_feature_order,
+)
 
 
 class TestGeneral(TestCase):
@@ -25,3 +28,38 @@ class TestGeneral(TestCase):
         df = pd.DataFrame(np.arange(9).reshape(3, 3), columns=["load", "A", "E"])
         result = enforce_feature_order(df)
         self.assertEqual(result.columns.to_list(), ["load", "A", "E"])
+
+    def test_enforce_compact_dtypes(self):
+        df = pd.DataFrame(
+            {
+                "load": [1.0, 2.0],
+                "temp": [10.5, np.nan],
+                "is_holiday": [True, False],
+                "Month": [1, 12],
+                "large_int": [0, 1000],
+                "missing_flag": [1.0, np.nan],
+                "name": ["a", "b"],
+                "horizon": [0.25, 47.0],
+            }
+        )
+
+        result = enforce_compact_dtypes(df)
+
+        self.assertEqual(
+            result.dtypes.astype(str).to_dict(),
+            {
+                "load": "float64",
+                "temp": "float32",
+                "is_holiday": "uint8",
+                "Month": "uint8",
+                "large_int": "float32",
+                "missing_flag": "float32",
+                "name": "object",
+                "horizon": "float64",
+            },
+        )
+        self.assertEqual(list(result["is_holiday"]), [1, 0])
+        # Features convert to a float32 matrix
+        self.assertEqual(
+            result[["temp", "is_holiday", "Month"]].to_numpy().dtype, np.float32
+        )
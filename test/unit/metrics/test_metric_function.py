@@ -3,7 +3,15 @@
 # SPDX-License-Identifier: MPL-2.0
 import unittest
 
-from openstf.metrics.metrics import get_eval_metric_function, mae
+import numpy as np
+import xgboost as xgb
+
+from openstf.metrics.metrics import (
+    get_eval_metric_function,
+    mae,
+    xgb_quantile_eval,
+    xgb_quantile_obj,
+)
 
 
 class TestEvalMetricFunction(unittest.TestCase):
@@ -15,5 +23,31 @@ class TestEvalMetricFunction(unittest.TestCase):
             get_eval_metric_function("non-existing")
 
 
+class TestXGBQuantileFunctions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dmatrix = xgb.DMatrix(np.zeros((4, 1)), label=[1.0, 2.0, 3.0, 4.0])
+        self.preds = np.array([2.0, 2.0, 2.0, 2.0], dtype=np.float32)
+
+    def test_xgb_quantile_obj(self):
+        grad, hess = xgb_quantile_obj(self.preds, self.dmatrix, quantile=0.2)
+
+        np.testing.assert_array_almost_equal(grad, [0.8, 0.0, -0.2, -0.2])
+        np.testing.assert_array_equal(hess, np.ones(4))
+        # XGBoost uses float32 gradients internally
+        self.assertEqual(grad.dtype, np.float32)
+        self.assertEqual(hess.dtype, np.float32)
+
+    def test_xgb_quantile_obj_invalid_quantile(self):
+        with self.assertRaises(ValueError):
+            xgb_quantile_obj(self.preds, self.dmatrix, quantile=1.2)
+
+    def test_xgb_quantile_eval(self):
+        name, loss = xgb_quantile_eval(self.preds, self.dmatrix, quantile=0.2)
+
+        self.assertEqual(name, "q0.2_loss")
+        # Pinball losses: 0.8 * 1, 0, 0.2 * 1, 0.2 * 2
+        self.assertAlmostEqual(loss, (0.8 + 0.0 + 0.2 + 0.4) / 4)
+
+
 if __name__ == "__main__":
     unittest.main()
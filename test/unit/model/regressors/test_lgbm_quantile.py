@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import numpy as np
+import pandas as pd
+import sklearn
+
+from openstf.model.confidence_interval_applicator import ConfidenceIntervalApplicator
+from openstf.model.regressors.lgbm_quantile import LGBMQuantileOpenstfRegressor
+from test.utils import BaseTestCase, TestData
+
+train_input = TestData.load("reference_sets/307-train-data.csv")
+
+
+class TestLgbmQuantile(BaseTestCase):
+    def setUp(self) -> None:
+        self.quantiles = [0.9, 0.5, 0.6, 0.1]
+
+    def test_quantile_loading(self):
+        model = LGBMQuantileOpenstfRegressor(tuple(self.quantiles))
+        self.assertEqual(model.quantiles, tuple(self.quantiles))
+
+    def test_quantile_fit(self):
+        """Test happy flow of the training of model"""
+        model = LGBMQuantileOpenstfRegressor()
+        model.fit(
+            train_input.iloc[:, 1:],
+            train_input.iloc[:, 0],
+            eval_set=[
+                (train_input.iloc[:, 1:], train_input.iloc[:, 0]),
+                (train_input.iloc[-500:, 1:], train_input.iloc[-500:, 0]),
+            ],
+            early_stopping_rounds=10,
+        )
+
+        # check if the model was fitted (raises NotFittedError when not fitted)
+        self.assertIsNone(sklearn.utils.validation.check_is_fitted(model))
+
+        # check if model is sklearn compatible
+        self.assertTrue(isinstance(model, sklearn.base.BaseEstimator))
+
+        # check if feature importance can be determined
+        self.assertEqual(
+            list(model.set_feature_importance().index.sort_values()),
+            sorted(train_input.columns[1:]),
+        )
+
+    def test_predict_quantiles(self):
+        """Test if quantile predictions are ordered and equal to single predictions"""
+        model = LGBMQuantileOpenstfRegressor(tuple(self.quantiles))
+        model.fit(train_input.iloc[:, 1:], train_input.iloc[:, 0])
+
+        quantiles = [0.1, 0.5, 0.9]
+        forecast = model.predict_quantiles(train_input.iloc[:, 1:], quantiles)
+
+        self.assertEqual(forecast.shape, (len(train_input), len(quantiles)))
+        for i, quantile in enumerate(quantiles):
+            np.testing.assert_array_almost_equal(
+                forecast[:, i],
+                model.predict(train_input.iloc[:, 1:], quantile=quantile),
+            )
+        # On average the lower quantile should be below the higher quantile
+        self.assertTrue((forecast[:, 0].mean() < forecast[:, 2].mean()))
+
+    def test_add_quantiles_to_forecast(self):
+        """Test if the confidence interval applicator adds the quantile columns"""
+        model = LGBMQuantileOpenstfRegressor(tuple(self.quantiles))
+        model.fit(train_input.iloc[:, 1:], train_input.iloc[:, 0])
+
+        forecast_input = train_input.iloc[-10:, 1:]
+        forecast = pd.DataFrame(
+            index=forecast_input.index, data={"forecast": model.predict(forecast_input)}
+        )
+        forecast = ConfidenceIntervalApplicator(
+            model, forecast_input
+        )._add_quantiles_to_forecast_quantile_regression(forecast, self.quantiles)
+
+        for quantile in self.quantiles:
+            self.assertIn(f"quantile_P{quantile * 100:02.0f}", forecast.columns)
+        np.testing.assert_array_almost_equal(
+            forecast["quantile_P50"], forecast["forecast"]
+        )
+
+    def test_value_error_raised(self):
+        # Check if Value Error is raised when 0.5 is not in the requested quantiles list
+        with self.assertRaises(ValueError):
+            LGBMQuantileOpenstfRegressor((0.2, 0.3, 0.6, 0.7))
+
+    def test_predict_raises_valueerror_no_model_trained_for_quantile(self):
+        # Test if value error is raised when model is not available
+        with self.assertRaises(ValueError):
+            model = LGBMQuantileOpenstfRegressor((0.2, 0.3, 0.5, 0.6, 0.7))
+            model.predict("test_data", quantile=0.8)
+
+    def test_set_params(self):
+        # Check hyperparameters are set correctly and do not cause errors
+        model = LGBMQuantileOpenstfRegressor((0.2, 0.3, 0.5, 0.6, 0.7))
+
+        hyperparams = {
+            "num_leaves": "20",
+            "learning_rate": "0.05",
+            "training_period_days": "90",
+        }
+        valid_hyper_parameters = {
+            key: value
+            for key, value in hyperparams.items()
+            if key in model.get_params().keys()
+        }
+
+        model.set_params(**valid_hyper_parameters)
+
+        # Check if vallues are properly set
+        self.assertEqual(model.num_leaves, hyperparams["num_leaves"])
+        self.assertFalse(hasattr(model, "training_period_days"))
+
+    def test_importance_names(self):
+        model = LGBMQuantileOpenstfRegressor(tuple(self.quantiles))
+        self.assertIsInstance(model._get_importance_names(), dict)
@@ -67,6 +67,43 @@ class TestXgbQuantile(BaseTestCase):
         # check if model is sklearn compatible
         self.assertTrue(isinstance(model, sklearn.base.BaseEstimator))
 
+    def test_quantile_fit_parallel(self):
+        """Test if training the quantile models concurrently gives the same models"""
+        x, y = train_input.iloc[:, 1:], train_input.iloc[:, 0]
+        model = XGBQuantileOpenstfRegressor(tuple(self.quantiles), n_jobs=1)
+        model.fit(x, y)
+        model_parallel = XGBQuantileOpenstfRegressor(
+            tuple(self.quantiles), n_jobs=2, n_parallel_quantiles=2
+        )
+        model_parallel.fit(x, y)
+
+        self.assertEqual(set(model_parallel.estimators_), set(self.quantiles))
+        np.testing.assert_array_almost_equal(
+            model.predict_quantiles(x, self.quantiles),
+            model_parallel.predict_quantiles(x, self.quantiles),
+        )
+
+    def test_predict_quantiles(self):
+        """Test if predicting multiple quantiles at once equals predicting them one by one"""
+        model = XGBQuantileOpenstfRegressor(tuple(self.quantiles))
+        model.fit(train_input.iloc[:, 1:], train_input.iloc[:, 0])
+
+        quantiles = [0.1, 0.5, 0.9]
+        forecast = model.predict_quantiles(train_input.iloc[:, 1:], quantiles)
+
+        self.assertEqual(forecast.shape, (len(train_input), len(quantiles)))
+        for i, quantile in enumerate(quantiles):
+            np.testing.assert_array_almost_equal(
+                forecast[:, i],
+                model.predict(train_input.iloc[:, 1:], quantile=quantile),
+            )
+
+    def test_predict_quantiles_raises_valueerror_no_model_trained_for_quantile(self):
+        # Test if value error is raised when one of the models is not available
+        with self.assertRaises(ValueError):
+            model = XGBQuantileOpenstfRegressor((0.2, 0.3, 0.5, 0.6, 0.7))
+            model.predict_quantiles("test_data", quantiles=[0.5, 0.8])
+
     def test_value_error_raised(self):
         # Check if Value Error is raised when 0.5 is not in the requested quantiles list
         with self.assertRaises(ValueError):
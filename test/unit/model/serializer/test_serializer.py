@@ -13,6 +13,7 @@ import pandas as pd
 from openstf.dataclasses.model_specifications import ModelSpecificationDataClass
 from openstf.model.model_creator import ModelCreator
 from openstf.model.serializer import (
+    LoadedModelCache,
     PersistentStorageSerializer,
     MODEL_FILENAME,
     FOLDER_DATETIME_FORMAT,
@@ -264,3 +265,53 @@ class TestAbstractModelSerializer(BaseTestCase):
                     :2, :
                 ],
             )
+
+
+class TestLoadedModelCache(BaseTestCase):
+    def test_disabled_by_default(self):
+        cache = LoadedModelCache()
+        load = MagicMock(side_effect=lambda: object())
+
+        cache.get("model", load)
+        cache.get("model", load)
+
+        self.assertEqual(load.call_count, 2)
+
+    def test_returns_copies_and_evicts_least_recently_used(self):
+        cache = LoadedModelCache(max_size=2)
+        load = MagicMock(side_effect=lambda: ModelCreator.create_model("xgb"))
+
+        first = cache.get("a", load)
+        first.age = 1
+        second = cache.get("a", load)
+        self.assertEqual(load.call_count, 1)
+        # Attributes set on a loaded model do not change the cached model
+        self.assertIsNot(first, second)
+        self.assertFalse(hasattr(second, "age"))
+
+        cache.get("b", load)
+        cache.get("a", load)
+        cache.get("c", load)  # Evicts b
+        cache.get("a", load)
+        self.assertEqual(load.call_count, 3)
+        cache.get("b", load)
+        self.assertEqual(load.call_count, 4)
+
+        cache.resize(0)
+        cache.get("a", load)
+        self.assertEqual(load.call_count, 5)
+
+    def test_copies_standard_deviation(self):
+        cache = LoadedModelCache(max_size=1)
+        model = ModelCreator.create_model("xgb")
+        model.standard_deviation = pd.DataFrame(
+            {"stdev": [1.0, None], "hour": [0, 1], "horizon": [0.25, 0.25]}
+        )
+
+        first = cache.get("a", lambda: model)
+        first.standard_deviation.loc[1, "stdev"] = 2.0
+        second = cache.get("a", lambda: model)
+
+        # Changing the standard deviation of a loaded model in place does not
+        # change the cached model
+        self.assertTrue(pd.isna(second.standard_deviation.loc[1, "stdev"]))
@@ -4,6 +4,7 @@
 
 from unittest import TestCase
 
+import numpy as np
 import pandas as pd
 
 from openstf.model.confidence_interval_applicator import ConfidenceIntervalApplicator
@@ -16,6 +17,10 @@ class MockModel:
         stdev_forecast = pd.DataFrame({"forecast": [5, 6, 7], "stdev": [0.5, 0.6, 0.7]})
         return stdev_forecast["stdev"].rename(quantile)
 
+    def predict_quantiles(self, input, quantiles):
+        stdev_forecast = pd.DataFrame({"forecast": [5, 6, 7], "stdev": [0.5, 0.6, 0.7]})
+        return np.repeat(stdev_forecast[["stdev"]].values, len(quantiles), axis=1)
+
 
 class TestConfidenceIntervalApplicator(TestCase):
     def setUp(self) -> None:
@@ -52,3 +57,25 @@ class TestConfidenceIntervalApplicator(TestCase):
 
         for expected_column in expected_new_columns:
             self.assertTrue(expected_column in pp_forecast.columns)
+
+    def test_add_standard_deviation_does_not_change_model(self):
+        model = MockModel()
+        model.standard_deviation = pd.DataFrame(
+            {
+                "stdev": [0.5] * 47 + [np.nan],
+                "hour": list(range(24)) * 2,
+                "horizon": [0.25] * 24 + [47.0] * 24,
+            }
+        )
+        forecast = pd.DataFrame(
+            {"forecast": [5, 6], "tAhead": [1.0, 2.0]},
+            index=pd.date_range("2021-01-01", periods=2, freq="15T", tz="UTC"),
+        )
+
+        result = ConfidenceIntervalApplicator(
+            model, "TEST"
+        )._add_standard_deviation_to_forecast(forecast)
+
+        # The missing stdev is filled for the forecast only
+        self.assertFalse(result.stdev.isna().any())
+        self.assertTrue(pd.isna(model.standard_deviation.stdev.iloc[-1]))
@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from openstf.exceptions import InputDataInsufficientError
+from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
+from openstf.model_selection.cross_validation import (
+    CV_METRICS,
+    cross_validate,
+    make_rolling_origin_folds,
+)
+from test.utils import BaseTestCase, TestData
+
+
+class TestRollingOriginFolds(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.data = TrainFeatureApplicator(horizons=[0.25, 47.0]).add_features(
+            TestData.load("reference_sets/307-train-data.csv")
+        )
+        self.days = np.unique(self.data.index.date)
+
+    def test_expanding_folds(self):
+        folds = make_rolling_origin_folds(
+            self.data, n_folds=3, test_days=7, random_state=0
+        )
+
+        self.assertEqual(len(folds), 3)
+        # The last fold tests on the last days
+        self.assertEqual(self.data.index[folds[-1].test_index[-1]], self.data.index[-1])
+        for fold in folds:
+            train_data, validation_data, test_data = fold.split(self.data)
+            self.assertEqual(len(np.unique(test_data.index.date)), 7)
+            self.assertEqual(test_data.index.min(), fold.origin)
+            self.assertTrue(train_data.index.max() < fold.origin)
+            self.assertTrue(validation_data.index.max() < fold.origin)
+            self.assertTrue(
+                set(validation_data.index.date).isdisjoint(train_data.index.date)
+            )
+            # Expanding, every fold trains from the first day
+            training_days = set(train_data.index.date) | set(validation_data.index.date)
+            self.assertEqual(min(training_days), self.days[0])
+
+        origins = [fold.origin for fold in folds]
+        self.assertEqual(sorted(origins), origins)
+
+    def test_sliding_folds(self):
+        folds = make_rolling_origin_folds(
+            self.data, n_folds=2, window="sliding", train_days=35, random_state=0
+        )
+
+        for fold in folds:
+            train_data, validation_data, _ = fold.split(self.data)
+            training_days = set(train_data.index.date) | set(validation_data.index.date)
+            self.assertEqual(len(training_days), 35)
+
+    def test_sliding_folds_require_train_days(self):
+        with self.assertRaises(ValueError):
+            make_rolling_origin_folds(self.data, window="sliding")
+
+    def test_insufficient_training_days(self):
+        with self.assertRaises(InputDataInsufficientError):
+            make_rolling_origin_folds(self.data, n_folds=10, test_days=7)
+
+    def test_folds_reproducible(self):
+        folds = make_rolling_origin_folds(self.data, random_state=0)
+        same_folds = make_rolling_origin_folds(self.data, random_state=0)
+
+        for fold, same_fold in zip(folds, same_folds):
+            np.testing.assert_array_equal(
+                fold.validation_index, same_fold.validation_index
+            )
+
+
+class TestCrossValidate(BaseTestCase):
+    def test_cross_validate(self):
+        pj, modelspecs = TestData.get_prediction_job_and_modelspecs(pid=307)
+        pj["model"] = "lgb"
+        modelspecs.hyper_params = {"n_estimators": 10}
+        input_data = TestData.load("reference_sets/307-train-data.csv")
+
+        with patch.object(
+            TrainFeatureApplicator,
+            "add_features",
+            autospec=True,
+            side_effect=TrainFeatureApplicator.add_features,
+        ) as add_features_mock:
+            metrics = cross_validate(
+                pj, modelspecs, input_data, n_folds=3, n_workers=2, random_state=0
+            )
+
+        # Features are computed once for all folds
+        add_features_mock.assert_called_once()
+        self.assertEqual(
+            list(metrics.columns), ["fold", "origin", "horizon", "n"] + CV_METRICS
+        )
+        # A row per fold and horizon
+        self.assertEqual(len(metrics), 3 * 2)
+        self.assertEqual(sorted(metrics.horizon.unique()), [0.25, 47.0])
+        # At most 7 days per horizon, the data can have missing rows
+        self.assertTrue(metrics.n.between(1, 7 * 96).all())
+        self.assertFalse(metrics[CV_METRICS].isna().any().any())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,9 @@
 import unittest
 
 import numpy as np
+import pandas as pd
 
+from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
 from openstf.model_selection import model_selection
 from test.utils.base import BaseTestCase
 from test.utils.data import TestData
@@ -95,6 +97,113 @@ class TestTrain(BaseTestCase):
             delta=4,
         )
 
+    def test_random_sample_seeded(self):
+        all_peaks = np.arange(20)
+
+        sampled = model_selection.random_sample(all_peaks, 5, random_state=1)
+
+        self.assertEqual(len(set(sampled)), 5)
+        np.testing.assert_array_equal(
+            sampled, model_selection.random_sample(all_peaks, 5, random_state=1)
+        )
+
+    def test_get_day_ordinals(self):
+        index = pd.DatetimeIndex(
+            ["1970-01-01 00:00", "1970-01-01 23:45", "1970-01-02 00:00"], tz="UTC"
+        )
+        np.testing.assert_array_equal(
+            model_selection.get_day_ordinals(index), [0, 0, 1]
+        )
+
+
+class TestSplitPlan(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.data = TrainFeatureApplicator(horizons=[0.25, 47.0]).add_features(
+            TestData.load("reference_sets/307-train-data.csv")
+        )
+
+    def test_sample_stratified(self):
+        positions = model_selection.sample_stratified(
+            self.data, 500, stratify_by=("horizon", "hour"), random_state=0
+        )
+        sample = self.data.iloc[positions]
+
+        self.assertAlmostEqual(len(sample), 500, delta=48)
+        self.assertTrue((np.diff(positions) > 0).all())
+        # Every horizon and hour is in the sample
+        self.assertEqual(
+            len(sample.groupby(["horizon", sample.index.hour])),
+            len(self.data.groupby(["horizon", self.data.index.hour])),
+        )
+        # Data smaller than the sample size is sampled completely
+        np.testing.assert_array_equal(
+            model_selection.sample_stratified(self.data.head(10), 500), np.arange(10)
+        )
+
+    def test_split_reproducible(self):
+        for back_test in [False, True]:
+            with self.subTest(back_test=back_test):
+                plan = model_selection.make_split_plan(
+                    self.data, back_test=back_test, random_state=0
+                )
+                same_plan = model_selection.make_split_plan(
+                    self.data, back_test=back_test, random_state=0
+                )
+                np.testing.assert_array_equal(
+                    plan.validation_index, same_plan.validation_index
+                )
+                np.testing.assert_array_equal(plan.train_index, same_plan.train_index)
+
+    def test_split_plan_equals_split(self):
+        plan = model_selection.make_split_plan(self.data, random_state=0)
+        (
+            peaks,
+            peaks_val_train,
+            train_data,
+            validation_data,
+            test_data,
+        ) = model_selection.split_data_train_validation_test(self.data, random_state=0)
+
+        for planned, split in zip(
+            plan.split(self.data), [train_data, validation_data, test_data]
+        ):
+            pd.testing.assert_frame_equal(planned, split)
+        pd.testing.assert_frame_equal(plan.peaks, peaks)
+
+    def test_peaks_timezone_aware(self):
+        data = self.data[["load"]].tz_convert("Europe/Amsterdam")
+
+        peaks, _, _, _, _ = model_selection.split_data_train_validation_test(
+            data, test_fraction=0.0, random_state=0
+        )
+
+        # The peak days as determined before, per local day of the data
+        max_per_day = data.resample("1D").max().sort_values(by="load").dropna()
+        min_per_day = data.resample("1D").min().sort_values(by="load").dropna()
+        peak_fraction = model_selection.PEAK_FRACTION
+        max_days = max_per_day.iloc[int((1 - peak_fraction) * len(max_per_day)) :]
+        min_days = min_per_day.iloc[: int(peak_fraction * len(min_per_day))]
+        expected_peaks = pd.concat(
+            [max_days, min_days[~min_days.index.isin(max_days.index)]]
+        )
+
+        pd.testing.assert_frame_equal(peaks, expected_peaks, check_freq=False)
+        # Peak days start at local midnight
+        self.assertTrue((peaks.index.hour == 0).all())
+
+    def test_validation_days_are_peak_days(self):
+        plan = model_selection.make_split_plan(self.data, random_state=0)
+        train_data, validation_data, _ = plan.split(self.data)
+        validation_days = set(validation_data.index.date)
+
+        self.assertEqual(validation_days, set(plan.peaks_val_train[0][0]))
+        self.assertTrue(validation_days.issubset(set(plan.peaks.index.date)))
+        self.assertTrue(validation_days.isdisjoint(set(train_data.index.date)))
+        # Every set is ordered
+        self.assertTrue(train_data.index.is_monotonic_increasing)
+        self.assertTrue(validation_data.index.is_monotonic_increasing)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,6 +2,7 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 import unittest
+from unittest.mock import MagicMock, patch
 
 import optuna
 
@@ -12,7 +13,9 @@ from openstf.model.objective import (
     XGBRegressorObjective,
     LGBRegressorObjective,
     XGBQuantileRegressorObjective,
+    LGBQuantileRegressorObjective,
 )
+from openstf.model_selection.model_selection import split_data_train_validation_test
 from test.utils import BaseTestCase, TestData
 
 input_data = TestData.load("reference_sets/307-train-data.csv")
@@ -46,6 +49,93 @@ class TestRegressorObjective(BaseTestCase):
         self.assertIsInstance(objective, RegressorObjective)
         self.assertEqual(len(study.trials), N_TRIALS)
 
+    def test_data_split_once_per_study(self):
+        model = ModelCreator.create_model("xgb")
+        objective = RegressorObjective(model, input_data_with_features)
+        study = optuna.create_study(direction="minimize")
+
+        with patch(
+            "openstf.model.objective.split_data_train_validation_test",
+            wraps=split_data_train_validation_test,
+        ) as split_mock:
+            study.optimize(objective, n_trials=3)
+            train_data = objective.train_data
+            study.optimize(objective, n_trials=1)
+
+        self.assertEqual(split_mock.call_count, 1)
+        self.assertIs(objective.train_data, train_data)
+        self.assertEqual(len(study.trials), 4)
+
+    def test_narrow_range(self):
+        model = ModelCreator.create_model("xgb")
+        objective = RegressorObjective(
+            model,
+            input_data_with_features,
+            warm_start_params=[{"max_depth": 5}, {"max_depth": 6}, {"alpha": None}],
+            search_space_fraction=0.25,
+        )
+
+        self.assertEqual(objective.narrow_range("max_depth", 2, 10), (3.0, 8.0))
+        # Clipped to the full range
+        self.assertEqual(objective.narrow_range("max_depth", 5, 6), (5, 6))
+        # No warm start values, the full range is searched
+        self.assertEqual(objective.narrow_range("alpha", 0.0, 1.0), (0.0, 1.0))
+
+    def test_full_range_without_search_space_fraction(self):
+        model = ModelCreator.create_model("xgb")
+        objective = RegressorObjective(
+            model, input_data_with_features, warm_start_params=[{"max_depth": 5}]
+        )
+        self.assertEqual(objective.narrow_range("max_depth", 2, 10), (2, 10))
+
+
+class TestMultiFidelityObjective(BaseTestCase):
+    def create_objective(self):
+        model = ModelCreator.create_model("xgb")
+        objective = XGBRegressorObjective(
+            model, input_data_with_features, fidelity_fractions=(1 / 9, 1 / 3)
+        )
+        objective.split_data()
+        return objective
+
+    def test_fidelity_data_subsamples_days(self):
+        objective = self.create_objective()
+
+        n_days = objective.train_x.index.normalize().nunique()
+        for fraction in objective.fidelity_fractions:
+            train_x, train_y = objective.get_fidelity_data(fraction)
+            self.assertEqual(len(train_x), len(train_y))
+            self.assertAlmostEqual(
+                train_x.index.normalize().nunique(), n_days * fraction, delta=1
+            )
+        # Cached
+        self.assertIs(
+            objective.get_fidelity_data(1 / 3)[0], objective.get_fidelity_data(1 / 3)[0]
+        )
+
+    def test_rungs_reported(self):
+        objective = self.create_objective()
+        study = optuna.create_study(direction="minimize")
+
+        study.optimize(objective, n_trials=1)
+
+        self.assertEqual(list(study.trials[0].intermediate_values), [1, 2])
+
+    def test_pruned_trial_not_trained_on_all_data(self):
+        objective = self.create_objective()
+        trial = MagicMock()
+        trial.suggest_float.side_effect = lambda name, low, high: low
+        trial.suggest_int.side_effect = lambda name, low, high: low
+        trial.suggest_categorical.side_effect = lambda name, choices: choices[0]
+        trial.should_prune.return_value = True
+
+        with patch.object(objective.model, "fit", wraps=objective.model.fit) as fit:
+            with self.assertRaises(optuna.TrialPruned):
+                objective(trial)
+
+        self.assertEqual(fit.call_count, 1)
+        self.assertLess(len(fit.call_args.args[0]), len(objective.train_x))
+
 
 class TestXGBRegressorObjective(BaseTestCase):
     def test_call(self):
@@ -110,6 +200,27 @@ class TestXGBQRegressorObjective(BaseTestCase):
         self.assertEqual(len(study.trials), N_TRIALS)
 
 
+class TestLGBQRegressorObjective(BaseTestCase):
+    def test_call(self):
+        model_type = "lgb_quantile"
+        model = ModelCreator.create_model(model_type)
+
+        objective = LGBQuantileRegressorObjective(
+            model,
+            input_data_with_features,
+        )
+        study = optuna.create_study(
+            study_name=model_type,
+            pruner=optuna.pruners.MedianPruner(n_warmup_steps=5),
+            direction="minimize",
+        )
+
+        study.optimize(objective, n_trials=N_TRIALS)
+
+        self.assertIsInstance(objective, LGBQuantileRegressorObjective)
+        self.assertEqual(len(study.trials), N_TRIALS)
+
+
 class ColumnOrderTest(BaseTestCase):
     def test_call(self):
         model_type = "xgb"
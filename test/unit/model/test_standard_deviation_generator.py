@@ -3,51 +3,29 @@
 # SPDX-License-Identifier: MPL-2.0
 import unittest
 
+import numpy as np
 import pandas as pd
 
 from openstf.model.standard_deviation_generator import StandardDeviationGenerator
 
 
 class MockModel:
-    def predict(self, *args):
-
-        # Prepare mock_forecast
-        mock_forecast = pd.DataFrame(
-            {
-                "forecast": [1, 2, 3, 4, 1, 3, 3, 7],
-                "horizon": [47.0, 47.0, 47.0, 47.0, 24.0, 24.0, 24.0, 24.0],
-            }
-        )
-        mock_forecast = mock_forecast.set_index(
-            pd.to_datetime(
-                [
-                    "2018-01-01 00:00:00",
-                    "2018-01-01 01:00:00",
-                    "2018-01-01 02:00:00",
-                    "2018-01-01 03:00:00",
-                    "2018-01-01 00:00:00",
-                    "2018-01-01 01:00:00",
-                    "2018-01-01 02:00:00",
-                    "2018-01-01 03:00:00",
-                ]
-            )
-        )
-
-        # Return mock forecast
-        return mock_forecast["forecast"]
+    def predict(self, x):
+        # The forecast equals feature_1
+        return x["feature_1"].to_numpy()
 
 
 class TestStandardDeviationGenerator(unittest.TestCase):
     def setUp(self) -> None:
         self.model = MockModel()
 
-        # Prepare mock validation data
+        # Prepare mock validation data, three days with two hours for two horizons
         mock_validation_data = pd.DataFrame(
             {
-                "load": [4, 2, 5, 2, 4, 2, 5, 2],
-                "feature_1": [4, 2, 5, 2, 5, 4, 8, 2],
-                "feature_2": [4, 2, 5, 2, 5, 4, 8, 2],
-                "horizon": [47.0, 47.0, 47.0, 47.0, 24.0, 24.0, 24.0, 24.0],
+                "load": [4, 2, 5, 2, 6, 3, 4, 2, 5, 2, 6, 3],
+                "feature_1": [4, 2, 4, 2, 4, 2, 3, 2, 3, 2, 2, 2],
+                "feature_2": [4, 2, 5, 2, 5, 4, 8, 2, 4, 2, 4, 2],
+                "horizon": [47.0] * 6 + [24.0] * 6,
             }
         )
 
@@ -56,13 +34,12 @@ class TestStandardDeviationGenerator(unittest.TestCase):
                 [
                     "2018-01-01 00:00:00",
                     "2018-01-01 01:00:00",
-                    "2018-01-01 02:00:00",
-                    "2018-01-01 03:00:00",
-                    "2018-01-01 00:00:00",
-                    "2018-01-01 01:00:00",
-                    "2018-01-01 02:00:00",
-                    "2018-01-01 03:00:00",
+                    "2018-01-02 00:00:00",
+                    "2018-01-02 01:00:00",
+                    "2018-01-03 00:00:00",
+                    "2018-01-03 01:00:00",
                 ]
+                * 2
             )
         )
 
@@ -72,9 +49,11 @@ class TestStandardDeviationGenerator(unittest.TestCase):
         # Test happy flow
 
         # Generate reference dataframe of expected output, this data has been checked.
+        # The first error of each hour is excluded, for horizon 47 the errors of
+        # hour 0 are [0, 1, 2] and for hour 1 [0, 0, 1]. Hours without data are NaN.
         ref_df = pd.DataFrame(
             {
-                "stdev": [0, 0.0, 0.0, 0.0],
+                "stdev": [0.5, 0.5, np.nan, np.nan],
                 "hour": [0.0, 1.0, 2.0, 3.0],
                 "horizon": [47.0, 47.0, 47.0, 47.0],
             }
@@ -90,3 +69,8 @@ class TestStandardDeviationGenerator(unittest.TestCase):
 
         # Check if all horizons are pressent
         self.assertEqual([47.0, 24.0], list(model.standard_deviation.horizon.unique()))
+
+        # For horizon 24 the errors of hour 0 are [1, 2, 4] and for hour 1 [0, 0, 1]
+        stdev_24 = model.standard_deviation[model.standard_deviation.horizon == 24.0]
+        self.assertEqual(len(stdev_24), 24)
+        self.assertEqual(list(stdev_24.stdev.iloc[:2]), [1.0, 0.5])
@@ -0,0 +1,116 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from openstf.model.standard_deviation_updater import StandardDeviationUpdater
+
+
+class TestStandardDeviationUpdater(unittest.TestCase):
+    def setUp(self) -> None:
+        # Standard deviation of a model with two horizons, hour 1 of the 0.25
+        # horizon is unknown
+        self.standard_deviation = pd.DataFrame(
+            {
+                "stdev": [1.0, np.nan, 2.0, 2.0],
+                "hour": [0.0, 1.0, 0.0, 1.0],
+                "horizon": [0.25, 0.25, 47.0, 47.0],
+            },
+            index=[0, 1, 0, 1],
+        )
+
+        index = pd.date_range("2021-01-01", periods=8, freq="15T", tz="UTC")
+        self.realised = pd.Series([4, 2, 5, 2, 6, 3, 4, 2], index=index, dtype=float)
+        self.predicted_load = pd.DataFrame(
+            {
+                "forecast_47.0h": [4, 2, 4, 2, 4, 2, 3, 2],
+                "stdev_47.0h": 1.0,
+                "forecast_24.0h": 0.0,
+                "stdev_24.0h": 1.0,
+            },
+            index=index,
+            dtype=float,
+        )
+
+    def test_from_standard_deviation(self):
+        updater = StandardDeviationUpdater.from_standard_deviation(
+            self.standard_deviation, prior_count=10
+        )
+
+        self.assertListEqual(updater.moments["count"].tolist(), [10, 0, 10, 10])
+        self.assertListEqual(updater.moments.m2.tolist(), [10, 0, 40, 40])
+        pd.testing.assert_frame_equal(
+            updater.standard_deviation, self.standard_deviation
+        )
+
+    def test_update_equals_batch(self):
+        updater = StandardDeviationUpdater.from_standard_deviation(
+            self.standard_deviation, prior_count=0
+        )
+        # Updating in two parts should give the same result as all errors at once
+        updater.update(self.realised.iloc[:3], self.predicted_load)
+        updater.update(self.realised, self.predicted_load)
+
+        errors = (self.realised - self.predicted_load["forecast_47.0h"]).to_numpy()
+        stdev = updater.standard_deviation.set_index(["horizon", "hour"]).stdev
+
+        self.assertAlmostEqual(stdev[(47.0, 0.0)], np.std(errors[:4]))
+        self.assertAlmostEqual(stdev[(47.0, 1.0)], np.std(errors[4:]))
+        # Horizons without realised errors are untouched
+        self.assertTrue(np.isnan(stdev[(0.25, 0.0)]))
+        # Horizons which are not part of the model are not added
+        self.assertEqual(len(stdev), 4)
+        self.assertEqual(updater.last_update, self.realised.index[-1])
+
+    def test_update_twice_has_no_effect(self):
+        updater = StandardDeviationUpdater.from_standard_deviation(
+            self.standard_deviation
+        )
+        updater.update(self.realised, self.predicted_load)
+        moments = updater.moments.copy()
+
+        updater.update(self.realised, self.predicted_load)
+
+        pd.testing.assert_frame_equal(updater.moments, moments)
+
+    def test_merge_moments(self):
+        errors_a = pd.DataFrame(
+            {"horizon": 47.0, "hour": [0.0, 0.0, 1.0], "error": [1.0, 3.0, 2.0]}
+        )
+        errors_b = pd.DataFrame(
+            {"horizon": 47.0, "hour": [0.0, 2.0], "error": [8.0, 5.0]}
+        )
+
+        merged = StandardDeviationUpdater.merge_moments(
+            StandardDeviationUpdater.calculate_error_moments(errors_a),
+            StandardDeviationUpdater.calculate_error_moments(errors_b),
+        )
+        expected = StandardDeviationUpdater.calculate_error_moments(
+            pd.concat([errors_a, errors_b])
+        )
+
+        pd.testing.assert_frame_equal(merged, expected)
+
+        # The merged moments are sorted, whatever the order of the input
+        merged = StandardDeviationUpdater.merge_moments(
+            StandardDeviationUpdater.calculate_error_moments(errors_a).iloc[::-1],
+            StandardDeviationUpdater.calculate_error_moments(errors_b),
+        )
+        pd.testing.assert_frame_equal(merged, expected)
+
+    def test_to_dict_from_dict(self):
+        updater = StandardDeviationUpdater.from_standard_deviation(
+            self.standard_deviation
+        ).update(self.realised, self.predicted_load)
+
+        loaded = StandardDeviationUpdater.from_dict(updater.to_dict())
+
+        pd.testing.assert_frame_equal(loaded.moments, updater.moments)
+        self.assertEqual(loaded.last_update, updater.last_update)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,27 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
+import os
+import tempfile
+import time
 import unittest
+from pathlib import Path
 from unittest.mock import patch
 
+import optuna
 import pandas as pd
 
 from openstf.exceptions import (
     InputDataInsufficientError,
     InputDataWrongColumnOrderError,
 )
+from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
+from openstf.model.objective_creator import ObjectiveCreator
 from openstf.pipeline.optimize_hyperparameters import (
+    STUDY_RESUME_MAX_AGE,
+    get_study_storage_path,
     optimize_hyperparameters_pipeline,
+    optuna_optimization,
 )
 from test.utils import BaseTestCase, TestData
 
@@ -56,5 +66,115 @@ class TestOptimizeHyperParametersPipeline(BaseTestCase):
             )
 
 
+class TestOptunaOptimizationStorage(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.pj, _ = TestData.get_prediction_job_and_modelspecs(pid=307)
+        input_data = TestData.load("reference_sets/307-train-data.csv")
+        # Select a subset of the data to speedup the test
+        self.input_data = (
+            TrainFeatureApplicator(horizons=[0.25, 24.0])
+            .add_features(input_data)
+            .iloc[::50, :]
+        )
+        self.objective = ObjectiveCreator.create_objective(model_type=self.pj["model"])
+        self.storage_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.storage_folder.cleanup)
+
+    def optimize(self, n_trials, **kwargs):
+        return optuna_optimization(
+            self.pj,
+            self.objective,
+            self.input_data,
+            n_trials,
+            storage_folder=self.storage_folder.name,
+            **kwargs,
+        )
+
+    def test_interrupted_study_is_resumed(self):
+        _, study, _ = self.optimize(n_trials=2)
+        self.assertEqual(len(study.trials), 2)
+
+        # A new run only runs the remaining trials
+        model, study, objective = self.optimize(n_trials=3)
+        self.assertEqual(len(study.trials), 3)
+        self.assertTrue(
+            get_study_storage_path(self.storage_folder.name, self.pj["id"]).exists()
+        )
+        # The returned model is trained with the best parameters
+        best_params = study.best_params
+        self.assertIs(objective.model, model)
+        for key in ["learning_rate", "max_depth"]:
+            self.assertEqual(model.get_params()[key], best_params[key])
+        self.assertEqual(len(objective.get_trial_track()), 3)
+
+    def test_outdated_study_is_started_over(self):
+        self.optimize(n_trials=2)
+        storage_path = get_study_storage_path(self.storage_folder.name, self.pj["id"])
+        outdated = time.time() - STUDY_RESUME_MAX_AGE - 60
+        os.utime(storage_path, (outdated, outdated))
+
+        _, study, _ = self.optimize(n_trials=2)
+        self.assertEqual(len(study.trials), 2)
+
+    def test_trials_run_in_parallel_workers(self):
+        model, study, _ = self.optimize(n_trials=2, n_workers=2, n_jobs=2)
+
+        finished = study.get_trials(
+            states=(optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+        )
+        self.assertGreaterEqual(len(finished), 2)
+        # Every worker gets a share of the thread budget
+        self.assertEqual(model.get_params()["n_jobs"], 1)
+
+    def test_warm_start_params_are_tried_first(self):
+        warm_start_params = [
+            {"learning_rate": 0.123, "max_depth": 7, "booster": "unknown"},
+            {"learning_rate": 0.123, "max_depth": 7},
+        ]
+        _, study, _ = optuna_optimization(
+            self.pj,
+            self.objective,
+            self.input_data,
+            n_trials=2,
+            warm_start_params=warm_start_params,
+        )
+
+        first_trial = study.trials[0]
+        self.assertEqual(first_trial.params["learning_rate"], 0.123)
+        self.assertEqual(first_trial.params["max_depth"], 7)
+        # Duplicate warm start params are enqueued once
+        self.assertNotEqual(study.trials[1].params["learning_rate"], 0.123)
+
+    def test_multi_fidelity(self):
+        model, study, objective = optuna_optimization(
+            self.pj, self.objective, self.input_data, n_trials=4, multi_fidelity=True
+        )
+
+        self.assertIsInstance(study.pruner, optuna.pruners.SuccessiveHalvingPruner)
+        self.assertTrue(len(objective.fidelity_fractions) > 0)
+        for trial in study.trials:
+            self.assertIn(1, trial.intermediate_values)
+
+    def test_workers_require_storage(self):
+        with self.assertRaises(ValueError):
+            optuna_optimization(
+                self.pj, self.objective, self.input_data, n_trials=2, n_workers=2
+            )
+
+    def test_finished_study_is_removed(self):
+        input_data = TestData.load("reference_sets/307-train-data.csv")
+        optimize_hyperparameters_pipeline(
+            self.pj,
+            input_data,
+            "./test/trained_models",
+            n_trials=2,
+            storage_folder=self.storage_folder.name,
+        )
+        self.assertFalse(
+            Path(self.storage_folder.name, f"study_{self.pj['id']}.db").exists()
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
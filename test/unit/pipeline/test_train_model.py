@@ -5,6 +5,7 @@ import unittest
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pandas as pd
 import sklearn
 
@@ -16,7 +17,11 @@ from openstf.exceptions import (
 from openstf.feature_engineering.feature_applicator import TrainFeatureApplicator
 from openstf.metrics.reporter import Report
 from openstf.model_selection.model_selection import split_data_train_validation_test
+from openstf.model.model_creator import ModelCreator
 from openstf.pipeline.train_model import (
+    FULL_RETRAIN_INTERVAL_DAYS,
+    compare_models,
+    get_warm_start_model,
     train_model_pipeline,
     train_model_pipeline_core,
 )
@@ -235,10 +240,15 @@ class TestTrainModelPipeline(BaseTestCase):
             self.modelspecs,
         )
         serializer_mock.return_value = serializer_mock_instance
-        old_model_mock.score.return_value = 5
+        old_model_mock.predict.side_effect = lambda x: np.zeros(len(x))
 
         # This error is caught so we check if logging contains the error.
-        with self.assertLogs("openstf.pipeline.train_model", level="ERROR") as captured:
+        with self.assertLogs(
+            "openstf.pipeline.train_model", level="ERROR"
+        ) as captured, patch(
+            "openstf.pipeline.train_model.r2_score",
+            side_effect=lambda realised, forecast: 0.5 if forecast.any() else 5,
+        ):
             train_model_pipeline(
                 pj=self.pj,
                 input_data=self.train_input,
@@ -267,7 +277,7 @@ class TestTrainModelPipeline(BaseTestCase):
             self.modelspecs,
         )
         serializer_mock.return_value = serializer_mock_instance
-        old_model_mock.score.return_value = 0.1
+        old_model_mock.predict.side_effect = lambda x: np.zeros(len(x))
 
         with self.assertLogs("openstf.pipeline.train_model", level="INFO") as captured:
             train_model_pipeline(
@@ -277,9 +287,10 @@ class TestTrainModelPipeline(BaseTestCase):
                 trained_models_folder="./test/trained_models",
             )
 
-        # search for the old model is better log
-        self.assertRegex(
-            captured.records[0].getMessage(), "New model is better than old model"
+        # search for the new model is better log
+        messages = [record.getMessage() for record in captured.records]
+        self.assertTrue(
+            any("New model is better than old model" in m for m in messages)
         )
 
     @patch("openstf.model.serializer.PersistentStorageSerializer.save_model")
@@ -295,7 +306,7 @@ class TestTrainModelPipeline(BaseTestCase):
             self.modelspecs,
         )
         serializer_mock.return_value = serializer_mock_instance
-        old_model_mock.score.side_effect = ValueError()
+        old_model_mock.predict.side_effect = ValueError()
 
         with self.assertLogs("openstf.pipeline.train_model", level="INFO") as captured:
             train_model_pipeline(
@@ -339,5 +350,192 @@ class TestTrainModelPipeline(BaseTestCase):
         self.assertRegex(captured.records[0].getMessage(), "No old model found")
 
 
+class TestModelComparison(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.pj, self.modelspecs = TestData.get_prediction_job_and_modelspecs(pid=307)
+        self.modelspecs.hyper_params["n_estimators"] = 3
+        self.train_input = TestData.load("reference_sets/307-train-data.csv")
+        # Old model of which the forecast is always zero
+        self.old_model = MagicMock()
+        self.old_model.predict.side_effect = lambda x: np.zeros(len(x))
+
+    def test_compare_models_per_horizon(self):
+        model, report, _ = train_model_pipeline_core(
+            self.pj, self.modelspecs, self.train_input, old_model=self.old_model
+        )
+
+        comparison = report.model_comparison
+        self.assertEqual(list(comparison.index), [0.25, 47.0])
+        self.assertEqual(
+            list(comparison.columns),
+            ["n", "r2_new_model", "mae_new_model", "r2_old_model", "mae_old_model"],
+        )
+        self.assertTrue((comparison.n > 0).all())
+        # The split is random, only the short horizon reliably beats a zero forecast
+        self.assertGreater(
+            comparison.loc[0.25, "r2_new_model"], comparison.loc[0.25, "r2_old_model"]
+        )
+
+    def test_comparison_sample_size(self):
+        _, report, _ = train_model_pipeline_core(
+            self.pj,
+            self.modelspecs,
+            self.train_input,
+            old_model=self.old_model,
+            comparison_sample_size=100,
+        )
+
+        self.assertAlmostEqual(report.model_comparison.n.sum(), 100, delta=48)
+        (sample,) = self.old_model.predict.call_args[0]
+        self.assertEqual(len(sample), report.model_comparison.n.sum())
+
+    def test_validation_forecast_reused(self):
+        model_class = type(ModelCreator.create_model(self.pj["model"]))
+        with patch.object(
+            model_class, "predict", autospec=True, side_effect=model_class.predict
+        ) as predict_mock:
+            model, report, _ = train_model_pipeline_core(
+                self.pj, self.modelspecs, self.train_input, old_model=self.old_model
+            )
+
+        # The validation data is predicted once, the report predicts the train
+        # and test data
+        self.assertEqual(predict_mock.call_count, 3)
+        self.assertIsNotNone(report.validation_forecast)
+
+    def test_compare_models(self):
+        comparison_data = pd.DataFrame(
+            {"load": [1.0, 2.0, 3.0, 4.0], "horizon": [0.25, 0.25, 47.0, 47.0]}
+        )
+
+        comparison = compare_models(
+            comparison_data,
+            np.array([1.0, 2.0, 3.0, 4.0]),
+            np.array([1.0, 3.0, 3.0, 5.0]),
+        )
+
+        self.assertEqual(list(comparison.n), [2, 2])
+        self.assertEqual(list(comparison.r2_new_model), [1.0, 1.0])
+        self.assertEqual(list(comparison.mae_old_model), [0.5, 0.5])
+
+
+class TestWarmStartTraining(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.pj, self.modelspecs = TestData.get_prediction_job_and_modelspecs(pid=307)
+        self.modelspecs.hyper_params = {"n_estimators": 30}
+        self.train_input = TestData.load("reference_sets/307-train-data.csv")
+
+    def train(self, model_type, init_model=None):
+        pj = dict(self.pj, model=model_type)
+        modelspecs = self.modelspecs.copy(deep=True)
+        model, _, _ = train_model_pipeline_core(
+            pj, modelspecs, self.train_input, init_model=init_model
+        )
+        return model
+
+    def test_get_warm_start_model(self):
+        model = ModelCreator.create_model("xgb")
+        model.full_training_datetime = datetime.utcnow() - timedelta(days=7)
+        self.assertIs(get_warm_start_model(dict(self.pj, model="xgb"), model), model)
+
+        # No old model or a model type that is not warm started
+        self.assertIsNone(get_warm_start_model(dict(self.pj, model="xgb"), None))
+        quantile_model = ModelCreator.create_model("xgb_quantile")
+        quantile_model.full_training_datetime = model.full_training_datetime
+        self.assertIsNone(
+            get_warm_start_model(dict(self.pj, model="xgb_quantile"), quantile_model)
+        )
+
+        # Dart booster
+        model.set_params(booster="dart")
+        self.assertIsNone(get_warm_start_model(dict(self.pj, model="xgb"), model))
+        model.set_params(booster="gbtree")
+
+        # Full retraining is due
+        model.full_training_datetime = datetime.utcnow() - timedelta(
+            days=FULL_RETRAIN_INTERVAL_DAYS + 1
+        )
+        self.assertIsNone(get_warm_start_model(dict(self.pj, model="xgb"), model))
+        del model.full_training_datetime
+        self.assertIsNone(get_warm_start_model(dict(self.pj, model="xgb"), model))
+
+    def test_warm_start_continues_boosting(self):
+        for model_type in ["xgb", "lgb"]:
+            with self.subTest(model_type=model_type):
+                old_model = self.train(model_type)
+                self.assertFalse(old_model.warm_started)
+                old_predictions = old_model.predict(self.train_input_features())
+
+                model = self.train(model_type, init_model=old_model)
+
+                self.assertTrue(model.warm_started)
+                self.assertEqual(
+                    model.full_training_datetime, old_model.full_training_datetime
+                )
+                self.assertGreater(self.num_trees(model), self.num_trees(old_model))
+                # The old model is not changed
+                np.testing.assert_array_equal(
+                    old_model.predict(self.train_input_features()), old_predictions
+                )
+
+    @patch("openstf.pipeline.train_model.WARM_START_MIN_SCORE", 2.0)
+    def test_drifted_model_is_retrained(self):
+        old_model = self.train("xgb")
+        model = self.train("xgb", init_model=old_model)
+        self.assertFalse(model.warm_started)
+        self.assertGreater(
+            model.full_training_datetime, old_model.full_training_datetime
+        )
+
+    @patch("openstf.pipeline.train_model.WARM_START_MAX_ROUNDS", 5)
+    def test_warm_start_does_not_limit_later_trainings(self):
+        for model_type in ["xgb", "lgb"]:
+            with self.subTest(model_type=model_type):
+                old_model = self.train(model_type)
+                model = self.train(model_type, init_model=old_model)
+
+                # At most WARM_START_MAX_ROUNDS rounds are added
+                self.assertTrue(model.warm_started)
+                self.assertLessEqual(
+                    self.num_trees(model), self.num_trees(old_model) + 5
+                )
+                self.assertEqual(model.get_params()["n_estimators"], 30)
+
+                # The next training uses the hyperparameters of the stored model,
+                # like the serializer does
+                self.modelspecs.hyper_params = {
+                    "n_estimators": model.get_params()["n_estimators"]
+                }
+                full_model = self.train(model_type)
+                self.assertFalse(full_model.warm_started)
+                self.assertEqual(full_model.get_params()["n_estimators"], 30)
+
+    def test_changed_hyper_params_are_retrained(self):
+        old_model = self.train("xgb")
+
+        # All parameters of a stored model, like the serializer loads them
+        self.modelspecs.hyper_params = old_model.get_params()
+        self.assertTrue(self.train("xgb", init_model=old_model).warm_started)
+
+        self.modelspecs.hyper_params = dict(old_model.get_params(), max_depth=3)
+        model = self.train("xgb", init_model=old_model)
+        self.assertFalse(model.warm_started)
+        self.assertEqual(model.get_params()["max_depth"], 3)
+
+    def train_input_features(self):
+        data = TrainFeatureApplicator(
+            horizons=[0.25], feature_names=self.modelspecs.feature_names
+        ).add_features(validation.clean(self.train_input))
+        return data.iloc[:100, 1:-1]
+
+    @staticmethod
+    def num_trees(model):
+        if hasattr(model, "get_booster"):
+            return model.get_booster().num_boosted_rounds()
+        return model.booster_.current_iteration()
+
+
 if __name__ == "__main__":
     unittest.main()
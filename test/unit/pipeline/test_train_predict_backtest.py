@@ -1,8 +1,12 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
+import pandas as pd
+
+from openstf.exceptions import InputDataInsufficientError
 from openstf.pipeline.train_create_forecast_backtest import (
     train_model_and_forecast_back_test,
+    walk_forward_back_test,
 )
 from test.utils import BaseTestCase
 from test.utils import TestData
@@ -34,3 +38,39 @@ class TestTrainBackTestPipeline(BaseTestCase):
         self.assertTrue("realised" in forecast.columns)
         self.assertTrue("horizon" in forecast.columns)
         self.assertEqual(list(forecast.horizon.unique()), [0.25, 24.0])
+
+    def test_walk_forward_back_test(self):
+        self.pj["model"] = "lgb"
+        self.modelspecs.hyper_params = {"n_estimators": 10}
+
+        forecast = walk_forward_back_test(
+            pj=self.pj,
+            modelspecs=self.modelspecs,
+            input_data=self.train_input,
+            training_horizons=[0.25, 24.0],
+            retrain_interval_days=14,
+            min_train_days=30,
+            n_workers=2,
+            random_state=0,
+        )
+
+        self.assertEqual(list(forecast.index.names), ["horizon", "datetime"])
+        self.assertEqual(list(forecast.columns), ["origin", "realised", "forecast"])
+        self.assertEqual(list(forecast.index.unique("horizon")), [0.25, 24.0])
+        # A window of 14 days after the first 30 days, every day is forecasted once
+        origins = forecast.origin.unique()
+        self.assertGreater(len(origins), 1)
+        self.assertTrue(forecast.index.is_unique)
+        for origin, window in forecast.groupby("origin"):
+            datetimes = window.index.get_level_values("datetime")
+            self.assertGreaterEqual(datetimes.min(), origin)
+            self.assertLess(datetimes.max(), origin + pd.Timedelta(days=14))
+
+    def test_walk_forward_back_test_insufficient_data(self):
+        with self.assertRaises(InputDataInsufficientError):
+            walk_forward_back_test(
+                pj=self.pj,
+                modelspecs=self.modelspecs,
+                input_data=self.train_input,
+                min_train_days=365,
+            )
@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+from openstf.exceptions import ModelWithoutStDev
+from openstf.model.serializer import PersistentStorageSerializer
+from openstf.pipeline.update_standard_deviation import (
+    update_standard_deviation_pipeline,
+    update_standard_deviation_pipeline_core,
+)
+from test.utils import BaseTestCase, TestData
+
+
+class MockModel:
+    def __init__(self, path=None):
+        self.path = path
+        self.standard_deviation = pd.DataFrame(
+            {
+                "stdev": np.ones(48),
+                "hour": np.tile(np.arange(24.0), 2),
+                "horizon": np.repeat([0.25, 47.0], 24),
+            },
+            index=np.tile(np.arange(24), 2),
+        )
+
+
+class TestUpdateStandardDeviationPipeline(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.pj = TestData.get_prediction_job(pid=307)
+        self.realised = TestData.load("calculate_kpi_relealised_load.csv")
+        self.predicted_load = TestData.load("calculate_kpi_predicted_load.csv")
+
+    def test_update_standard_deviation_pipeline_core(self):
+        model = MockModel()
+
+        updater = update_standard_deviation_pipeline_core(
+            model, self.realised, self.predicted_load
+        )
+
+        stdev = updater.standard_deviation
+        # Only the 47 hours horizon is available in the predicted load
+        self.assertTrue((stdev[stdev.horizon == 0.25].stdev == 1.0).all())
+        self.assertFalse((stdev[stdev.horizon == 47.0].stdev == 1.0).any())
+        # The standard deviation determined during training is not altered
+        self.assertTrue((model.standard_deviation.stdev == 1.0).all())
+
+    def test_update_standard_deviation_pipeline_core_no_stdev(self):
+        model = MockModel()
+        model.standard_deviation = None
+
+        with self.assertRaises(ModelWithoutStDev):
+            update_standard_deviation_pipeline_core(
+                model, self.realised, self.predicted_load
+            )
+
+    def test_update_standard_deviation_pipeline(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model = MockModel(path=Path(temp_dir) / "model")
+            serializer = PersistentStorageSerializer(trained_models_folder=temp_dir)
+
+            with patch.object(
+                PersistentStorageSerializer,
+                "load_model",
+                MagicMock(return_value=(model, None)),
+            ):
+                stdev = update_standard_deviation_pipeline(
+                    self.pj, self.realised, self.predicted_load, temp_dir
+                )
+
+            # The saved standard deviation replaces the one of the loaded model
+            serializer._apply_standard_deviation_update(model)
+            pd.testing.assert_frame_equal(model.standard_deviation, stdev)
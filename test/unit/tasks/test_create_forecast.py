@@ -26,6 +26,11 @@ class TestCreateForeCastTask(TestCase):
         self.assertEqual(context.mock_calls[1].args[0], FORECAST_MOCK)
 
     @patch("openstf.model.serializer.PersistentStorageSerializer")
+    # Fetch the model input directly from the (mocked) database
+    @patch(
+        "openstf.tasks.create_forecast.BulkModelInputFetcher",
+        MagicMock(side_effect=lambda database: database),
+    )
     @patch("openstf.tasks.utils.taskcontext.DataBase")
     @patch("openstf.tasks.utils.taskcontext.ConfigManager")
     def test_create_forecast_task_with_context(
@@ -51,9 +56,11 @@ class TestCreateForeCastTask(TestCase):
 
         task.main()
 
-        # assert if results forecast has been made
+        # assert if results forecast has been made, the forecasts of both prediction
+        # jobs are written in a single batch
+        self.assertEqual(dbmock().write_forecast.call_count, 1)
         written_forecast = dbmock().write_forecast.call_args.args[0]
-        self.assertEqual(len(written_forecast), 193)
+        self.assertEqual(len(written_forecast), 2 * 193)
         self.assertListEqual(
             list(written_forecast.columns),
             [
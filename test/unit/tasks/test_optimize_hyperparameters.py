@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+import openstf.tasks.optimize_hyperparameters as task
+from openstf.tasks.optimize_hyperparameters import (
+    get_daily_load_profile,
+    get_warm_start_params,
+    register_optimized_hyperparameters,
+)
+from test.utils import BaseTestCase, TestData
+
+
+@patch("openstf.tasks.optimize_hyperparameters.PersistentStorageSerializer")
+class TestWarmStartParams(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.input_data = TestData.load("reference_sets/307-train-data.csv")
+        self.pj, _ = TestData.get_prediction_job_and_modelspecs(pid=307)
+        self.context = MagicMock()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.folder = self.temp_dir.name
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def other_pj(self, pid):
+        return dict(self.pj, id=pid)
+
+    def test_current_model_params_first(self, serializer_mock):
+        model = MagicMock()
+        model.get_params.return_value = {"max_depth": 5}
+        serializer_mock.return_value.load_model.return_value = (model, None)
+        profile = get_daily_load_profile(self.input_data)
+        register_optimized_hyperparameters(
+            self.other_pj(1), profile, {"max_depth": 8}, self.folder
+        )
+
+        params = get_warm_start_params(self.pj, profile, self.folder, self.context)
+
+        self.assertEqual(params, [{"max_depth": 5}, {"max_depth": 8}])
+
+    def test_similar_pids_with_same_model_type(self, serializer_mock):
+        serializer_mock.return_value.load_model.side_effect = LookupError()
+        profile = get_daily_load_profile(self.input_data)
+        register_optimized_hyperparameters(
+            self.other_pj(1), -profile, {"pid": 1}, self.folder
+        )
+        register_optimized_hyperparameters(
+            self.other_pj(2), profile, {"pid": 2}, self.folder
+        )
+        register_optimized_hyperparameters(
+            self.other_pj(3),
+            profile + 0.1 * np.sin(profile.index),
+            {"pid": 3},
+            self.folder,
+        )
+        register_optimized_hyperparameters(
+            dict(self.other_pj(4), model="other"), profile, {"pid": 4}, self.folder
+        )
+
+        params = get_warm_start_params(self.pj, profile, self.folder, self.context)
+
+        # The most similar first, the anti-correlated and other model type are
+        # skipped
+        self.assertEqual(params, [{"pid": 2}, {"pid": 3}])
+
+    def test_profiles_are_stored(self, serializer_mock):
+        serializer_mock.return_value.load_model.side_effect = LookupError()
+        profile = get_daily_load_profile(self.input_data)
+        register_optimized_hyperparameters(
+            self.other_pj(1), profile, {"max_depth": np.int64(8)}, self.folder
+        )
+        # Registering again replaces the stored profile of the pid
+        register_optimized_hyperparameters(
+            self.other_pj(1), profile, {"max_depth": np.int64(9)}, self.folder
+        )
+
+        # A new run of the task, or another worker, finds the stored profile
+        with patch.object(task, "MAX_AGE_PROFILE_DAYS", 1):
+            params = get_warm_start_params(self.pj, profile, self.folder, self.context)
+            self.assertEqual(params, [{"max_depth": 9}])
+
+            # Outdated profiles are not used
+            path = os.path.join(self.folder, task.PROFILE_FOLDER, "1.json")
+            two_days_ago = time.time() - 2 * 24 * 60 * 60
+            os.utime(path, (two_days_ago, two_days_ago))
+            params = get_warm_start_params(self.pj, profile, self.folder, self.context)
+            self.assertEqual(params, [])
+
+    def test_no_load_profile(self, serializer_mock):
+        input_data = self.input_data.copy()
+        input_data["load"] = np.nan
+        self.assertIsNone(get_daily_load_profile(input_data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,18 +1,73 @@
 # SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
 #
 # SPDX-License-Identifier: MPL-2.0
+import copy
+import json
+import os
+import tempfile
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
-from openstf.tasks.run_tracy import run_tracy
+from openstf.tasks.run_tracy import TracyLeases, coalesce_tracy_jobs, run_tracy
 from test.utils import TestData
 
 
+class FakeKtpApi:
+    """In-memory stand-in for the Tracy part of the ktp api."""
+
+    def __init__(self, jobs):
+        self.jobs = {job["id"]: copy.deepcopy(job) for job in jobs}
+        self.deleted = []
+
+    def get_all_tracy_jobs(self, inprogress=None):
+        return [
+            copy.deepcopy(job)
+            for job in self.jobs.values()
+            if inprogress is None or job["inprogress"] == inprogress
+        ]
+
+    def update_tracy_job(self, job):
+        self.jobs[job["id"]] = copy.deepcopy(job)
+
+    def delete_tracy_job(self, job):
+        self.deleted.append(job["id"])
+        del self.jobs[job["id"]]
+
+
+def build_fake_context(jobs):
+    context = MagicMock()
+    context.database.ktp_api = FakeKtpApi(jobs)
+    context.database.get_prediction_job.side_effect = lambda pid: {
+        "id": pid,
+        "name": f"pj{pid}",
+    }
+    return context
+
+
+def create_worker_context_mock():
+    return MagicMock(is_worker_context=True)
+
+
+def record_process(pj, context, **kwargs):
+    # Runs in a worker process, the (forked) patched task records where it ran
+    folder = os.environ["TRACY_TEST_FOLDER"]
+    Path(folder, f"{pj['id']}_{os.getpid()}").touch()
+
+
+def job(job_id, function, pid, inprogress=0):
+    return dict(id=job_id, function=function, args=str(pid), inprogress=inprogress)
+
+
 def build_context_mock():
     context = MagicMock()
     context.database.ktp_api.get_all_tracy_jobs.return_value = TestData.load(
         "tracy_jobs.json"
     )
+    context.database.get_prediction_job.side_effect = lambda pid: {
+        "id": pid,
+        "name": f"pj{pid}",
+    }
     return context
 
 
@@ -45,6 +100,7 @@ class TestRunTracyTask(TestCase):
         self.assertEqual(context.logger.info.call_count, 0)
 
     def test_run_tracy_unknown_job(self, *args):
+        teams_mock = args[2]
         context = build_context_mock()
         jobs = context.database.ktp_api.get_all_tracy_jobs.return_value
         jobs[0]["function"] = "UNKNOWN FUNCTION"
@@ -54,6 +110,10 @@ class TestRunTracyTask(TestCase):
         self.assertEqual(
             context.database.ktp_api.delete_tracy_job.call_count, len(jobs) - 1
         )
+        # The unknown job is not reported as an exception
+        teams_mock.format_message.assert_called_once_with(
+            title="Unknown function of Tracy job", params=jobs[0]
+        )
 
     def test_run_tracy_failed_job(self, *args):
         hyperparams_task = args[0]
@@ -71,3 +131,163 @@ class TestRunTracyTask(TestCase):
         # All hyperparameter optimization task should have failed
         # (teams is used when a job fails)
         self.assertEqual(teams_mock.post_teams.call_count, num_hyperparams_task)
+
+
+@patch("openstf.tasks.run_tracy.teams")
+@patch("openstf.tasks.run_tracy.train_model_task")
+@patch("openstf.tasks.run_tracy.optimize_hyperparameters_task")
+class TestRunTracyCoalescing(TestCase):
+    def test_coalesce_tracy_jobs(self, *args):
+        jobs = [
+            job(1, "train_model", 1),
+            job(2, "train_specific_model", 1),
+            job(3, "optimize_hyperparameters", 1),
+        ]
+        self.assertEqual(
+            coalesce_tracy_jobs(jobs), ["optimize_hyperparameters", "train_model"]
+        )
+        self.assertEqual(coalesce_tracy_jobs(jobs[:2]), ["train_model"])
+
+    def test_duplicate_jobs_run_once(self, optimize_task, train_task, teams_mock):
+        context = build_fake_context(
+            [
+                job(1, "train_model", 457),
+                job(2, "train_specific_model", 457),
+                job(3, "train_model", 355),
+            ]
+        )
+
+        run_tracy(context)
+
+        self.assertEqual(train_task.call_count, 2)
+        self.assertEqual(optimize_task.call_count, 0)
+        self.assertEqual(sorted(context.database.ktp_api.deleted), [1, 2, 3])
+
+    def test_train_model_subsumed_by_optimize(
+        self, optimize_task, train_task, teams_mock
+    ):
+        context = build_fake_context(
+            [job(1, "train_model", 457), job(2, "optimize_hyperparameters", 457)]
+        )
+
+        # Optimizing the hyperparameters trains a new model
+        optimize_task.return_value = True
+        run_tracy(context)
+
+        self.assertEqual(optimize_task.call_count, 1)
+        self.assertEqual(train_task.call_count, 0)
+        self.assertEqual(sorted(context.database.ktp_api.deleted), [1, 2])
+
+    def test_train_model_runs_when_optimize_skipped(
+        self, optimize_task, train_task, teams_mock
+    ):
+        context = build_fake_context(
+            [job(1, "train_model", 457), job(2, "optimize_hyperparameters", 457)]
+        )
+
+        # Hyperparameters were optimized recently, no model is trained
+        optimize_task.return_value = False
+        run_tracy(context)
+
+        self.assertEqual(train_task.call_count, 1)
+        self.assertEqual(sorted(context.database.ktp_api.deleted), [1, 2])
+
+    def test_failed_pid_marks_all_jobs(self, optimize_task, train_task, teams_mock):
+        context = build_fake_context(
+            [
+                job(1, "train_model", 457),
+                job(2, "optimize_hyperparameters", 457),
+                job(3, "train_model", 355),
+                job(4, "UNKNOWN FUNCTION", 355),
+            ]
+        )
+        optimize_task.side_effect = ValueError("Mock raising an exception")
+
+        run_tracy(context)
+
+        ktp_api = context.database.ktp_api
+        self.assertEqual(ktp_api.deleted, [3])
+        self.assertEqual(
+            {job_id: j["inprogress"] for job_id, j in ktp_api.jobs.items()},
+            {1: 2, 2: 2, 4: 2},
+        )
+        self.assertEqual(teams_mock.post_teams.call_count, 3)
+
+    def test_batches(self, optimize_task, train_task, teams_mock):
+        context = build_fake_context([job(i, "train_model", i) for i in range(5)])
+
+        run_tracy(context, batch_size=2)
+
+        self.assertEqual(train_task.call_count, 5)
+        self.assertEqual(len(context.database.ktp_api.jobs), 0)
+
+
+@patch("openstf.tasks.run_tracy.teams")
+@patch("openstf.tasks.run_tracy.train_model_task", side_effect=record_process)
+@patch("openstf.tasks.run_tracy.optimize_hyperparameters_task")
+class TestRunTracyLeases(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        self.lease_file = self.folder / "leases.json"
+        os.environ["TRACY_TEST_FOLDER"] = str(self.folder)
+
+    def tearDown(self) -> None:
+        del os.environ["TRACY_TEST_FOLDER"]
+        self.temp_dir.cleanup()
+
+    def test_expired_lease_is_reclaimed(self, *args):
+        context = build_fake_context(
+            [
+                job(1, "train_model", 457, inprogress=1),
+                job(2, "train_model", 355, inprogress=1),
+            ]
+        )
+        # Job 1 is claimed by a running Tracy, job 2 by one that was killed
+        TracyLeases(self.lease_file).acquire([1])
+
+        run_tracy(
+            context,
+            lease_file=self.lease_file,
+            worker_context_factory=create_worker_context_mock,
+        )
+
+        ktp_api = context.database.ktp_api
+        self.assertEqual(ktp_api.deleted, [2])
+        self.assertEqual(list(ktp_api.jobs), [1])
+        # The lease of the finished job is released
+        leases = TracyLeases(self.lease_file)
+        self.assertFalse(leases.is_expired(1))
+        self.assertTrue(leases.is_expired(2))
+
+    def test_lease_file_read_once_until_changed(self, *args):
+        other_leases = TracyLeases(self.lease_file)
+        other_leases.acquire([1, 2])
+        leases = TracyLeases(self.lease_file)
+
+        with patch("openstf.tasks.run_tracy.json.load", wraps=json.load) as load:
+            self.assertFalse(leases.is_expired(1))
+            self.assertFalse(leases.is_expired(2))
+            self.assertTrue(leases.is_expired(3))
+            self.assertEqual(load.call_count, 1)
+
+            # A lease file changed by another Tracy is read again
+            other_leases.release([1])
+            self.assertTrue(leases.is_expired(1))
+            self.assertEqual(load.call_count, 2)
+
+    def test_concurrent_workers(self, *args):
+        context = build_fake_context([job(i, "train_model", i) for i in range(4)])
+
+        run_tracy(
+            context,
+            n_workers=2,
+            lease_file=self.lease_file,
+            worker_context_factory=create_worker_context_mock,
+        )
+
+        self.assertEqual(len(context.database.ktp_api.jobs), 0)
+        runs = [path.name.split("_") for path in self.folder.glob("*_*")]
+        self.assertEqual(sorted(int(pid) for pid, _ in runs), [0, 1, 2, 3])
+        # The jobs ran in worker processes
+        self.assertNotIn(str(os.getpid()), {process for _, process in runs})
@@ -0,0 +1,45 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from openstf.exceptions import NoPredictedLoadError
+from openstf.tasks.update_standard_deviation import update_standard_deviation_task
+from test.utils import TestData
+
+
+class TestUpdateStandardDeviationTask(TestCase):
+    def setUp(self) -> None:
+        self.pj = TestData.get_prediction_job(pid=307)
+        self.start_time = datetime(2019, 12, 26)
+        self.end_time = datetime(2019, 12, 27)
+
+    @patch("openstf.tasks.update_standard_deviation.update_standard_deviation_pipeline")
+    def test_update_standard_deviation_task_happy_flow(self, pipeline_mock):
+        context = MagicMock()
+        context.database.get_load_pid.return_value = TestData.load(
+            "calculate_kpi_relealised_load.csv"
+        )
+        context.database.get_predicted_load_tahead.return_value = TestData.load(
+            "calculate_kpi_predicted_load.csv"
+        )
+
+        update_standard_deviation_task(self.pj, context, self.start_time, self.end_time)
+
+        self.assertEqual(pipeline_mock.call_count, 1)
+
+    @patch("openstf.tasks.update_standard_deviation.update_standard_deviation_pipeline")
+    def test_update_standard_deviation_task_no_predicted_load(self, pipeline_mock):
+        context = MagicMock()
+        context.database.get_predicted_load_tahead.return_value = pd.DataFrame()
+
+        with self.assertRaises(NoPredictedLoadError):
+            update_standard_deviation_task(
+                self.pj, context, self.start_time, self.end_time
+            )
+
+        self.assertEqual(pipeline_mock.call_count, 0)
@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from openstf.tasks.utils.checkpointjournal import CheckpointJournal
+from openstf.tasks.utils.predictionjobloop import (
+    PredictionJobException,
+    PredictionJobLoop,
+)
+from test.utils import BaseTestCase
+
+PREDICTION_JOBS = [{"id": pid, "name": f"pj{pid}"} for pid in range(1, 5)]
+
+
+class TestCheckpointJournal(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_completed_pids(self):
+        journal = CheckpointJournal(self.temp_dir.name, "task", "20211001")
+        journal.record(1, True)
+        journal.record(2, False)
+        journal.record(3, True)
+        journal.record(3, False)
+        # Simulate a crash while writing the last line
+        with open(journal.path, "a") as file:
+            file.write('{"pid": 4, "succ')
+
+        journal = CheckpointJournal(self.temp_dir.name, "task", "20211001")
+
+        self.assertSetEqual(journal.completed_pids(), {1})
+
+    def test_run_window_and_resume(self):
+        CheckpointJournal(self.temp_dir.name, "task", "20211001").record(1, True)
+
+        other_window = CheckpointJournal(self.temp_dir.name, "task", "20211002")
+        new_run = CheckpointJournal(
+            self.temp_dir.name, "task", "20211001", resume=False
+        )
+
+        self.assertSetEqual(other_window.completed_pids(), set())
+        self.assertSetEqual(new_run.completed_pids(), set())
+
+    def test_old_journals_are_removed(self):
+        old_journal = CheckpointJournal(self.temp_dir.name, "task", "20211001")
+        old_journal.record(1, True)
+        recent_journal = CheckpointJournal(self.temp_dir.name, "task", "20211007")
+        recent_journal.record(1, True)
+        other_task_journal = CheckpointJournal(self.temp_dir.name, "other", "20211001")
+        other_task_journal.record(1, True)
+        eight_days_ago = time.time() - 8 * 24 * 60 * 60
+        for journal in (old_journal, other_task_journal):
+            os.utime(journal.path, (eight_days_ago, eight_days_ago))
+
+        CheckpointJournal(self.temp_dir.name, "task", "20211008", retention_days=7)
+
+        self.assertFalse(old_journal.path.exists())
+        self.assertTrue(recent_journal.path.exists())
+        self.assertTrue(other_task_journal.path.exists())
+
+    def test_prediction_job_loop_resume(self):
+        journal = CheckpointJournal(self.temp_dir.name, "task", "20211001")
+
+        # First run crashes on the third prediction job
+        function_mock = Mock(side_effect=[None, None, Exception("Test"), None])
+        with self.assertRaises(PredictionJobException):
+            PredictionJobLoop(
+                MagicMock(),
+                stop_on_exception=True,
+                random_order=False,
+                prediction_jobs=list(PREDICTION_JOBS),
+                checkpoint_journal=journal,
+            ).map(function_mock)
+
+        # Restarted run only does the remaining prediction jobs
+        function_mock = Mock()
+        PredictionJobLoop(
+            MagicMock(),
+            random_order=False,
+            prediction_jobs=list(PREDICTION_JOBS),
+            checkpoint_journal=journal,
+        ).map(function_mock)
+
+        self.assertListEqual(
+            [call.args[0]["id"] for call in function_mock.call_args_list], [3, 4]
+        )
+        self.assertSetEqual(journal.completed_pids(), {1, 2, 3, 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from openstf.tasks.utils.forecastwriter import BufferedForecastWriter
+from openstf.tasks.utils.predictionjobloop import (
+    PredictionJobException,
+    PredictionJobLoop,
+)
+from test.utils import BaseTestCase
+
+
+class FakeDatabase:
+    """Local stand-in for the write_forecast method of the database."""
+
+    def __init__(self, failing_pids=()):
+        self.failing_pids = set(failing_pids)
+        self.writes = []
+
+    def write_forecast(self, data, **kwargs):
+        if self.failing_pids & set(data["pid"]):
+            raise ValueError("Mock raising an exception")
+        self.writes.append((data, kwargs))
+
+
+def make_forecast(pid, rows=4, start=None, **columns):
+    if start is None:
+        start = datetime(2021, 1, 1)
+    index = pd.date_range(start, periods=rows, freq="15T", tz="UTC")
+    return pd.DataFrame(dict(forecast=1.0, pid=pid, **columns), index=index)
+
+
+class TestBufferedForecastWriter(BaseTestCase):
+    def test_forecasts_written_in_batch(self):
+        database = FakeDatabase()
+        with BufferedForecastWriter(database.write_forecast) as writer:
+            for pid in (1, 2, 3):
+                writer.write_forecast(make_forecast(pid), dbname="forecast_latest")
+            self.assertEqual(len(database.writes), 0)
+
+        self.assertEqual(len(database.writes), 1)
+        data, kwargs = database.writes[0]
+        self.assertEqual(list(data["pid"].unique()), [1, 2, 3])
+        self.assertEqual(kwargs, dict(dbname="forecast_latest"))
+        self.assertEqual(dict(writer.num_written), {1: 1, 2: 1, 3: 1})
+
+    def test_forecasts_grouped_by_arguments_and_columns(self):
+        database = FakeDatabase()
+        with BufferedForecastWriter(database.write_forecast) as writer:
+            writer.write_forecast(make_forecast(1))
+            writer.write_forecast(make_forecast(2), dbname="other")
+            writer.write_forecast(make_forecast(3, stdev=0.1))
+            writer.write_forecast(make_forecast(4))
+
+        pids = sorted(sorted(data["pid"].unique()) for data, _ in database.writes)
+        self.assertEqual(pids, [[1, 4], [2], [3]])
+
+    def test_flush_on_max_rows(self):
+        database = FakeDatabase()
+        with BufferedForecastWriter(database.write_forecast, max_rows=8) as writer:
+            writer.write_forecast(make_forecast(1))
+            self.assertEqual(len(database.writes), 0)
+            writer.write_forecast(make_forecast(2))
+            self.assertEqual(len(database.writes), 1)
+            writer.write_forecast(make_forecast(3))
+
+        self.assertEqual(len(database.writes), 2)
+
+    def test_flush_on_max_delay(self):
+        database = FakeDatabase()
+        with BufferedForecastWriter(database.write_forecast, max_delay=0.1) as writer:
+            writer.write_forecast(make_forecast(1))
+            timeout = time.time() + 5
+            while len(database.writes) == 0 and time.time() < timeout:
+                time.sleep(0.01)
+            self.assertEqual(len(database.writes), 1)
+
+    def test_failure_attributed_to_pid(self):
+        database = FakeDatabase(failing_pids=[2])
+        writer = BufferedForecastWriter(database.write_forecast)
+        for pid in (1, 2, 3):
+            writer.write_forecast(make_forecast(pid))
+
+        with self.assertRaises(PredictionJobException) as context:
+            writer.close()
+
+        # The other forecasts of the failed batch are written separately
+        written_pids = sorted(data["pid"].iloc[0] for data, _ in database.writes)
+        self.assertEqual(written_pids, [1, 3])
+        metrics = context.exception.metrics
+        self.assertEqual(metrics["pids_unsuccessful"], [2])
+        self.assertEqual(metrics["jobs_successful"], 2)
+        self.assertEqual(metrics["exceptions"], {"Mock raising an exception": [2]})
+
+    def test_failures_do_not_hide_raised_exception(self):
+        database = FakeDatabase(failing_pids=[1])
+        with self.assertRaises(KeyError):
+            with BufferedForecastWriter(database.write_forecast) as writer:
+                writer.write_forecast(make_forecast(1))
+                raise KeyError("Exception of the loop")
+
+        self.assertEqual(list(writer.failures), [1])
+
+    def test_write_after_close(self):
+        writer = BufferedForecastWriter(FakeDatabase().write_forecast)
+        writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.write_forecast(make_forecast(1))
+
+    def test_t_ahead_deadline(self):
+        # The t ahead of the first row changes in 100 seconds
+        start = datetime.utcnow() + timedelta(hours=1, seconds=100)
+        forecast = make_forecast(1, start=start)
+
+        deadline = BufferedForecastWriter._t_ahead_deadline(forecast)
+        self.assertAlmostEqual(deadline - time.time(), 95, delta=2)
+
+    def test_t_ahead_series_flushed_before_t_ahead_changes(self):
+        database = FakeDatabase()
+        start = datetime.utcnow() + timedelta(hours=1, seconds=5.2)
+        with BufferedForecastWriter(database.write_forecast) as writer:
+            writer.write_forecast(make_forecast(1, start=start), t_ahead_series=True)
+            timeout = time.time() + 5
+            while len(database.writes) == 0 and time.time() < timeout:
+                time.sleep(0.01)
+            # Written immediately, because of the margin needed for writing
+            self.assertEqual(len(database.writes), 1)
+
+
+class TestBufferedForecastWriterInPredictionJobLoop(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.prediction_jobs = [dict(id=pid, name=f"pj{pid}") for pid in (1, 2, 3)]
+        self.on_successful = MagicMock()
+        self.on_exception = MagicMock()
+        self.on_end = MagicMock()
+
+    def run_loop(self, writer, function):
+        PredictionJobLoop(
+            MagicMock(),
+            prediction_jobs=self.prediction_jobs,
+            random_order=False,
+            on_successful_callback=self.on_successful,
+            on_exception_callback=self.on_exception,
+            on_end_callback=self.on_end,
+            forecast_writer=writer,
+        ).map(function, writer)
+
+    def test_write_failure_reported_by_loop(self):
+        database = FakeDatabase(failing_pids=[2])
+
+        def write_forecast(pj, writer):
+            writer.write_forecast(make_forecast(pj["id"]))
+
+        # Only the exception of the loop is raised, close does not raise again
+        with self.assertRaises(PredictionJobException) as context:
+            with BufferedForecastWriter(database.write_forecast) as writer:
+                self.run_loop(writer, write_forecast)
+
+        metrics = context.exception.metrics
+        self.assertEqual(metrics["num_jobs"], 3)
+        self.assertEqual(metrics["jobs_started"], 3)
+        self.assertEqual(sorted(metrics["pids_successful"]), [1, 3])
+        self.assertEqual(metrics["pids_unsuccessful"], [2])
+        self.assertEqual(metrics["exceptions"], {"Mock raising an exception": [2]})
+        self.assertEqual(writer.failures, {})
+
+        successful_pids = [c.args[0]["id"] for c in self.on_successful.call_args_list]
+        self.assertEqual(sorted(successful_pids), [1, 3])
+        self.assertEqual(self.on_exception.call_args.args[0]["id"], 2)
+        end_calls = {c.args[0]["id"]: c.args[1] for c in self.on_end.call_args_list}
+        self.assertEqual(end_calls, {1: True, 2: False, 3: True})
+
+    def test_write_failure_reported_with_job_exception(self):
+        database = FakeDatabase(failing_pids=[1])
+
+        def write_or_raise(pj, writer):
+            if pj["id"] == 3:
+                raise KeyError("Exception of the prediction job")
+            writer.write_forecast(make_forecast(pj["id"]))
+
+        with self.assertRaises(PredictionJobException) as context:
+            with BufferedForecastWriter(database.write_forecast) as writer:
+                self.run_loop(writer, write_or_raise)
+
+        metrics = context.exception.metrics
+        self.assertEqual(metrics["jobs_started"], 3)
+        self.assertEqual(metrics["pids_successful"], [2])
+        self.assertEqual(sorted(metrics["pids_unsuccessful"]), [1, 3])
+
+    def test_written_jobs_reported_before_end_of_loop(self):
+        database = FakeDatabase()
+
+        def write_and_flush(pj, writer):
+            # Jobs of which the forecast is written are reported while looping
+            self.assertEqual(self.on_successful.call_count, min(pj["id"] - 1, 1))
+            writer.write_forecast(make_forecast(pj["id"]))
+            if pj["id"] == 1:
+                writer.flush()
+
+        with BufferedForecastWriter(database.write_forecast) as writer:
+            self.run_loop(writer, write_and_flush)
+
+        self.assertEqual(self.on_successful.call_count, 3)
+        self.assertEqual(len(database.writes), 2)
+
+    def test_writer_not_allowed_with_worker_processes(self):
+        writer = BufferedForecastWriter(FakeDatabase().write_forecast)
+        with self.assertRaises(ValueError):
+            PredictionJobLoop(
+                MagicMock(),
+                prediction_jobs=self.prediction_jobs,
+                n_workers=2,
+                forecast_writer=writer,
+            )
+        writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, Mock
+
+from openstf.monitoring.performance_meter import PerformanceMeter
+from openstf.tasks.utils.jobscheduling import (
+    RuntimeHistory,
+    order_deadline,
+    order_longest_first,
+)
+from openstf.tasks.utils.predictionjobloop import PredictionJobLoop
+from test.utils import BaseTestCase
+
+PREDICTION_JOBS = [{"id": pid, "name": f"pj{pid}"} for pid in range(1, 5)]
+
+
+class TestJobScheduling(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "runtimes.json"
+        self.history = RuntimeHistory(self.path)
+        for pid, runtime in [(1, 10.0), (2, 40.0), (3, 20.0)]:
+            self.history.update(pid, runtime)
+        self.history.save()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_runtime_history(self):
+        self.history.update(1, 20.0)
+        self.history.save()
+
+        history = RuntimeHistory(self.path)
+
+        # Runtimes are smoothed
+        self.assertEqual(history.expected_runtime(1), 15.0)
+        # Unknown prediction jobs get the median runtime
+        self.assertEqual(history.expected_runtime(4), 20.0)
+
+    def test_order_longest_first(self):
+        ordered = order_longest_first(PREDICTION_JOBS, self.history)
+
+        self.assertListEqual([pj["id"] for pj in ordered], [2, 3, 4, 1])
+
+    def test_order_deadline(self):
+        ordered = order_deadline(
+            PREDICTION_JOBS,
+            self.history,
+            deadline=35.0,
+            priority_function=lambda pj: pj["id"] == 2,
+        )
+
+        # The high priority job does not fit, so the short jobs are run first
+        self.assertListEqual([pj["id"] for pj in ordered], [1, 3, 2, 4])
+
+    def test_prediction_job_loop_runtime_history(self):
+        context_mock = MagicMock()
+        context_mock.perf_meter = PerformanceMeter(MagicMock())
+        context_mock.perf_meter.start_level("task", "test")
+
+        loop = PredictionJobLoop(
+            context_mock,
+            prediction_jobs=list(PREDICTION_JOBS),
+            runtime_history_file=self.path,
+            order="longest_first",
+        )
+        self.assertEqual(loop.prediction_jobs[0]["id"], 2)
+
+        loop.map(Mock())
+
+        # The runtime of every prediction job is kept
+        self.assertEqual(len(RuntimeHistory(self.path).runtimes), 4)
+
+    def test_prediction_job_loop_order_without_history(self):
+        with self.assertRaises(ValueError):
+            PredictionJobLoop(
+                MagicMock(), prediction_jobs=PREDICTION_JOBS, order="longest_first"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import threading
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from openstf.tasks.utils.modelinputfetcher import BulkModelInputFetcher
+from test.utils import BaseTestCase, TestData
+
+DATETIME_START = datetime(2020, 11, 1, 0, 7)
+DATETIME_END = datetime(2020, 11, 3)
+
+WEATHER_COLUMNS = [
+    "clouds",
+    "radiation",
+    "temp",
+    "winddeg",
+    "windspeed",
+    "windspeed_100m",
+    "pressure",
+    "humidity",
+    "rain",
+    "mxlD",
+    "snowDepth",
+    "clearSky_ulf",
+    "clearSky_dlf",
+]
+
+
+class FakeDatabase:
+    """Local stand-in for the database, backed by the reference data file.
+
+    Every pid has the load of the reference data multiplied by the pid.
+    """
+
+    def __init__(self, delay=0.0):
+        self.data = TestData.load("reference_sets/307-test-data.csv")
+        self.delay = delay
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def get_load_pid(self, pid, datetime_start, datetime_end, forecast_resolution):
+        self._count("load")
+        data = self.data.loc[datetime_start:datetime_end, ["load"]]
+        return data * pid
+
+    def get_predictors(
+        self,
+        datetime_start,
+        datetime_end,
+        forecast_resolution,
+        location,
+        predictor_groups,
+    ):
+        self._count(tuple(predictor_groups))
+        # Make concurrent fetches of the same predictors likely
+        threading.Event().wait(self.delay)
+        columns = []
+        if "weather_data" in predictor_groups:
+            columns += WEATHER_COLUMNS
+        if "market_data" in predictor_groups:
+            columns.append("APX")
+        if "load_profiles" in predictor_groups:
+            columns += [c for c in self.data.columns if c.startswith("sjv_")]
+        return self.data.loc[datetime_start:datetime_end, columns]
+
+    def _count(self, key):
+        with self._lock:
+            self.calls[key] += 1
+
+
+class TestBulkModelInputFetcher(BaseTestCase):
+    def get_model_input(self, fetcher, pid, location=(52.0, 5.0), **kwargs):
+        return fetcher.get_model_input(
+            pid=pid,
+            location=location,
+            datetime_start=kwargs.get("datetime_start", DATETIME_START),
+            datetime_end=kwargs.get("datetime_end", DATETIME_END),
+        )
+
+    def test_model_input_equals_data(self):
+        database = FakeDatabase()
+        model_input = self.get_model_input(BulkModelInputFetcher(database), pid=1)
+
+        # The window is rounded to the forecast resolution
+        expected = database.data.loc["2020-11-01 00:00":"2020-11-02 23:45"]
+        self.assertEqual(list(model_input.columns)[0], "load")
+        pd.testing.assert_frame_equal(
+            model_input, expected, check_like=True, check_names=False
+        )
+
+    def test_predictors_shared_between_pids(self):
+        database = FakeDatabase()
+        fetcher = BulkModelInputFetcher(database)
+
+        model_input_1 = self.get_model_input(fetcher, pid=1)
+        model_input_2 = self.get_model_input(fetcher, pid=2)
+        # Same window after rounding, other location
+        model_input_3 = self.get_model_input(
+            fetcher,
+            pid=3,
+            location=(53.0, 6.0),
+            datetime_start=datetime(2020, 11, 1, 0, 1),
+        )
+
+        self.assertEqual(database.calls["load"], 3)
+        self.assertEqual(database.calls[("weather_data",)], 2)
+        self.assertEqual(database.calls[("market_data", "load_profiles")], 1)
+        self.assertEqual(fetcher.num_fetched, 3)
+        self.assertEqual(fetcher.num_reused, 3)
+
+        pd.testing.assert_series_equal(model_input_2["load"], 2 * model_input_1["load"])
+        pd.testing.assert_series_equal(model_input_3["load"], 3 * model_input_1["load"])
+        pd.testing.assert_frame_equal(
+            model_input_1.drop(columns="load"), model_input_2.drop(columns="load")
+        )
+
+    def test_changing_model_input_does_not_change_shared_predictors(self):
+        fetcher = BulkModelInputFetcher(FakeDatabase())
+
+        model_input_1 = self.get_model_input(fetcher, pid=1)
+        model_input_1["APX"] = 0.0
+        model_input_1["feature"] = 1.0
+
+        model_input_2 = self.get_model_input(fetcher, pid=1)
+        self.assertNotIn("feature", model_input_2.columns)
+        self.assertFalse((model_input_2["APX"] == 0.0).all())
+
+    def test_other_window_is_fetched(self):
+        database = FakeDatabase()
+        fetcher = BulkModelInputFetcher(database)
+
+        self.get_model_input(fetcher, pid=1)
+        self.get_model_input(fetcher, pid=1, datetime_end=datetime(2020, 11, 4))
+
+        self.assertEqual(database.calls[("weather_data",)], 2)
+        self.assertEqual(database.calls[("market_data", "load_profiles")], 2)
+
+    def test_least_recently_used_predictors_evicted(self):
+        database = FakeDatabase()
+        fetcher = BulkModelInputFetcher(database, max_cached=2)
+
+        self.get_model_input(fetcher, pid=1, location=(52.0, 5.0))
+        self.get_model_input(fetcher, pid=1, location=(53.0, 5.0))
+        self.get_model_input(fetcher, pid=1, location=(52.0, 5.0))
+
+        self.assertEqual(database.calls[("weather_data",)], 3)
+
+    def test_empty_load_filled_with_nan(self):
+        database = FakeDatabase()
+        database.get_load_pid = lambda *args: pd.DataFrame(columns=["load"])
+
+        model_input = self.get_model_input(BulkModelInputFetcher(database), pid=1)
+
+        self.assertEqual(len(model_input), 192)
+        self.assertTrue(model_input["load"].isna().all())
+
+    def test_concurrent_fetches_fetch_predictors_once(self):
+        database = FakeDatabase(delay=0.05)
+        fetcher = BulkModelInputFetcher(database)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            model_inputs = list(
+                executor.map(lambda pid: self.get_model_input(fetcher, pid), range(8))
+            )
+
+        self.assertEqual(len(model_inputs), 8)
+        self.assertEqual(database.calls["load"], 8)
+        self.assertEqual(database.calls[("weather_data",)], 1)
+        self.assertEqual(database.calls[("market_data", "load_profiles")], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,13 +3,24 @@
 # SPDX-License-Identifier: MPL-2.0
 
 # import builtins
+import multiprocessing
+import os
+import tempfile
+import time
 import unittest
-from unittest.mock import MagicMock, Mock
+from functools import partial
+from unittest.mock import MagicMock, Mock, patch
+
+from openstf_dbc import Singleton
+from openstf_dbc.data_interface import _DataInterface
 
 # import project modules
 from openstf.tasks.utils.predictionjobloop import (
     PredictionJobException,
     PredictionJobLoop,
+    PredictionJobMemoryError,
+    PredictionJobTimeoutError,
+    _get_rss_mb,
 )
 from test.utils import BaseTestCase
 from test.utils import TestData
@@ -19,6 +30,58 @@ PREDICTION_JOBS = TestData.get_prediction_jobs()
 NUM_PREDICTION_JOBS = len(PREDICTION_JOBS)
 
 
+def create_worker_context_mock():
+    return MagicMock(is_worker_context=True)
+
+
+class RecordingWorkerContext:
+    """Worker context that records in a folder that it was created and closed."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.is_worker_context = True
+        self.logger = MagicMock()
+        self.perf_meter = MagicMock()
+        self._record("created")
+
+    def __exit__(self, exc_type, exc_info, stack_info):
+        self._record("closed")
+
+    def _record(self, event):
+        with open(os.path.join(self.folder, f"{event}_{os.getpid()}"), "w"):
+            pass
+
+
+def function_fail_on_first_pid(pj, context):
+    # The context of the worker should be passed instead of the context of the loop
+    if context.is_worker_context is not True:
+        raise RuntimeError("Context of the loop passed to worker")
+    if pj["id"] == PREDICTION_JOBS[0]["id"]:
+        raise ValueError("Test")
+
+
+def function_fail_on_inherited_database(pj, context):
+    if _DataInterface in Singleton._instances:
+        raise RuntimeError("Database of the parent process used in worker")
+
+
+def function_start_process(pj):
+    process = multiprocessing.Process(target=time.sleep, args=(0,))
+    process.start()
+    process.join()
+
+
+def function_hang_on_first_pid(pj, context):
+    if pj["id"] == PREDICTION_JOBS[0]["id"]:
+        time.sleep(60)
+
+
+def function_allocate_on_first_pid(pj, context, allocate_mb):
+    if pj["id"] == PREDICTION_JOBS[0]["id"]:
+        memory = b"x" * (allocate_mb * 1024**2)  # noqa F841
+        time.sleep(60)
+
+
 class TestPredictionJob(BaseTestCase):
     def test_prediction_job_loop_success(self):
         # Build mocks
@@ -94,6 +157,205 @@ class TestPredictionJob(BaseTestCase):
         self.assertEqual(on_successful_callback.call_count, 0)
         self.assertEqual(on_end_callback.call_count, 1)
 
+    def test_prediction_job_loop_parallel(self):
+        # Build mocks
+        context_mock = MagicMock()
+        on_exception_callback = Mock()
+        on_successful_callback = Mock()
+        on_end_callback = Mock()
+
+        # Create loop that fails for one of the prediction jobs
+        with self.assertRaises(PredictionJobException) as context_manager:
+            PredictionJobLoop(
+                context_mock,
+                random_order=False,
+                on_exception_callback=on_exception_callback,
+                on_successful_callback=on_successful_callback,
+                on_end_callback=on_end_callback,
+                prediction_jobs=list(PREDICTION_JOBS),
+                n_workers=2,
+                worker_context_factory=create_worker_context_mock,
+            ).map(function_fail_on_first_pid, context_mock)
+
+        metrics = context_manager.exception.metrics
+        self.assertEqual(metrics["pids_unsuccessful"], [PREDICTION_JOBS[0]["id"]])
+        self.assertEqual(
+            dict(metrics["exceptions"]), {"Test": [PREDICTION_JOBS[0]["id"]]}
+        )
+        self.assertEqual(metrics["jobs_started"], NUM_PREDICTION_JOBS)
+        self.assertEqual(on_exception_callback.call_count, 1)
+        self.assertIsInstance(on_exception_callback.call_args.args[1], ValueError)
+        self.assertEqual(on_successful_callback.call_count, NUM_PREDICTION_JOBS - 1)
+        self.assertEqual(on_end_callback.call_count, NUM_PREDICTION_JOBS)
+
+    def test_prediction_job_loop_parallel_stop_on_exception(self):
+        context_mock = MagicMock()
+        on_end_callback = Mock()
+
+        with self.assertRaises(PredictionJobException) as context_manager:
+            PredictionJobLoop(
+                context_mock,
+                stop_on_exception=True,
+                random_order=False,
+                on_end_callback=on_end_callback,
+                prediction_jobs=list(PREDICTION_JOBS),
+                n_workers=2,
+                worker_context_factory=create_worker_context_mock,
+            ).map(function_fail_on_first_pid, context_mock)
+
+        # Only the prediction jobs that were already running are finished
+        metrics = context_manager.exception.metrics
+        self.assertLessEqual(metrics["jobs_started"], 2)
+        self.assertEqual(on_end_callback.call_count, metrics["jobs_started"])
+
+    def test_prediction_job_loop_prefetch(self):
+        context_mock = MagicMock()
+        on_exception_callback = Mock()
+        fetch_mock = Mock(side_effect=lambda pj, context: pj["id"])
+        function_mock = Mock()
+
+        PredictionJobLoop(
+            context_mock,
+            random_order=False,
+            on_exception_callback=on_exception_callback,
+            prediction_jobs=list(PREDICTION_JOBS),
+            prefetch_depth=1,
+        ).map_with_prefetch(fetch_mock, function_mock, context_mock)
+
+        self.assertEqual(on_exception_callback.call_count, 0)
+        # The fetched input is passed to the function of the same prediction job
+        self.assertListEqual(
+            [call.args[:2] for call in function_mock.call_args_list],
+            [(pj, pj["id"]) for pj in PREDICTION_JOBS],
+        )
+        # Every iteration logs the prefetch checkpoint with the queue depth
+        prefetch_checkpoints = [
+            call
+            for call in context_mock.perf_meter.checkpoint.call_args_list
+            if call.args[0] == "prefetch"
+        ]
+        self.assertEqual(len(prefetch_checkpoints), NUM_PREDICTION_JOBS)
+        self.assertIn("prefetch_queue_depth", prefetch_checkpoints[0].kwargs)
+
+    def test_prediction_job_loop_prefetch_fail(self):
+        context_mock = MagicMock()
+        on_exception_callback = Mock()
+        fetch_mock = Mock(side_effect=Exception("Test"))
+        function_mock = Mock()
+
+        with self.assertRaises(PredictionJobException):
+            PredictionJobLoop(
+                context_mock,
+                stop_on_exception=True,
+                on_exception_callback=on_exception_callback,
+                prediction_jobs=list(PREDICTION_JOBS),
+            ).map_with_prefetch(fetch_mock, function_mock, context_mock)
+
+        # An exception during fetching is an exception of that prediction job
+        self.assertEqual(on_exception_callback.call_count, 1)
+        self.assertEqual(function_mock.call_count, 0)
+
+    @patch("openstf.tasks.utils.predictionjobloop.SUPERVISION_INTERVAL", 0.1)
+    def test_prediction_job_loop_timeout(self):
+        context_mock = MagicMock()
+        on_successful_callback = Mock()
+
+        start = time.perf_counter()
+        with self.assertRaises(PredictionJobException) as context_manager:
+            PredictionJobLoop(
+                context_mock,
+                random_order=False,
+                on_successful_callback=on_successful_callback,
+                prediction_jobs=list(PREDICTION_JOBS),
+                worker_context_factory=create_worker_context_mock,
+                job_timeout=0.5,
+            ).map(function_hang_on_first_pid, context_mock)
+
+        # The hanging job is killed, the other jobs still run
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertIsInstance(
+            context_manager.exception.__cause__, PredictionJobTimeoutError
+        )
+        metrics = context_manager.exception.metrics
+        self.assertEqual(metrics["pids_unsuccessful"], [PREDICTION_JOBS[0]["id"]])
+        self.assertEqual(on_successful_callback.call_count, NUM_PREDICTION_JOBS - 1)
+
+    @unittest.skipIf(_get_rss_mb(os.getpid()) is None, "Requires /proc")
+    @patch("openstf.tasks.utils.predictionjobloop.SUPERVISION_INTERVAL", 0.1)
+    def test_prediction_job_loop_max_rss(self):
+        context_mock = MagicMock()
+        max_rss_mb = _get_rss_mb(os.getpid()) + 100
+
+        with self.assertRaises(PredictionJobException) as context_manager:
+            PredictionJobLoop(
+                context_mock,
+                random_order=False,
+                prediction_jobs=list(PREDICTION_JOBS),
+                worker_context_factory=create_worker_context_mock,
+                job_timeout=30,
+                job_max_rss_mb=max_rss_mb,
+            ).map(function_allocate_on_first_pid, context_mock, allocate_mb=200)
+
+        self.assertIsInstance(
+            context_manager.exception.__cause__, PredictionJobMemoryError
+        )
+        metrics = context_manager.exception.metrics
+        self.assertEqual(metrics["pids_unsuccessful"], [PREDICTION_JOBS[0]["id"]])
+        self.assertEqual(metrics["jobs_successful"], NUM_PREDICTION_JOBS - 1)
+
+    @patch("openstf.tasks.utils.predictionjobloop.SUPERVISION_INTERVAL", 0.1)
+    def test_prediction_job_loop_closes_worker_contexts(self):
+        context_mock = MagicMock()
+        loops = [
+            (dict(n_workers=2), function_fail_on_first_pid),
+            # The worker of the hanging job is replaced after the timeout
+            (dict(job_timeout=0.5), function_hang_on_first_pid),
+        ]
+        for kwargs, function in loops:
+            with self.subTest(**kwargs), tempfile.TemporaryDirectory() as folder:
+                with self.assertRaises(PredictionJobException):
+                    PredictionJobLoop(
+                        context_mock,
+                        random_order=False,
+                        prediction_jobs=list(PREDICTION_JOBS),
+                        worker_context_factory=partial(RecordingWorkerContext, folder),
+                        **kwargs,
+                    ).map(function, context_mock)
+
+                # Every worker closed its context
+                events = [event.split("_") for event in os.listdir(folder)]
+                created = {pid for event, pid in events if event == "created"}
+                closed = {pid for event, pid in events if event == "closed"}
+                self.assertGreaterEqual(len(created), 2)
+                self.assertEqual(created, closed)
+
+    @patch.dict(Singleton._instances)
+    def test_prediction_job_loop_workers_no_inherited_database(self):
+        context_mock = MagicMock()
+        # Database of the parent process
+        Singleton._instances[_DataInterface] = MagicMock()
+
+        for kwargs in [dict(n_workers=2), dict(job_timeout=30)]:
+            with self.subTest(**kwargs):
+                PredictionJobLoop(
+                    context_mock,
+                    prediction_jobs=list(PREDICTION_JOBS),
+                    worker_context_factory=create_worker_context_mock,
+                    **kwargs,
+                ).map(function_fail_on_inherited_database, context_mock)
+
+        # The parent keeps its database
+        self.assertIn(_DataInterface, Singleton._instances)
+
+    def test_prediction_job_loop_supervised_worker_starts_process(self):
+        # Daemonic processes can not have children
+        PredictionJobLoop(
+            MagicMock(),
+            prediction_jobs=PREDICTION_JOBS[:1],
+            worker_context_factory=create_worker_context_mock,
+            job_timeout=30,
+        ).map(function_start_process)
+
     def test_prediction_job_loop_debug_pid(self):
         """Test if a list of prediction_jobs with len 1 is returned if debug_pid is given"""
         context_mock = MagicMock()
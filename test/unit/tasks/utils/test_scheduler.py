@@ -0,0 +1,161 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from openstf.tasks.utils.scheduler import ScheduledTask, TaskScheduler
+from test.utils import BaseTestCase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingTask:
+    """Task function that records its calls in a file, the task runs in another
+    process."""
+
+    def __init__(self, folder, name, side_effect=None):
+        self.path = os.path.join(folder, name)
+        self.side_effect = side_effect
+
+    def __call__(self):
+        with open(self.path, "a") as file:
+            file.write(f"{os.getpid()}\n")
+        if self.side_effect is not None:
+            self.side_effect()
+
+    @property
+    def calls(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as file:
+            return file.read().split()
+
+    @property
+    def call_count(self):
+        return len(self.calls)
+
+
+def raise_exception():
+    raise ValueError("Mock raising an exception")
+
+
+def exit_task():
+    raise SystemExit(1)
+
+
+def crash_task():
+    os._exit(1)
+
+
+class TestTaskScheduler(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.clock = FakeClock()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.schedulers = []
+
+    def tearDown(self) -> None:
+        for scheduler in self.schedulers:
+            scheduler.join()
+            scheduler.close()
+        self.temp_dir.cleanup()
+
+    def create_scheduler(self, tasks):
+        scheduler = TaskScheduler(tasks, clock=self.clock)
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def task(self, name, side_effect=None):
+        return RecordingTask(self.temp_dir.name, name, side_effect)
+
+    def run_and_join(self, scheduler):
+        wait = scheduler.run_pending()
+        scheduler.join()
+        return wait
+
+    def test_runs_tasks_at_interval(self):
+        forecast, train = self.task("forecast"), self.task("train")
+        scheduler = self.create_scheduler(
+            [
+                ScheduledTask("create_forecast", 900, forecast),
+                ScheduledTask("train_model", 3600, train),
+            ]
+        )
+
+        # All tasks start immediately
+        self.assertEqual(self.run_and_join(scheduler), 900)
+        self.clock.now = 899
+        self.run_and_join(scheduler)
+        self.assertEqual(forecast.call_count, 1)
+
+        self.clock.now = 900
+        self.assertEqual(self.run_and_join(scheduler), 900)
+        self.assertEqual(forecast.call_count, 2)
+        self.assertEqual(train.call_count, 1)
+
+        # Missed runs are not caught up
+        self.clock.now = 3600 * 3
+        self.run_and_join(scheduler)
+        self.assertEqual(forecast.call_count, 3)
+        self.assertEqual(train.call_count, 2)
+
+        # Every task has its own process, which is reused between runs
+        self.assertEqual(len(set(forecast.calls)), 1)
+        self.assertNotEqual(forecast.calls[0], train.calls[0])
+        self.assertNotIn(str(os.getpid()), forecast.calls + train.calls)
+
+    def test_skips_overlapping_run(self):
+        release = multiprocessing.Event()
+        slow_task = self.task("slow", side_effect=lambda: release.wait(10))
+        scheduler = self.create_scheduler([ScheduledTask("train_model", 60, slow_task)])
+
+        scheduler.run_pending()
+        self.clock.now = 60
+        scheduler.run_pending()
+        release.set()
+        scheduler.join()
+
+        self.assertEqual(slow_task.call_count, 1)
+        self.clock.now = 120
+        self.run_and_join(scheduler)
+        self.assertEqual(slow_task.call_count, 2)
+
+    def test_exception_does_not_stop_scheduler(self):
+        failing_task = self.task("failing", side_effect=raise_exception)
+        exiting_task = self.task("exiting", side_effect=exit_task)
+        crashing_task = self.task("crashing", side_effect=crash_task)
+        scheduler = self.create_scheduler(
+            [
+                ScheduledTask("failing", 60, failing_task),
+                ScheduledTask("exiting", 60, exiting_task),
+                ScheduledTask("crashing", 60, crashing_task),
+            ]
+        )
+
+        self.run_and_join(scheduler)
+        self.clock.now = 60
+        self.run_and_join(scheduler)
+
+        self.assertEqual(failing_task.call_count, 2)
+        self.assertEqual(exiting_task.call_count, 2)
+        # A task process that died is replaced
+        self.assertEqual(crashing_task.call_count, 2)
+        self.assertEqual(len(set(crashing_task.calls)), 2)
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            ScheduledTask("create_forecast", 0, MagicMock())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,8 @@
 
 import unittest
 from test.utils import BaseTestCase
-from openstf.__main__ import validate_task_name
+from openstf.__main__ import parse_schedule, validate_task_name, validate_task_resume
+from openstf.tasks import create_forecast, train_model
 
 
 class Test___Main__(BaseTestCase):
@@ -14,6 +15,22 @@ class Test___Main__(BaseTestCase):
         """Test using an existing task name should return None"""
         self.assertIsNone(validate_task_name("create_forecast"))
 
+    def test_validate_task_resume(self):
+        self.assertIsNone(validate_task_resume("train_model", train_model.main))
+        with self.assertRaisesRegex(RuntimeError, "does not support --resume"):
+            validate_task_resume("create_forecast", create_forecast.main)
+
+    def test_parse_schedule(self):
+        self.assertEqual(
+            parse_schedule(["create_forecast=15", "train_model=1440"]),
+            {"create_forecast": 900, "train_model": 86400},
+        )
+
+    def test_parse_schedule_invalid(self):
+        for schedule in (["create_forecast"], ["create_forecast=0"], ["unknown=15"]):
+            with self.assertRaises(RuntimeError):
+                parse_schedule(schedule)
+
 
 if __name__ == "__main__":
     unittest.main()
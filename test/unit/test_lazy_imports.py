@@ -0,0 +1,45 @@
+# SPDX-FileCopyrightText: 2017-2021 Alliander N.V. <korte.termijn.prognoses@alliander.com> # noqa E501>
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import json
+import subprocess
+import sys
+import unittest
+
+from openstf import PROJECT_ROOT
+from test.utils import BaseTestCase
+
+LAZY_MODULES = ("mlflow", "optuna", "cufflinks", "plotly")
+
+
+def imported_modules(module, candidates):
+    """Import a module in a fresh interpreter, returns which candidates were loaded."""
+    script = (
+        f"import json, sys; import {module}; "
+        f"print(json.dumps([m for m in {candidates!r} if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    # Modules may log while importing, the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestLazyImports(BaseTestCase):
+    """Heavy dependencies should only be imported on the code paths that use them"""
+
+    def test_tasks_do_not_import_heavy_modules(self):
+        for task in ("create_forecast", "optimize_hyperparameters", "run_tracy"):
+            with self.subTest(task=task):
+                self.assertEqual(
+                    imported_modules(f"openstf.tasks.{task}", LAZY_MODULES), []
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()